@@ -0,0 +1,78 @@
+"""Бенчмарк колоночного FindingStore против списка pydantic моделей.
+
+Сравниваются память (tracemalloc), сортировка по score, фильтрация по
+источнику (маска и копия в новое хранилище) и отбор топ-k.
+
+Запуск:
+    python benchmarks/bench_findings_store.py --sizes 1000 10000 50000
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from deep_research.state import Finding, FindingStore
+
+SOURCES = ["tavily", "arxiv", "github"]
+
+
+def make_findings(n: int):
+    return [
+        Finding(source=SOURCES[i % 3], url=f"https://example.com/page/{i}", title=f"Finding {i}",
+                content="time series forecasting with neural networks " * 8,
+                score=((i * 7919) % 1000) / 1000,
+                metadata={"query": f"step {i % 5}", "raw_content_ref": f"{i:064x}"})
+        for i in range(n)
+    ]
+
+
+def measure_kb(build) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, round(current / 1024, 1)
+
+
+def best_ms(fn, repeats: int = 5) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return round(1000 * min(times), 3)
+
+
+def run(n: int) -> dict:
+    findings, list_kb = measure_kb(lambda: make_findings(n))
+    store, store_kb = measure_kb(lambda: FindingStore(findings))
+
+    return {
+        "findings": n,
+        "list_kb": list_kb,
+        "store_kb": store_kb,
+        "list_sort_ms": best_ms(lambda: sorted(findings, key=lambda f: f.score, reverse=True)),
+        "store_sort_ms": best_ms(lambda: store.order()),
+        "list_filter_ms": best_ms(lambda: [f for f in findings if f.source == "arxiv"]),
+        "store_filter_mask_ms": best_ms(lambda: store.source_mask("arxiv").nonzero()),
+        "store_filter_copy_ms": best_ms(lambda: store.filter(store.source_mask("arxiv"))),
+        "list_top15_ms": best_ms(
+            lambda: sorted(findings, key=lambda f: f.score, reverse=True)[:15]
+        ),
+        "store_top15_ms": best_ms(lambda: [store[i] for i in store.top(15).tolist()]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+    print(json.dumps([run(n) for n in args.sizes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Бенчмарк памяти сессии с полным текстом страниц в памяти и в блобах.
+
+Измеряется память, занятая источниками (tracemalloc), размер
+сериализованного состояния (как в чекпоинте) и размер блобов в БД.
+
+Запуск:
+    python benchmarks/bench_raw_content.py --findings 300 --page-kb 20
+"""
+
+import argparse
+import gc
+import json
+import random
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from deep_research.blobs import get_blob_store
+from deep_research.db import close_engines
+from deep_research.state import Finding, ResearchState
+
+WORDS = ["model", "series", "forecast", "attention", "data", "trend", "layer", "error",
+         "horizon", "baseline", "transformer", "benchmark"]
+
+
+def make_page(rng: random.Random, size: int) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def make_state(n: int, page_bytes: int) -> ResearchState:
+    rng = random.Random(0)
+    state = ResearchState(session_id="bench", query="q")
+    state.findings.extend(
+        Finding(source="tavily", url=f"https://example.com/{i}", title=f"Finding {i}",
+                content="snippet " * 40, score=0.5,
+                metadata={"raw_content": make_page(rng, page_bytes), "query": "q"})
+        for i in range(n)
+    )
+    return state
+
+
+def resident_kb(n: int, page_bytes: int, db_path: str = "") -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    state = make_state(n, page_bytes)
+    if db_path:
+        get_blob_store(db_path).offload(list(state.findings))
+        get_blob_store(db_path).engine.write(lambda conn: None)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(current / 1024, 1), len(state.model_dump_json())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--findings", type=int, default=300)
+    parser.add_argument("--page-kb", type=int, default=20)
+    args = parser.parse_args()
+
+    page_bytes = args.page_kb * 1024
+    inline_kb, inline_json = resident_kb(args.findings, page_bytes)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "bench.db")
+        get_blob_store(db_path)
+        blob_kb, blob_json = resident_kb(args.findings, page_bytes, db_path)
+        stats = get_blob_store(db_path).stats()
+        close_engines()
+
+    print(json.dumps({
+        "findings": args.findings,
+        "page_kb": args.page_kb,
+        "inline_resident_kb": inline_kb,
+        "blob_resident_kb": blob_kb,
+        "inline_state_json_bytes": inline_json,
+        "blob_state_json_bytes": blob_json,
+        "blob_stored_kb": round(stats["stored"] / 1024, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Бенчмарк генерации отчета: пиковая память сверх самого состояния.
+
+Сравнивается прежний способ (`json.dump(state.model_dump())` и полная
+сортировка) с потоковой записью отчета. Память измеряется через
+tracemalloc, уже созданное состояние в пик не входит. Дополнительно
+замеряется время полной генерации и повторной генерации через
+`ReportCache` после добавления `--delta` источников.
+
+Запуск:
+    python benchmarks/bench_report.py --sizes 1000 10000
+"""
+
+import argparse
+import io
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from deep_research.db import close_engines
+from deep_research.nodes.report import (
+    iter_json_report,
+    iter_markdown_report,
+    select_top,
+    write_report,
+)
+from deep_research.report_cache import ReportCache
+from deep_research.state import Finding, ResearchState
+
+
+def make_findings(start: int, count: int):
+    return [
+        Finding(source="tavily", url=f"https://example.com/{i}", title=f"Finding {i}",
+                content="forecasting models " * 20, score=(i % 100) / 100,
+                metadata={"query": f"step {i % 5}", "raw_content": "raw page text " * 400})
+        for i in range(start, start + count)
+    ]
+
+
+def make_state(size: int) -> ResearchState:
+    state = ResearchState(session_id="bench", query="time series forecasting")
+    state.findings.extend(make_findings(0, size))
+    return state
+
+
+def peak_kb(fn) -> float:
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def legacy(state: ResearchState) -> None:
+    sorted(state.findings, key=lambda x: x.score, reverse=True)[:15]
+    json.dump(state.model_dump(), io.StringIO(), indent=2, default=str, ensure_ascii=False)
+
+
+def streaming(state: ResearchState) -> None:
+    "".join(iter_markdown_report(state, select_top(state)))
+    write_report(iter_json_report(state, state.findings), _NullWriter())
+
+
+class _NullWriter:
+    def write(self, chunk: str) -> int:
+        return len(chunk)
+
+
+def render(state: ResearchState, cache=None) -> float:
+    start = time.perf_counter()
+    "".join(iter_markdown_report(state, select_top(state, cache=cache), cache=cache))
+    write_report(iter_json_report(state, state.findings, cache), _NullWriter())
+    return round(time.perf_counter() - start, 4)
+
+
+def render_times(size: int, delta: int) -> dict:
+    """Полная генерация и повторная через кэш после добавления `delta` источников."""
+    with tempfile.TemporaryDirectory() as tmp:
+        state = make_state(size)
+        cache = ReportCache(str(Path(tmp) / "bench.db"), state.session_id)
+        render(state, cache)
+        cache.flush()
+        state.findings.extend(make_findings(size, delta))
+        times = {"full_render_s": render(state), "delta_render_s": render(state, cache)}
+        close_engines()
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--delta", type=int, default=10, help="источников до повторной генерации")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        state = make_state(size)
+        results.append({
+            "findings": size,
+            "legacy_peak_kb": peak_kb(lambda: legacy(state)),
+            "streaming_peak_kb": peak_kb(lambda: streaming(state)),
+            **render_times(size, args.delta),
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Бенчмарк save_session: стоимость сохранения при росте числа источников.
+
+Для каждого размера сессия сохраняется целиком, затем в нее добавляется
+`--delta` новых источников и измеряется повторное сохранение. Для
+сравнения приводится время сериализации всего состояния в один
+JSON-блоб (прежний формат `state_json`).
+
+Запуск:
+    python benchmarks/bench_session_save.py --sizes 10 100 1000 10000
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from deep_research.db import close_engines
+from deep_research.state import Finding, ResearchState
+from deep_research.storage import ResearchStorage
+
+
+def make_findings(start: int, n: int):
+    return [
+        Finding(source="tavily", url=f"https://example.com/{i}", title=f"Finding {i}",
+                content="lorem ipsum " * 40, score=0.5,
+                metadata={"raw_content": "raw page text " * 200})
+        for i in range(start, start + n)
+    ]
+
+
+def run(size: int, delta: int, repeats: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = ResearchStorage(str(Path(tmp) / "bench.db"))
+        state = ResearchState(session_id="bench", query="q", findings=make_findings(0, size))
+        storage.save_session(state)
+
+        delta_times = []
+        blob_times = []
+        for r in range(repeats):
+            state.findings.extend(make_findings(size + r * delta, delta))
+
+            start = time.perf_counter()
+            state.model_dump_json()
+            blob_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            storage.save_session(state)
+            delta_times.append(time.perf_counter() - start)
+
+        close_engines()
+
+    return {
+        "findings": size,
+        "delta": delta,
+        "save_ms": round(1000 * min(delta_times), 3),
+        "full_blob_serialize_ms": round(1000 * min(blob_times), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--delta", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    results = [run(size, args.delta, args.repeats) for size in args.sizes]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Бенчмарк ResearchStorage: сохраненных сессий в секунду при N писателях.
+
+Запуск:
+    python benchmarks/bench_storage.py --writers 1 4 16 --sessions 200
+"""
+
+import argparse
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from deep_research.db import close_engines
+from deep_research.state import Finding, ResearchState
+from deep_research.storage import ResearchStorage
+
+
+def make_state(i: int, findings: int) -> ResearchState:
+    return ResearchState(
+        session_id=f"bench-{i}",
+        query=f"benchmark query {i}",
+        plan=["step 1", "step 2", "step 3"],
+        findings=[
+            Finding(source="tavily", url=f"https://example.com/{i}/{j}",
+                    title=f"Finding {j}", content="lorem ipsum " * 40, score=0.5)
+            for j in range(findings)
+        ],
+    )
+
+
+def run(writers: int, sessions: int, findings: int) -> dict:
+    """Каждый писатель сохраняет `sessions` сессий; параллельно идет чтение."""
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = ResearchStorage(str(Path(tmp) / "bench.db"))
+        states = [make_state(i, findings) for i in range(writers * sessions)]
+        stop = threading.Event()
+        reads = 0
+
+        def reader() -> None:
+            nonlocal reads
+            while not stop.is_set():
+                storage.list_sessions()
+                reads += 1
+
+        def writer(w: int) -> None:
+            for state in states[w * sessions:(w + 1) * sessions]:
+                storage.save_session(state)
+
+        read_thread = threading.Thread(target=reader)
+        read_thread.start()
+        threads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        read_thread.join()
+        close_engines()
+
+    return {
+        "writers": writers,
+        "sessions": writers * sessions,
+        "seconds": round(elapsed, 4),
+        "sessions_per_sec": round(writers * sessions / elapsed, 1),
+        "concurrent_reads": reads,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--sessions", type=int, default=200, help="сессий на писателя")
+    parser.add_argument("--findings", type=int, default=10, help="источников в сессии")
+    args = parser.parse_args()
+
+    results = [run(n, args.sessions, args.findings) for n in args.writers]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
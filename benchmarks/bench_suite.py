@@ -0,0 +1,227 @@
+"""Офлайн набор бенчмарков: сессии, хранилище, отчет, накладные расходы графа.
+
+Поиск подменяется детерминированным FakeSearch (benchmarks/fake_backend.py),
+поэтому сеть не нужна, а результаты разных коммитов сравнимы. Каждый
+сценарий повторяется `--repeat` раз, в JSON попадает лучший прогон.
+
+Запуск:
+    python benchmarks/bench_suite.py --output base.json
+    python benchmarks/bench_suite.py --compare base.json
+    python benchmarks/bench_suite.py --only report storage --quick
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from fake_backend import fake_search, make_findings
+
+from deep_research.batch import set_node_output
+from deep_research.config import Config
+from deep_research.db import close_engines
+from deep_research.graph import create_research_graph
+from deep_research.nodes.report import generate_markdown_report
+from deep_research.state import ResearchState
+from deep_research.storage import ResearchStorage
+
+NODES = ("plan", "search", "analyze", "report")
+
+
+def _config(tmp: str) -> Config:
+    config = Config()
+    config.ui.interactive = False
+    config.search.cache_enabled = False
+    config.storage.db_path = str(Path(tmp) / "bench.db")
+    config.output.save_path = str(Path(tmp) / "out")
+    config.output.format = "markdown"
+    return config
+
+
+def bench_sessions(sessions: int, latency: float, results: int, content_size: int) -> dict:
+    """Сквозные сессии `--auto` одним графом: сессий в секунду и время нод."""
+    with tempfile.TemporaryDirectory() as tmp, \
+            fake_search(latency=latency, results=results, content_size=content_size):
+        graph = create_research_graph(_config(tmp))
+        totals: Dict[str, float] = {}
+        start = time.perf_counter()
+        for i in range(sessions):
+            values = None
+            for values in graph.stream(
+                ResearchState(session_id=f"bench-{i}", query=f"benchmark query {i}"),
+                {"configurable": {"thread_id": f"bench-{i}"}},
+                stream_mode="values", durability="sync",
+            ):
+                pass
+            for name, m in values["metrics"].items():
+                totals[name] = totals.get(name, 0.0) + m["seconds"]
+        elapsed = time.perf_counter() - start
+        close_engines()
+
+    node_seconds = sum(totals.get(f"node.{n}", 0.0) for n in NODES)
+    return {
+        "sessions": sessions,
+        "seconds": round(elapsed, 4),
+        "sessions_per_sec": round(sessions / elapsed, 2),
+        "node_ms": {n: round(totals.get(f"node.{n}", 0.0) / sessions * 1000, 3) for n in NODES},
+        # Все, что вне нод: LangGraph, чекпоинты, стриминг значений
+        "graph_overhead_ms": round((elapsed - node_seconds) / sessions * 1000, 3),
+    }
+
+
+def bench_graph_overhead(sessions: int) -> dict:
+    """Накладные расходы графа при мгновенном бэкенде и одном источнике на шаг."""
+    result = bench_sessions(sessions, latency=0.0, results=1, content_size=50)
+    # Время search без бэкенда: дедупликация, блобы, буфер записи
+    return {k: result[k] for k in ("sessions", "node_ms", "graph_overhead_ms")}
+
+
+def bench_storage(sessions: int, findings: int) -> dict:
+    """ResearchStorage: save/load/list в секунду."""
+    states = [
+        ResearchState(session_id=f"bench-{i}", query=f"benchmark query {i}",
+                      plan=["a", "b", "c"],
+                      findings=make_findings(findings, seed=i, prefix=f"{i}-"))
+        for i in range(sessions)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = ResearchStorage(str(Path(tmp) / "bench.db"))
+
+        start = time.perf_counter()
+        for state in states:
+            storage.save_session(state)
+        save = time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded = 0
+        for state in states:
+            loaded += len(list(storage.load_session(state.session_id).findings))
+        load = time.perf_counter() - start
+        assert loaded == sessions * findings
+
+        lists = 50
+        start = time.perf_counter()
+        for _ in range(lists):
+            storage.list_sessions()
+        listing = time.perf_counter() - start
+        close_engines()
+
+    return {
+        "sessions": sessions,
+        "findings_per_session": findings,
+        "save_per_sec": round(sessions / save, 1),
+        "load_per_sec": round(sessions / load, 1),
+        "list_per_sec": round(lists / listing, 1),
+    }
+
+
+def bench_report(size: int) -> dict:
+    """generate_markdown_report: время и пиковая память сверх состояния."""
+    state = ResearchState(session_id="bench", query="time series forecasting",
+                          findings=make_findings(size, seed=size))
+    start = time.perf_counter()
+    generate_markdown_report(state)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    generate_markdown_report(state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"findings": size, "ms": round(seconds * 1000, 2), "peak_kb": round(peak / 1024, 1)}
+
+
+def best_of(repeat: int, run: Callable[[], dict]) -> dict:
+    """Лучший из `repeat` прогонов по первому числовому показателю времени."""
+    runs = [run() for _ in range(repeat)]
+    for key in ("seconds", "ms", "graph_overhead_ms"):
+        if key in runs[0]:
+            return min(runs, key=lambda r: r[key])
+    for key in ("save_per_sec",):
+        if key in runs[0]:
+            return max(runs, key=lambda r: r[key])
+    return runs[0]
+
+
+def scenarios(quick: bool) -> Dict[str, Callable[[], object]]:
+    scale = 0.2 if quick else 1.0
+    n = lambda value: max(1, int(value * scale))  # noqa: E731
+    return {
+        "sessions": lambda: bench_sessions(n(20), latency=0.01, results=10, content_size=300),
+        "graph": lambda: bench_graph_overhead(n(20)),
+        "storage": lambda: bench_storage(n(100), findings=30),
+        "report": lambda: [bench_report(size) for size in (n(1000), n(10000))],
+    }
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "platform": platform.platform()}
+
+
+def flatten(value: object, prefix: str = "") -> Dict[str, float]:
+    """Плоский словарь числовых показателей: `report.1.ms` и т.п."""
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = enumerate(value)
+    else:
+        return {prefix: value} if isinstance(value, (int, float)) else {}
+    flat: Dict[str, float] = {}
+    for key, item in items:
+        flat.update(flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+    return flat
+
+
+def compare(base: dict, current: dict) -> List[dict]:
+    """Изменение каждого показателя относительно базового прогона, в %."""
+    old, new = flatten(base["results"]), flatten(current["results"])
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        if old[key]:
+            rows.append({"metric": key, "base": old[key], "current": new[key],
+                         "change_pct": round((new[key] - old[key]) / old[key] * 100, 1)})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=["sessions", "graph", "storage", "report"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="уменьшенные размеры")
+    parser.add_argument("--output", help="файл для JSON результатов")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args()
+
+    set_node_output(False)
+    results = {}
+    for name, run in scenarios(args.quick).items():
+        if args.only and name not in args.only:
+            continue
+        print(f"{name}...", file=sys.stderr)
+        if name == "report":
+            runs = [run() for _ in range(args.repeat)]
+            results[name] = [min(sizes, key=lambda r: r["ms"]) for sizes in zip(*runs)]
+        else:
+            results[name] = best_of(args.repeat, run)
+
+    report = {"meta": metadata(), "results": results}
+    if args.compare:
+        report["compare"] = compare(json.loads(Path(args.compare).read_text()), report)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Детерминированный поисковый бэкенд и синтетические корпуса для бенчмарков.
+
+Результаты зависят только от запроса и параметров, поэтому прогоны
+на разных коммитах сравнимы между собой. Сеть не используется.
+"""
+
+import hashlib
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from deep_research.state import Finding
+
+# Словарь синтетических текстов: достаточно разнообразный для BM25 и SimHash
+VOCABULARY = (
+    "model series forecast data trend layer error signal noise sample window "
+    "regression network training feature season anomaly metric baseline lag "
+    "horizon gradient attention kernel spectrum variance bias dataset pipeline"
+).split()
+
+
+def make_text(rng: random.Random, size: int) -> str:
+    """Текст примерно из `size` символов из слов VOCABULARY."""
+    words: List[str] = []
+    length = 0
+    while length < size:
+        word = rng.choice(VOCABULARY)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def make_findings(
+    count: int,
+    content_size: int = 300,
+    raw_size: int = 0,
+    seed: int = 0,
+    prefix: str = "",
+) -> List[Finding]:
+    """Синтетический корпус источников с уникальными URL и текстами."""
+    rng = random.Random(seed)
+    findings = []
+    for i in range(count):
+        metadata = {"query": f"{prefix}step {i % 5}"}
+        if raw_size:
+            metadata["raw_content"] = make_text(rng, raw_size)
+        findings.append(Finding(
+            source="tavily",
+            url=f"https://example.com/{prefix}{seed}/{i}",
+            title=f"{prefix}Finding {i}: " + make_text(rng, 40),
+            content=make_text(rng, content_size),
+            score=round(rng.random(), 4),
+            metadata=metadata,
+        ))
+    return findings
+
+
+class FakeSearch:
+    """Бэкенд с интерфейсом TavilySearch: фиксированная задержка, без сети."""
+
+    latency = 0.0
+    results = 10
+    content_size = 300
+    raw_size = 2000
+    calls = 0
+    _lock = threading.Lock()
+
+    def __init__(self, config=None):
+        self.max_results = self.results
+        self.search_depth = "advanced"
+
+    def search(self, query: str) -> List[Finding]:
+        with FakeSearch._lock:
+            FakeSearch.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        seed = int(hashlib.sha256(query.encode("utf-8")).hexdigest()[:8], 16)
+        return make_findings(self.results, self.content_size, self.raw_size, seed=seed)
+
+
+@contextmanager
+def fake_search(
+    latency: float = 0.0, results: int = 10, content_size: int = 300, raw_size: int = 2000
+) -> Iterator[type]:
+    """Подменяет поисковый клиент нод графа на FakeSearch."""
+    from deep_research.nodes import search as search_module
+
+    original = search_module.get_search_client
+    FakeSearch.latency = latency
+    FakeSearch.results = results
+    FakeSearch.content_size = content_size
+    FakeSearch.raw_size = raw_size
+    FakeSearch.calls = 0
+    search_module.get_search_client = FakeSearch
+    try:
+        yield FakeSearch
+    finally:
+        search_module.get_search_client = original
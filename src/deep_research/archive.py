@@ -0,0 +1,281 @@
+"""Экспорт и импорт сессий для переноса БД между машинами.
+
+Формат — NDJSON, сжатый gzip. Первая строка — заголовок с версией формата
+и списками колонок, дальше по записи на строку: `["s", ...]` — строка
+`research_sessions`, `["f", ...]` — строка `findings` (без `id`),
+`["b", key, text]` — полный текст страницы из хранилища блобов.
+Записи — массивы значений в порядке колонок заголовка, поэтому имена
+полей не повторяются в каждой строке; `state_json` и `metadata`
+переносятся как есть, без разбора.
+
+Экспорт читает строки курсорами в одном снимке БД, импорт копит записи
+в пачки и пишет каждую пачку одной транзакцией. В памяти одновременно
+находятся только текущая строка и одна-две пачки, независимо от размера БД.
+"""
+
+import gzip
+import json
+import zlib
+from concurrent.futures import Future
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, TextIO, Tuple
+
+from deep_research.blobs import COMPRESSION_LEVEL, get_blob_store
+from deep_research.reuse import get_reuse_index
+from deep_research.storage import ResearchStorage
+
+FORMAT = "deep-research-export"
+VERSION = 1
+
+# Уровень gzip: почти то же сжатие, что на 9, но заметно быстрее
+GZIP_LEVEL = 6
+
+# Пачка импорта: записей и символов (полные тексты страниц бывают большими)
+BATCH_ROWS = 2000
+BATCH_CHARS = 8 << 20
+
+SESSION, FINDING, BLOB = "s", "f", "b"
+BLOB_COLUMNS = ["key", "text"]
+
+# Колонки, которые не переносятся: id источников выдает новая БД
+SKIP_COLUMNS = {"findings": {"id"}}
+
+# Производные данные сессии (таблица, колонка с ID сессии): при замене
+# сессии импортом удаляются, чтобы resume и отчет не взяли старое
+DERIVED_TABLES = (
+    ("checkpoints", "thread_id"),
+    ("checkpoint_blobs", "thread_id"),
+    ("checkpoint_writes", "thread_id"),
+    ("report_cache", "session_id"),
+)
+
+# Сколько импортированных сессий регистрировать в индексе повторного
+# использования за один запрос
+REUSE_CHUNK = 500
+
+
+class TransferStats(NamedTuple):
+    """Число перенесенных записей."""
+
+    sessions: int = 0
+    findings: int = 0
+    blobs: int = 0
+
+
+def _columns(conn, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _session_filter(
+    session_ids: Optional[Sequence[str]], status: Optional[str]
+) -> Tuple[str, list]:
+    """WHERE для выбора сессий и его параметры."""
+    clauses, params = [], []
+    if session_ids:
+        clauses.append(f"id IN ({','.join('?' * len(session_ids))})")
+        params.extend(session_ids)
+    if status is not None:
+        clauses.append("status = ?")
+        params.append(status)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _dump(record: list) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def export_sessions(
+    db_path: str,
+    path: str,
+    session_ids: Optional[Sequence[str]] = None,
+    status: Optional[str] = None,
+) -> TransferStats:
+    """Выгружает сессии (все или выбранные), их источники и полные тексты в файл."""
+    storage = ResearchStorage(db_path)
+    storage.flush_findings()
+    get_blob_store(db_path)
+    conn = storage.engine.reader()
+    where, params = _session_filter(session_ids, status)
+    selected = f"SELECT id FROM research_sessions{where}"
+
+    sessions = findings = blobs = 0
+    # Все чтения идут в одном снимке: сессии и источники согласованы
+    conn.execute("BEGIN")
+    try:
+        session_columns = _columns(conn, "research_sessions")
+        finding_columns = [
+            c for c in _columns(conn, "findings") if c not in SKIP_COLUMNS["findings"]
+        ]
+        header = {
+            "format": FORMAT,
+            "version": VERSION,
+            "columns": {SESSION: session_columns, FINDING: finding_columns, BLOB: BLOB_COLUMNS},
+        }
+        with gzip.open(path, "wt", encoding="utf-8", compresslevel=GZIP_LEVEL) as out:
+            out.write(json.dumps(header, ensure_ascii=False) + "\n")
+
+            for row in conn.execute(
+                f"SELECT {', '.join(session_columns)} FROM research_sessions{where} ORDER BY id",
+                params,
+            ):
+                out.write(_dump([SESSION, *row]))
+                sessions += 1
+
+            for row in conn.execute(
+                f"""SELECT {', '.join(finding_columns)} FROM findings
+                    WHERE session_id IN ({selected}) ORDER BY session_id, position, id""",
+                params,
+            ):
+                out.write(_dump([FINDING, *row]))
+                findings += 1
+
+            for key, data in conn.execute(
+                f"""SELECT key, data FROM blobs WHERE key IN (
+                        SELECT json_extract(metadata, '$.raw_content_ref') FROM findings
+                        WHERE session_id IN ({selected}) AND json_valid(metadata)
+                    ) ORDER BY key""",
+                params,
+            ):
+                out.write(_dump([BLOB, key, zlib.decompress(data).decode("utf-8")]))
+                blobs += 1
+    finally:
+        conn.execute("COMMIT")
+    return TransferStats(sessions, findings, blobs)
+
+
+def _read_header(lines: TextIO) -> dict:
+    header = json.loads(next(lines, "null") or "null")
+    if not isinstance(header, dict) or header.get("format") != FORMAT:
+        raise ValueError("Not a deep-research export file")
+    if header.get("version") != VERSION:
+        raise ValueError(f"Unsupported export version: {header.get('version')}")
+    return header
+
+
+def _batches(lines: Iterable[str], max_rows: int, max_chars: int) -> Iterator[List[list]]:
+    """Записи файла пачками, ограниченными по числу и по объему."""
+    batch: List[list] = []
+    size = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        batch.append(json.loads(line))
+        size += len(line)
+        if len(batch) >= max_rows or size >= max_chars:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+class _Loader:
+    """Пишет пачки записей в БД; колонки сопоставляются по именам."""
+
+    def __init__(self, conn, columns: dict):
+        self.sessions = self._mapping(conn, "research_sessions", columns.get(SESSION, []))
+        self.findings = self._mapping(conn, "findings", columns.get(FINDING, []))
+        session_names = self.sessions[1]
+        updates = ", ".join(f"{c} = excluded.{c}" for c in session_names if c != "id")
+        self.upsert_session = (
+            f"INSERT INTO research_sessions ({', '.join(session_names)}) "
+            f"VALUES ({', '.join('?' * len(session_names))}) "
+            f"ON CONFLICT(id) DO UPDATE SET {updates}"
+        )
+        self.insert_finding = (
+            f"INSERT INTO findings ({', '.join(self.findings[1])}) "
+            f"VALUES ({', '.join('?' * len(self.findings[1]))})"
+        )
+        if "id" not in session_names or "session_id" not in self.findings[1]:
+            raise ValueError("Export file lacks session ids")
+        self.session_id = session_names.index("id")
+        # Таблицы чекпоинтов и кэша отчета создаются по требованию
+        tables = {
+            row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
+        self.derived = [
+            f"DELETE FROM {table} WHERE {column} = ?"
+            for table, column in DERIVED_TABLES if table in tables
+        ]
+        self.finding_session = self.findings[1].index("session_id")
+        # В файлах до появления колонки step шаг берется из metadata
+        self.derive_step = "step" not in self.findings[1] and "metadata" in self.findings[1]
+
+    @staticmethod
+    def _mapping(conn, table: str, names: List[str]) -> Tuple[List[int], List[str]]:
+        """Позиции колонок файла, которые есть в таблице, и их имена.
+
+        Колонки, которых нет в БД (файл из более новой версии), пропускаются.
+        """
+        existing = set(_columns(conn, table)) - SKIP_COLUMNS.get(table, set())
+        picked = [(i, name) for i, name in enumerate(names, 1) if name in existing]
+        return [i for i, _ in picked], [name for _, name in picked]
+
+    def rows(self, batch: List[list]) -> Tuple[list, list, list]:
+        sessions, findings, blobs = [], [], []
+        for record in batch:
+            kind = record[0]
+            if kind == SESSION:
+                sessions.append(tuple(record[i] for i in self.sessions[0]))
+            elif kind == FINDING:
+                findings.append(tuple(record[i] for i in self.findings[0]))
+            elif kind == BLOB:
+                text = record[2]
+                blobs.append((record[1], zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL),
+                               len(text)))
+        return sessions, findings, blobs
+
+    def write(self, conn, sessions: list, findings: list, blobs: list) -> None:
+        if sessions:
+            conn.executemany(self.upsert_session, sessions)
+            # Сессия заменяется целиком: источники придут следом из файла,
+            # а чекпоинты и кэш отчета прежней версии больше не подходят
+            ids = [(row[self.session_id],) for row in sessions]
+            conn.executemany("DELETE FROM findings WHERE session_id = ?", ids)
+            for sql in self.derived:
+                conn.executemany(sql, ids)
+        conn.executemany(self.insert_finding, findings)
+        if self.derive_step and findings:
+            conn.executemany(
+                """UPDATE findings SET step = json_extract(metadata, '$.query')
+                   WHERE session_id = ? AND step IS NULL AND json_valid(metadata)""",
+                [(session_id,) for session_id in {row[self.finding_session] for row in findings}],
+            )
+        conn.executemany("INSERT OR IGNORE INTO blobs (key, data, size) VALUES (?, ?, ?)", blobs)
+
+
+def import_sessions(
+    db_path: str, path: str, batch_rows: int = BATCH_ROWS, batch_chars: int = BATCH_CHARS
+) -> TransferStats:
+    """Загружает файл `export_sessions`; сессии с теми же ID заменяются.
+
+    Каждая пачка пишется одной транзакцией. Пока она записывается,
+    читается и готовится следующая. Вместе с замененной сессией удаляются
+    ее чекпоинты и кэш отчета, а шаги импортированных сессий попадают
+    в индекс повторного использования.
+    """
+    storage = ResearchStorage(db_path)
+    get_blob_store(db_path)
+    engine = storage.engine
+
+    sessions = findings = blobs = 0
+    imported: List[str] = []
+    with gzip.open(path, "rt", encoding="utf-8") as lines:
+        header = _read_header(lines)
+        loader = _Loader(engine.reader(), header.get("columns", {}))
+
+        pending: Optional[Future] = None
+        for batch in _batches(lines, batch_rows, batch_chars):
+            rows = loader.rows(batch)
+            if pending is not None:
+                pending.result()
+            pending = engine.submit(lambda conn, rows=rows: loader.write(conn, *rows))
+            imported.extend(row[loader.session_id] for row in rows[0])
+            sessions += len(rows[0])
+            findings += len(rows[1])
+            blobs += len(rows[2])
+        if pending is not None:
+            pending.result()
+
+    reuse = get_reuse_index(db_path)
+    for start in range(0, len(imported), REUSE_CHUNK):
+        reuse.index_sessions(imported[start:start + REUSE_CHUNK])
+    return TransferStats(sessions, findings, blobs)
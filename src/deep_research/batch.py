@@ -0,0 +1,132 @@
+"""Пакетный запуск исследований.
+
+Все сессии выполняются одним скомпилированным графом в пуле потоков.
+Поисковые клиенты, кэш и движок БД общие для процесса, а суммарное число
+одновременных запросов к API ограничено `search.global_concurrency`.
+Ошибка одной сессии не прерывает остальные.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from rich.console import Console
+
+from deep_research.config import Config
+from deep_research.graph import create_research_graph
+from deep_research.state import ResearchState
+from deep_research.storage import ResearchStorage
+
+
+class BatchResult(NamedTuple):
+    """Итог одной сессии пакета."""
+
+    index: int
+    session_id: str
+    query: str
+    status: str
+    seconds: float
+    findings: int
+    search_calls: int
+    error: Optional[str] = None
+
+
+def read_queries(path: str) -> List[str]:
+    """Читает запросы из файла: по одному на строку, `#` — комментарий."""
+    queries = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            queries.append(line)
+    return queries
+
+
+class _SilentConsole(Console):
+    """Консоль, которая ничего не рендерит.
+
+    `Console.quiet` отбрасывает только готовый вывод, а рендеринг таблиц
+    и Markdown отчета занимает заметную часть времени сессии.
+    """
+
+    def print(self, *args, **kwargs) -> None:
+        pass
+
+
+_silent = _SilentConsole()
+_node_consoles: Dict[str, Console] = {}
+
+
+def set_node_output(enabled: bool) -> None:
+    """Включает или глушит вывод нод (при пакетном запуске он перемешивается)."""
+    from deep_research.nodes import analyze, plan, report, search
+
+    for module in (plan, search, analyze, report):
+        if enabled:
+            module.console = _node_consoles.pop(module.__name__, module.console)
+        elif module.console is not _silent:
+            _node_consoles[module.__name__] = module.console
+            module.console = _silent
+
+
+def _mark_failed(storage: ResearchStorage, state: ResearchState) -> None:
+    saved = storage.load_session(state.session_id) or state
+    saved.status = "failed"
+    storage.save_session(saved)
+
+
+def run_batch(
+    config: Config,
+    queries: List[str],
+    workers: Optional[int] = None,
+    on_done: Optional[Callable[[BatchResult], None]] = None,
+) -> List[BatchResult]:
+    """Выполняет исследования по запросам и возвращает итоги в порядке запросов.
+
+    Сессии идут в автоматическом режиме. Упавшая сессия получает статус
+    `failed` и может быть продолжена командой `resume`.
+    """
+    config = config.model_copy(deep=True)
+    config.ui.interactive = False
+    workers = workers or config.batch.workers
+
+    graph = create_research_graph(config)
+    storage = ResearchStorage(config.storage.db_path)
+
+    def run(index: int, query: str) -> BatchResult:
+        state = ResearchState(query=query)
+        thread_config = {"configurable": {"thread_id": state.session_id}}
+        start = time.perf_counter()
+        values = None
+        try:
+            for values in graph.stream(
+                state, thread_config, stream_mode="values", durability="sync"
+            ):
+                pass
+        except Exception as e:
+            error = str(e)
+            try:
+                _mark_failed(storage, state)
+            except Exception as mark_error:
+                # Итог пакета важнее статуса в БД: сессию все равно можно продолжить
+                error += f" (статус failed не сохранен: {mark_error})"
+            return BatchResult(
+                index, state.session_id, query, "failed", time.perf_counter() - start,
+                len(values["findings"]) if values else 0,
+                values["search_calls"] if values else 0, error,
+            )
+        return BatchResult(
+            index, state.session_id, query, values["status"], time.perf_counter() - start,
+            len(values["findings"]), values["search_calls"],
+        )
+
+    results = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+        futures = [pool.submit(run, i, q) for i, q in enumerate(queries)]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if on_done is not None:
+                on_done(result)
+
+    return sorted(results, key=lambda r: r.index)
@@ -0,0 +1,138 @@
+"""Хранилище полного текста страниц (raw_content).
+
+Тексты сжимаются zlib и хранятся в таблице `blobs` той же БД по ключу
+sha256 содержимого, поэтому одна и та же страница хранится один раз.
+Источники держат в `metadata["raw_content_ref"]` только ключ, а текст
+распаковывается при первом обращении к `Finding.raw_content`.
+"""
+
+import hashlib
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from deep_research.db import get_engine
+from deep_research.state import RAW_CONTENT_REF, Finding
+
+# Уровень zlib: тексты страниц жмутся в 3-5 раз уже на среднем уровне
+COMPRESSION_LEVEL = 6
+
+
+def content_key(text: str) -> str:
+    """Ключ блоба: sha256 текста."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class BlobStore:
+    """Сжатые тексты с адресацией по содержимому.
+
+    Запись идет в фоне через писателя БД; пока она не зафиксирована,
+    блоб отдается из памяти, поэтому читать его можно сразу после `put`.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS blobs (
+            key TEXT PRIMARY KEY,
+            data BLOB NOT NULL,
+            size INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, db_path: str, level: int = COMPRESSION_LEVEL):
+        self.db_path = Path(db_path)
+        self.level = level
+        self.engine = get_engine(db_path)
+        self.engine.ensure_schema(self.SCHEMA)
+        self._pending: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def put_many(self, texts: Iterable[str]) -> List[str]:
+        """Сохраняет тексты и возвращает их ключи."""
+        keys = []
+        rows = []
+        for text in texts:
+            key = content_key(text)
+            keys.append(key)
+            rows.append((key, zlib.compress(text.encode("utf-8"), self.level), len(text)))
+        if not rows:
+            return keys
+
+        with self._lock:
+            for key, data, _ in rows:
+                self._pending[key] = data
+
+        future = self.engine.submit(lambda conn: conn.executemany(
+            "INSERT OR IGNORE INTO blobs (key, data, size) VALUES (?, ?, ?)", rows
+        ))
+        future.add_done_callback(lambda _: self._forget(rows))
+        return keys
+
+    def put(self, text: str) -> str:
+        """Сохраняет текст и возвращает его ключ."""
+        return self.put_many([text])[0]
+
+    def _forget(self, rows: List[tuple]) -> None:
+        with self._lock:
+            for key, _, _ in rows:
+                self._pending.pop(key, None)
+
+    def get(self, key: str) -> Optional[str]:
+        """Распакованный текст или None, если блоба нет."""
+        with self._lock:
+            data = self._pending.get(key)
+        if data is None:
+            row = self.engine.reader().execute(
+                "SELECT data FROM blobs WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            data = row[0]
+        return zlib.decompress(data).decode("utf-8")
+
+    def offload(self, findings: List[Finding]) -> None:
+        """Переносит `metadata["raw_content"]` источников в хранилище."""
+        moved = [f for f in findings if isinstance(f.metadata.get("raw_content"), str)]
+        keys = self.put_many(f.metadata["raw_content"] for f in moved)
+        for finding, key in zip(moved, keys):
+            del finding.metadata["raw_content"]
+            finding.metadata[RAW_CONTENT_REF] = key
+            finding.attach_blobs(self)
+
+    def stats(self) -> Dict[str, Any]:
+        """Число блобов, исходный и сжатый размер."""
+        count, size, stored = self.engine.reader().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM blobs"
+        ).fetchone()
+        return {"blobs": count, "size": size, "stored": stored}
+
+
+_stores: Dict[str, BlobStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_blob_store(db_path: str) -> BlobStore:
+    """Возвращает общее для процесса хранилище для указанной БД."""
+    key = str(Path(db_path).resolve())
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None or store.engine._closed:
+            store = BlobStore(db_path)
+            _stores[key] = store
+        return store
+
+
+def find_blob(key: str) -> Optional[str]:
+    """Ищет блоб во всех открытых хранилищах.
+
+    Нужен источникам, восстановленным без привязки к хранилищу
+    (например, из чекпоинта): ключ — хэш содержимого, поэтому любое
+    хранилище с этим ключом отдает тот же текст.
+    """
+    with _stores_lock:
+        stores = [s for s in _stores.values() if not s.engine._closed]
+    for store in stores:
+        text = store.get(key)
+        if text is not None:
+            return text
+    return None
@@ -0,0 +1,188 @@
+"""Персистентный кэш результатов поиска."""
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from deep_research import tracing
+from deep_research.blobs import get_blob_store
+from deep_research.db import get_engine
+from deep_research.state import Finding
+
+
+def normalize_query(query: str) -> str:
+    """Приводит запрос к каноническому виду для ключа кэша."""
+    return " ".join(query.lower().split())
+
+
+class SearchCache:
+    """Кэш результатов поиска в SQLite с TTL и LRU-вытеснением.
+
+    Хранится в отдельной таблице той же БД, что и сессии, поэтому
+    переживает перезапуск процесса. Чтение идет через соединение потока,
+    запись и обновление времени доступа — в фоне через писателя БД; пока
+    запись не зафиксирована, результат отдается из памяти. Полный текст
+    страниц уходит в хранилище блобов, в кэше остается только ссылка.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS search_cache (
+            key TEXT PRIMARY KEY,
+            query TEXT NOT NULL,
+            results TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_search_cache_accessed
+            ON search_cache(accessed_at);
+    """
+
+    def __init__(self, db_path: str, ttl: int = 86400, max_entries: int = 1000):
+        self.db_path = Path(db_path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pending: Dict[str, str] = {}
+        self.engine = get_engine(db_path)
+        self.engine.ensure_schema(self.SCHEMA)
+        self.blobs = get_blob_store(db_path)
+
+    @staticmethod
+    def make_key(source: str, query: str, search_depth: str, max_results: int) -> str:
+        """Ключ кэша: нормализованный запрос и параметры поиска."""
+        raw = json.dumps([source, normalize_query(query), search_depth, max_results])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[Finding]]:
+        """Возвращает результаты из кэша или None."""
+        now = time.time()
+        with self._lock:
+            payload = self._pending.get(key)
+        if payload is not None:
+            row = (payload, now)
+        else:
+            row = self.engine.reader().execute(
+                "SELECT results, created_at FROM search_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+        if row is None or (self.ttl > 0 and now - row[1] > self.ttl):
+            if row is not None:
+                self.engine.submit(lambda conn: conn.execute(
+                    "DELETE FROM search_cache WHERE key = ?", (key,)
+                ))
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # Время доступа для LRU обновляем без ожидания записи
+        self.engine.submit(lambda conn: conn.execute(
+            "UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key)
+        ))
+        with self._lock:
+            self.hits += 1
+
+        findings = [Finding.model_validate(item) for item in json.loads(row[0])]
+        for finding in findings:
+            finding.attach_blobs(self.blobs)
+        return findings
+
+    def put(self, key: str, query: str, findings: List[Finding]) -> None:
+        """Сохраняет результаты в фоне и вытесняет самые старые записи.
+
+        `raw_content` источников переносится в хранилище блобов.
+        """
+        now = time.time()
+        self.blobs.offload(findings)
+        payload = json.dumps(
+            [f.model_dump() for f in findings], ensure_ascii=False
+        )
+        max_entries = self.max_entries
+
+        def write(conn):
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO search_cache
+                (key, query, results, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (key, query, payload, now, now)
+            )
+            conn.execute(
+                """
+                DELETE FROM search_cache WHERE key IN (
+                    SELECT key FROM search_cache
+                    ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (max_entries,)
+            )
+
+        with self._lock:
+            self._pending[key] = payload
+        future = self.engine.submit(write)
+        future.add_done_callback(lambda _: self._forget(key, payload))
+
+    def _forget(self, key: str, payload: str) -> None:
+        with self._lock:
+            if self._pending.get(key) is payload:
+                del self._pending[key]
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        self.engine.write(lambda conn: conn.execute("DELETE FROM search_cache"))
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий и размер кэша."""
+        size = self.engine.reader().execute(
+            "SELECT COUNT(*) FROM search_cache"
+        ).fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": size}
+
+
+class CachedSearch:
+    """Обертка над поисковым клиентом, отдающая результаты из кэша."""
+
+    def __init__(self, backend: Any, cache: SearchCache, source: str = "tavily"):
+        self.backend = backend
+        self.cache = cache
+        self.source = source
+
+    def search(self, query: str) -> List[Finding]:
+        """Выполняет поиск, используя кэш при наличии свежего результата."""
+        key = SearchCache.make_key(
+            self.source, query, self.backend.search_depth, self.backend.max_results
+        )
+        with tracing.span("cache", self.source) as span:
+            cached = self.cache.get(key)
+            span.add(cache_hits=cached is not None, cache_misses=cached is None)
+        if cached is not None:
+            return cached
+
+        findings = self.backend.search(query)
+        self.cache.put(key, query, findings)
+        return findings
+
+
+_caches: Dict[str, SearchCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_search_cache(db_path: str, ttl: int, max_entries: int) -> SearchCache:
+    """Возвращает общий для процесса кэш для указанной БД."""
+    key = str(Path(db_path).resolve())
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None or cache.engine._closed:
+            cache = SearchCache(db_path, ttl=ttl, max_entries=max_entries)
+            _caches[key] = cache
+        cache.ttl = ttl
+        cache.max_entries = max_entries
+        return cache
+
@@ -0,0 +1,373 @@
+"""Чекпоинты LangGraph в SQLite.
+
+Хранение инкрементальное: в `checkpoint_blobs` пишется значение канала
+только при смене его версии, записи нод — в `checkpoint_writes`, а сам
+чекпоинт содержит лишь версии каналов. Канал `findings` вообще не
+сериализуется: новые источники дописываются строками в таблицу
+`findings` (как при `save_session`), а в блоб попадает только их число,
+поэтому чекпоинт не растет с размером сессии и восстанавливается за
+постоянное время — источники подгружаются лениво.
+
+Идентификатор потока (`thread_id`) должен совпадать с `session_id`.
+"""
+
+import random
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+from deep_research.state import FindingList
+from deep_research.storage import FindingsDelta, ResearchStorage, findings_delta
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS checkpoints (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        parent_checkpoint_id TEXT,
+        checkpoint_type TEXT NOT NULL,
+        checkpoint BLOB NOT NULL,
+        metadata_type TEXT NOT NULL,
+        metadata BLOB NOT NULL,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS checkpoint_blobs (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        channel TEXT NOT NULL,
+        version TEXT NOT NULL,
+        type TEXT NOT NULL,
+        blob BLOB,
+        PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+    );
+
+    CREATE TABLE IF NOT EXISTS checkpoint_writes (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        task_id TEXT NOT NULL,
+        idx INTEGER NOT NULL,
+        channel TEXT NOT NULL,
+        type TEXT NOT NULL,
+        blob BLOB,
+        task_path TEXT NOT NULL DEFAULT '',
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+    );
+"""
+
+# Тип блоба-ссылки на строки таблицы findings
+FINDINGS_REF = "findings-ref"
+
+Typed = Tuple[str, Optional[bytes]]
+
+
+class SqliteCheckpointer(BaseCheckpointSaver[str]):
+    """Checkpointer LangGraph поверх общей SQLite БД исследований."""
+
+    def __init__(self, db_path: str, *, serde: Any = None):
+        super().__init__(serde=serde)
+        self.storage = ResearchStorage(db_path)
+        self.engine = self.storage.engine
+        self.engine.ensure_schema(SCHEMA)
+
+    # --- сериализация ---
+
+    def _dump(self, thread_id: str, value: Any, deltas: List[FindingsDelta]) -> Typed:
+        if isinstance(value, FindingList):
+            # Источники уходят строками в findings в той же транзакции;
+            # сохраненными они считаются только после ее фиксации
+            deltas.append(findings_delta(thread_id, value))
+            return FINDINGS_REF, str(len(value)).encode()
+        return self.serde.dumps_typed(value)
+
+    def _write(self, fn, deltas: List[FindingsDelta]) -> None:
+        """Выполняет запись и применяет дельты источников после фиксации."""
+        try:
+            self.engine.write(fn)
+        except BaseException:
+            for delta in deltas:
+                delta.rollback()
+            raise
+        for delta in deltas:
+            delta.commit()
+
+    def _load(self, thread_id: str, typed: Typed) -> Any:
+        kind, blob = typed
+        if kind == FINDINGS_REF:
+            count = int(blob)
+            storage = self.storage
+            return FindingList(
+                loader=lambda: storage.load_finding_store(thread_id, limit=count),
+                persisted=count,
+            )
+        return self.serde.loads_typed((kind, blob))
+
+    # --- чтение ---
+
+    def _channel_values(
+        self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions
+    ) -> Dict[str, Any]:
+        conn = self.engine.reader()
+        values = {}
+        for channel, version in versions.items():
+            row = conn.execute(
+                """SELECT type, blob FROM checkpoint_blobs
+                   WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?""",
+                (thread_id, checkpoint_ns, channel, str(version))
+            ).fetchone()
+            if row is None or row[0] == "empty":
+                continue
+            values[channel] = self._load(thread_id, (row[0], row[1]))
+        return values
+
+    def _pending_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list:
+        rows = self.engine.reader().execute(
+            """SELECT task_id, channel, type, blob FROM checkpoint_writes
+               WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?
+               ORDER BY task_path, task_id, idx""",
+            (thread_id, checkpoint_ns, checkpoint_id)
+        ).fetchall()
+        return [(task_id, channel, self._load(thread_id, (kind, blob)))
+                for task_id, channel, kind, blob in rows]
+
+    def _tuple(self, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, c_type, c_blob, m_type, m_blob = row
+        checkpoint = self.serde.loads_typed((c_type, c_blob))
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }},
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._channel_values(
+                    thread_id, checkpoint_ns, checkpoint["channel_versions"]
+                ),
+            },
+            metadata=self.serde.loads_typed((m_type, m_blob)),
+            parent_config=(
+                {"configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": parent_id,
+                }}
+                if parent_id else None
+            ),
+            pending_writes=self._pending_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    _COLUMNS = """thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+                  checkpoint_type, checkpoint, metadata_type, metadata"""
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Чекпоинт по id из config или последний чекпоинт потока."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        conn = self.engine.reader()
+        if checkpoint_id := get_checkpoint_id(config):
+            row = conn.execute(
+                f"""SELECT {self._COLUMNS} FROM checkpoints
+                    WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?""",
+                (thread_id, checkpoint_ns, checkpoint_id)
+            ).fetchone()
+        else:
+            row = conn.execute(
+                f"""SELECT {self._COLUMNS} FROM checkpoints
+                    WHERE thread_id = ? AND checkpoint_ns = ?
+                    ORDER BY checkpoint_id DESC LIMIT 1""",
+                (thread_id, checkpoint_ns)
+            ).fetchone()
+        return self._tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """Чекпоинты от новых к старым."""
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+
+        sql = f"SELECT {self._COLUMNS} FROM checkpoints"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY checkpoint_id DESC"
+
+        for row in self.engine.reader().execute(sql, params).fetchall():
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self.serde.loads_typed((row[6], row[7]))
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            yield self._tuple(row)
+
+    # --- запись ---
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Сохраняет чекпоинт: только каналы с новыми версиями."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        stored = checkpoint.copy()
+        values = stored.pop("channel_values")
+
+        deltas: List[FindingsDelta] = []
+        blobs = []
+        for channel, version in new_versions.items():
+            kind, blob = (
+                self._dump(thread_id, values[channel], deltas)
+                if channel in values else ("empty", None)
+            )
+            blobs.append((thread_id, checkpoint_ns, channel, str(version), kind, blob))
+
+        c_type, c_blob = self.serde.dumps_typed(stored)
+        m_type, m_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        row = (
+            thread_id, checkpoint_ns, checkpoint["id"],
+            config["configurable"].get("checkpoint_id"),
+            c_type, c_blob, m_type, m_blob,
+        )
+
+        def write(conn):
+            for delta in deltas:
+                delta.apply(conn)
+            conn.executemany(
+                "INSERT OR REPLACE INTO checkpoint_blobs VALUES (?, ?, ?, ?, ?, ?)", blobs
+            )
+            conn.execute(
+                f"INSERT OR REPLACE INTO checkpoints ({self._COLUMNS}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                row
+            )
+
+        self._write(write, deltas)
+        return {"configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint["id"],
+        }}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Сохраняет записи ноды, сделанные после чекпоинта."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        deltas: List[FindingsDelta] = []
+        replace, ignore = [], []
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            kind, blob = self._dump(thread_id, value, deltas)
+            row = (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, kind, blob,
+                   task_path)
+            # Служебные записи (ошибки, прерывания) перезаписываются, обычные — нет
+            (replace if idx < 0 else ignore).append(row)
+
+        def write(conn):
+            for delta in deltas:
+                delta.apply(conn)
+            conn.executemany(
+                "INSERT OR REPLACE INTO checkpoint_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                replace,
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO checkpoint_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", ignore
+            )
+
+        self._write(write, deltas)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Удаляет все чекпоинты потока."""
+        def write(conn):
+            for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+        self.engine.write(write)
+
+    def get_next_version(self, current: Optional[str], channel: None = None) -> str:
+        """Монотонные строковые версии, как у InMemorySaver."""
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # --- async-обертки ---
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
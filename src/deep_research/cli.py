@@ -1,15 +1,27 @@
-"""CLI интерфейс для deep research."""
+"""CLI интерфейс для deep research.
 
-from typing import Optional
+Граф (LangGraph, LangChain) и поисковые клиенты (Tavily) импортируются
+внутри команд, которые их запускают: `list`, `stats`, `search`, `export`,
+`import` и проверки `resume` работают только с SQLite и стартуют быстро. Тест
+tests/test_cli_startup.py следит за этим.
+"""
+
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
 
 import typer
 from rich.console import Console
+from rich.markup import escape
 from rich.table import Table
 
-from deep_research.graph import create_research_graph
-from deep_research.state import ResearchState
 from deep_research.config import load_config, Config
-from deep_research.storage import ResearchStorage
+from deep_research.ratelimit import all_metrics
+from deep_research.storage import HIGHLIGHT_END, HIGHLIGHT_START, ResearchStorage
+
+if TYPE_CHECKING:
+    from deep_research.batch import BatchResult
+    from deep_research.state import ResearchState
 
 app = typer.Typer(help="Personal Deep Research Agent")
 console = Console()
@@ -28,86 +40,379 @@ def get_config() -> Config:
 def query(
     q: str = typer.Argument(..., help="Research query"),
     interactive: bool = typer.Option(True, "--interactive/--auto", help="Интерактивный режим"),
+    cache: bool = typer.Option(True, "--cache/--no-cache", help="Кэш результатов поиска"),
+    reuse: bool = typer.Option(True, "--reuse/--no-reuse", help="Источники похожих прошлых сессий"),
+    profile: bool = typer.Option(False, "--profile", help="Chrome trace и сводка времени по нодам"),
 ):
     """Запускает новое исследование по запросу."""
+    from deep_research.state import ResearchState
+
     config = get_config()
     config.ui.interactive = interactive
+    if not cache:
+        config.search.cache_enabled = False
+    if not reuse:
+        config.search.reuse_enabled = False
     
     # Создаем начальное состояние
     initial_state = ResearchState(query=q)
-    
-    # Создаем и запускаем граф
+
+    console.print(f"[bold green]Запуск исследования:[/] {q}")
+    console.print(f"[dim]Session ID: {initial_state.session_id}[/]")
+    run_graph(config, initial_state, initial_state.session_id, profile)
+
+
+def run_graph(
+    config: Config,
+    graph_input: Optional["ResearchState"],
+    session_id: str,
+    profile: bool = False,
+) -> None:
+    """Выполняет граф до конца и печатает итог.
+
+    `graph_input=None` продолжает поток `session_id` с последнего чекпоинта.
+    С `profile` события трассировки пишутся в Chrome trace рядом с отчетами,
+    а в конце печатается сводка по нодам и бэкендам.
+    """
+    from deep_research import tracing
+    from deep_research.graph import create_research_graph
+
+    if profile:
+        tracing.start_profile()
     try:
         graph = create_research_graph(config)
-        
-        # Конфигурация для checkpointer
-        thread_config = {"configurable": {"thread_id": initial_state.session_id}}
-        
-        console.print(f"[bold green]Запуск исследования:[/] {q}")
-        console.print(f"[dim]Session ID: {initial_state.session_id}[/]")
-        
-        # Запускаем граф
+
+        # Конфигурация для checkpointer: поток = сессия
+        thread_config = {"configurable": {"thread_id": session_id}}
+
+        # Чекпоинт пишется синхронно после каждой ноды
         final_state = None
-        for event in graph.stream(initial_state, thread_config):
-            # LangGraph возвращает события для каждой ноды
-            if "__end__" not in event:
-                # Получаем последнее состояние
-                final_state = list(event.values())[0] if event else None
-        
-        if final_state and final_state.status == "completed":
+        for values in graph.stream(
+            graph_input, thread_config, stream_mode="values", durability="sync"
+        ):
+            final_state = values
+
+        if final_state and final_state.get("status") == "completed":
             console.print(f"\n[bold green]✓ Исследование завершено![/]")
-            if final_state.report_path:
-                console.print(f"[dim]Отчет сохранен: {final_state.report_path}[/]")
-        elif final_state and final_state.status == "cancelled":
+            if final_state.get("report_path"):
+                console.print(f"[dim]Отчет сохранен: {final_state['report_path']}[/]")
+        elif final_state and final_state.get("status") == "cancelled":
             console.print("\n[yellow]Исследование отменено[/]")
-        
+        print_throttle_stats()
+
     except Exception as e:
         console.print(f"[red]Ошибка:[/] {e}")
         raise typer.Exit(1)
+    finally:
+        trace = tracing.stop_profile() if profile else None
+
+    if trace is not None:
+        if final_state and final_state.get("metrics"):
+            print_metrics(final_state["metrics"])
+        path = trace.write(str(Path(config.output.save_path) / f"{session_id}.trace.json"))
+        console.print(f"[dim]Профиль: {path} (chrome://tracing или ui.perfetto.dev)[/]")
+
+
+def print_metrics(metrics: dict) -> None:
+    """Сводка трассировки: время и счетчики по нодам и бэкендам."""
+    table = Table(title="Profile")
+    table.add_column("Span", style="cyan")
+    table.add_column("Calls", justify="right")
+    table.add_column("Total, s", justify="right")
+    table.add_column("Mean, ms", justify="right")
+    table.add_column("KB", justify="right")
+    table.add_column("Findings", justify="right")
+    table.add_column("Cache hits", justify="right")
+
+    for name, m in sorted(metrics.items(), key=lambda item: -item[1]["seconds"]):
+        calls = int(m["calls"])
+        table.add_row(
+            name, str(calls), f"{m['seconds']:.2f}", f"{m['seconds'] / calls * 1000:.1f}",
+            f"{m['bytes'] / 1024:.0f}" if "bytes" in m else "",
+            str(int(m["findings"])) if "findings" in m else "",
+            f"{int(m['cache_hits'])}/{int(m['cache_hits'] + m['cache_misses'])}"
+            if "cache_hits" in m else "",
+        )
+    console.print(table)
+
+
+def print_throttle_stats() -> None:
+    """Показывает повторы и ожидание лимитов API, если они были."""
+    for m in all_metrics():
+        if m["retries"] or m["failed"] or m["throttle_time"] >= 0.1:
+            console.print(
+                f"[dim]{m['backend']}: запросов {m['requests']}, повторов {m['retries']}, "
+                f"429/5xx {m['overloaded']}, ошибок {m['failed']}, "
+                f"ожидание лимитов {m['throttle_time']:.1f}s, "
+                f"лимит параллельности {m['concurrency_limit']}[/]"
+            )
+
+
+@app.command()
+def batch(
+    path: str = typer.Argument(..., help="Файл с запросами, по одному на строку"),
+    workers: Optional[int] = typer.Option(
+        None, "--workers", "-w", min=1, help="Одновременных сессий"
+    ),
+    cache: bool = typer.Option(True, "--cache/--no-cache", help="Кэш результатов поиска"),
+    reuse: bool = typer.Option(True, "--reuse/--no-reuse", help="Источники похожих прошлых сессий"),
+    verbose: bool = typer.Option(False, "--verbose", help="Показывать вывод каждой сессии"),
+):
+    """Выполняет исследования по списку запросов в автоматическом режиме."""
+    from deep_research.batch import read_queries, run_batch, set_node_output
+
+    config = get_config()
+    if not cache:
+        config.search.cache_enabled = False
+    if not reuse:
+        config.search.reuse_enabled = False
+
+    try:
+        queries = read_queries(path)
+    except OSError as e:
+        console.print(f"[red]Ошибка:[/] {e}")
+        raise typer.Exit(1)
+    if not queries:
+        console.print("[yellow]Файл не содержит запросов[/]")
+        return
+
+    workers = workers or config.batch.workers
+    console.print(f"[bold green]Пакет:[/] {len(queries)} запросов, {workers} потоков")
+
+    def progress(result: "BatchResult") -> None:
+        color = "green" if result.status == "completed" else "red"
+        console.print(
+            f"[{color}]{result.status}[/] {result.session_id} "
+            f"{escape(result.query[:50])} [dim]{result.seconds:.1f}s[/]"
+        )
+
+    set_node_output(verbose)
+    start = time.perf_counter()
+    try:
+        results = run_batch(config, queries, workers=workers, on_done=progress)
+    finally:
+        set_node_output(True)
+    elapsed = time.perf_counter() - start
+
+    table = Table(title="Batch")
+    table.add_column("#", style="cyan", width=4)
+    table.add_column("Session", style="cyan")
+    table.add_column("Query", style="green")
+    table.add_column("Status", style="yellow")
+    table.add_column("Findings", justify="right")
+    table.add_column("Searches", justify="right")
+    table.add_column("Time, s", justify="right")
+
+    for r in results:
+        status = r.status if r.error is None else f"{r.status}: {escape(r.error[:40])}"
+        table.add_row(str(r.index + 1), r.session_id, escape(r.query[:40]), status,
+                      str(r.findings), str(r.search_calls), f"{r.seconds:.1f}")
+
+    console.print(table)
+    failed = sum(r.status == "failed" for r in results)
+    busy = sum(r.seconds for r in results)
+    console.print(
+        f"Всего: {elapsed:.1f}s, сумма по сессиям: {busy:.1f}s, "
+        f"{len(results) / elapsed * 60:.1f} сессий/мин"
+        + (f", [red]ошибок: {failed}[/]" if failed else "")
+    )
+    print_throttle_stats()
+    if failed:
+        raise typer.Exit(1)
 
 
 @app.command()
 def list(
     status: Optional[str] = typer.Option(None, "--status", help="Фильтр по статусу"),
+    limit: int = typer.Option(50, "--limit", min=1, help="Сессий на странице"),
+    after: Optional[str] = typer.Option(
+        None, "--after", help="ID последней сессии предыдущей страницы"
+    ),
 ):
     """Список сохраненных исследований."""
     config = get_config()
     storage = ResearchStorage(config.storage.db_path)
-    
-    sessions = storage.list_sessions(status)
-    
+
+    # Берем на одну сессию больше, чтобы понять, есть ли следующая страница
+    try:
+        sessions = storage.list_sessions(status, limit=limit + 1, after=after)
+    except ValueError as e:
+        console.print(f"[red]Ошибка:[/] {e}")
+        raise typer.Exit(1)
+    has_more = len(sessions) > limit
+    sessions = sessions[:limit]
+
     if not sessions:
         console.print("[yellow]Нет сохраненных исследований[/]")
         return
-    
+
     table = Table(title="Research Sessions")
     table.add_column("ID", style="cyan")
     table.add_column("Query", style="green")
     table.add_column("Status", style="yellow")
     table.add_column("Updated", style="dim")
-    
+
     for row in sessions:
         table.add_row(row[0], row[1][:40], row[2], row[4][:16])
-    
+
+    console.print(table)
+    if has_more:
+        console.print(f"[dim]Следующая страница: --after {sessions[-1][0]}[/]")
+
+
+@app.command()
+def stats(
+    period: str = typer.Option("day", "--period", help="Группировка: day, week или month"),
+    since: Optional[str] = typer.Option(None, "--since", help="Только сессии с даты (YYYY-MM-DD)"),
+    status: Optional[str] = typer.Option(None, "--status", help="Фильтр по статусу"),
+):
+    """Статистика исследований по периодам."""
+    config = get_config()
+    storage = ResearchStorage(config.storage.db_path)
+
+    try:
+        rows = storage.session_stats(period, since=since, status=status)
+    except ValueError as e:
+        console.print(f"[red]Ошибка:[/] {e}")
+        raise typer.Exit(1)
+
+    if not rows:
+        console.print("[yellow]Нет сохраненных исследований[/]")
+        return
+
+    table = Table(title=f"Research Stats ({period})")
+    table.add_column("Period", style="cyan")
+    for name in ("Sessions", "Completed", "Sources", "Search calls", "Tokens"):
+        table.add_column(name, justify="right")
+    for row in rows:
+        table.add_row(row.period, *(str(value) for value in row[1:]))
+    total = [sum(column) for column in zip(*(row[1:] for row in rows))]
+    table.add_section()
+    table.add_row("[bold]Total[/]", *(f"[bold]{value}[/]" for value in total))
+
+    console.print(table)
+
+
+@app.command()
+def search(
+    text: str = typer.Argument(..., help="Что искать"),
+    page: int = typer.Option(1, "--page", min=1, help="Номер страницы"),
+    limit: int = typer.Option(20, "--limit", min=1, help="Результатов на странице"),
+):
+    """Полнотекстовый поиск по источникам и отчетам прошлых исследований."""
+    config = get_config()
+    storage = ResearchStorage(config.storage.db_path)
+
+    # Берем на один результат больше, чтобы понять, есть ли следующая страница
+    hits = storage.search(text, limit=limit + 1, offset=(page - 1) * limit)
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+
+    if not hits:
+        console.print("[yellow]Ничего не найдено[/]")
+        return
+
+    table = Table(title=f"Поиск: {text} (страница {page})")
+    table.add_column("#", style="cyan", width=4)
+    table.add_column("Session", style="cyan")
+    table.add_column("Type", style="dim")
+    table.add_column("Title", style="green")
+    table.add_column("Snippet")
+
+    for i, hit in enumerate(hits, (page - 1) * limit + 1):
+        snippet = (
+            escape(hit.snippet)
+            .replace(HIGHLIGHT_START, "[bold yellow]")
+            .replace(HIGHLIGHT_END, "[/]")
+        )
+        title = escape(hit.title[:50])
+        if hit.url:
+            title += f"\n[dim]{escape(hit.url)}[/]"
+        table.add_row(str(i), hit.session_id, hit.kind, title, snippet)
+
     console.print(table)
+    if has_more:
+        console.print(f"[dim]Следующая страница: --page {page + 1}[/]")
+
+
+@app.command()
+def export(
+    path: str = typer.Argument(..., help="Файл выгрузки (NDJSON, gzip)"),
+    session: Optional[List[str]] = typer.Option(
+        None, "--session", "-s", help="ID сессии (можно несколько)"
+    ),
+    status: Optional[str] = typer.Option(None, "--status", help="Фильтр по статусу"),
+):
+    """Выгружает сессии, источники и полные тексты страниц в сжатый файл."""
+    from deep_research.archive import export_sessions
+
+    config = get_config()
+    result = export_sessions(config.storage.db_path, path, session, status)
+    console.print(
+        f"[green]Выгружено:[/] {result.sessions} сессий, {result.findings} источников, "
+        f"{result.blobs} текстов → {path}"
+    )
+
+
+@app.command("import")
+def import_(
+    path: str = typer.Argument(..., help="Файл, созданный командой export"),
+):
+    """Загружает сессии из файла export; сессии с теми же ID заменяются."""
+    from deep_research.archive import import_sessions
+
+    config = get_config()
+    try:
+        result = import_sessions(config.storage.db_path, path)
+    except (OSError, ValueError) as e:
+        console.print(f"[red]Ошибка:[/] {e}")
+        raise typer.Exit(1)
+    console.print(
+        f"[green]Загружено:[/] {result.sessions} сессий, {result.findings} источников, "
+        f"{result.blobs} текстов"
+    )
 
 
 @app.command()
 def resume(
     session_id: str = typer.Argument(..., help="ID сессии для продолжения"),
+    interactive: bool = typer.Option(True, "--interactive/--auto", help="Интерактивный режим"),
+    profile: bool = typer.Option(False, "--profile", help="Chrome trace и сводка времени по нодам"),
 ):
-    """Продолжает сохраненное исследование."""
+    """Продолжает сохраненное исследование с последней завершенной ноды."""
     config = get_config()
+    config.ui.interactive = interactive
+
+    # Статус и наличие чекпоинтов проверяются без загрузки графа
     storage = ResearchStorage(config.storage.db_path)
-    
-    state = storage.load_session(session_id)
-    if not state:
+    info = storage.session_info(session_id)
+    if info is None:
         console.print(f"[red]Сессия {session_id} не найдена[/]")
         raise typer.Exit(1)
-    
+    if info.status in ("completed", "cancelled"):
+        console.print(f"[yellow]Сессия {session_id} уже завершена ({info.status})[/]")
+        return
+
+    if info.checkpointed:
+        from deep_research.checkpoint import SqliteCheckpointer
+
+        checkpoint = SqliteCheckpointer(config.storage.db_path).get_tuple(
+            {"configurable": {"thread_id": session_id}}
+        )
+        values = checkpoint.checkpoint["channel_values"]
+        if values.get("status") in ("completed", "cancelled"):
+            console.print(f"[yellow]Сессия {session_id} уже завершена ({values['status']})[/]")
+            return
+        console.print(f"[bold]Возобновление:[/] {values.get('query', '')}")
+        console.print(f"[dim]Чекпоинт: {checkpoint.config['configurable']['checkpoint_id']}[/]")
+        run_graph(config, None, session_id, profile)
+        return
+
+    # Сессия без чекпоинтов: начинаем граф с сохраненного состояния,
+    # план и пройденные шаги не повторяются
+    state = storage.load_session(session_id)
     console.print(f"[bold]Возобновление:[/] {state.query}")
-    # TODO: Реализовать продолжение
-    console.print("[yellow]Пока не реализовано[/]")
+    run_graph(config, state, session_id, profile)
 
 
 def main():
@@ -2,7 +2,7 @@
 
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 
 import toml
 from pydantic import BaseModel, Field, validator
@@ -12,12 +12,57 @@ class LLMConfig(BaseModel):
     provider: str = Field(default="openai")
     model: str = Field(default="gpt-4o-mini")
     api_key: str = Field(default="")
+    base_url: str = Field(default="")  # пусто — официальный API; для local обязателен
+    temperature: float = Field(default=0.0)
+    max_tokens: int = Field(default=512)
+    # Кэш ответов в БД сессий по хэшу промпта
+    cache_enabled: bool = Field(default=True)
+    cache_max_entries: int = Field(default=5000)
+    # Параллельных запросов в одном пакете
+    max_concurrency: int = Field(default=4)
+    # Краткие выжимки источников и обзор в отчете
+    summarize: bool = Field(default=True)
 
 
 class SearchConfig(BaseModel):
     tavily_api_key: str = Field(default="")
+    tavily_base_url: str = Field(default="")  # пусто — официальный API
     max_results: int = Field(default=10)
     search_depth: str = Field(default="advanced")
+    # Источники поиска (реестр deep_research.search); опрашиваются параллельно
+    sources: List[str] = Field(default_factory=lambda: ["tavily"])
+    # Дедлайны одного запроса: на источник (можно задать по источникам)
+    # и общий — что пришло к нему, то и попадает в шаг
+    source_timeout: float = Field(default=20.0, gt=0)
+    source_timeouts: Dict[str, float] = Field(default_factory=dict)
+    step_deadline: float = Field(default=30.0, gt=0)
+    # Повторный запрос к источнику, не ответившему за столько секунд (0 — выкл.)
+    hedge_after: float = Field(default=0.0, ge=0)
+    # Параллельный поиск всех шагов плана в автоматическом режиме
+    parallel: bool = Field(default=True)
+    max_concurrency: int = Field(default=4, ge=1)
+    # Общий лимит одновременных запросов к API на процесс (все сессии);
+    # при ответах 429/5xx он временно снижается (AIMD)
+    global_concurrency: int = Field(default=8, ge=1)
+    # Token bucket на бэкенд: запросов в секунду (0 — без лимита) и всплеск
+    rate_limit: float = Field(default=0.0, ge=0)
+    rate_burst: int = Field(default=5, ge=1)
+    # Повторы временных ошибок: экспоненциальная задержка с джиттером
+    retry_deadline: float = Field(default=30.0, ge=0)  # секунды на вызов
+    retry_base_delay: float = Field(default=0.5, gt=0)
+    retry_max_delay: float = Field(default=8.0, gt=0)
+    # Кэш результатов поиска (в той же SQLite БД)
+    cache_enabled: bool = Field(default=True)
+    cache_ttl: int = Field(default=86400)  # секунды, 0 — без срока
+    cache_max_entries: int = Field(default=1000, ge=1)
+    # Слияние дубликатов источников (по URL и по SimHash текста)
+    dedup_enabled: bool = Field(default=True)
+    dedup_similarity: float = Field(default=0.95, gt=0, le=1)
+    # Источники похожих шагов прошлых сессий вместо живого поиска
+    reuse_enabled: bool = Field(default=True)
+    reuse_similarity: float = Field(default=0.8, gt=0, le=1)  # оценка Жаккара по словам
+    reuse_min_findings: int = Field(default=5, ge=1)  # меньше — дополняем живым поиском
+    reuse_max_age: int = Field(default=604800, ge=0)  # секунды, 0 — без срока
 
 
 class StorageConfig(BaseModel):
@@ -27,6 +72,19 @@ class StorageConfig(BaseModel):
 class OutputConfig(BaseModel):
     format: str = Field(default="both")
     save_path: str = Field(default="outputs/")
+    # Сколько лучших источников попадает в отчет
+    top_k: int = Field(default=15, ge=1)
+    # Вес BM25 относительно score провайдера при переранжировании (0-1)
+    rerank_weight: float = Field(default=0.5, ge=0.0, le=1.0)
+    # Цитата в записи отчета: столько лучших пассажей полного текста
+    # (0 - начало сниппета, как раньше) и длина пассажа в символах
+    excerpt_passages: int = Field(default=2, ge=0)
+    passage_chars: int = Field(default=400, ge=50)
+
+
+class BatchConfig(BaseModel):
+    # Сколько сессий выполняется одновременно в режиме batch
+    workers: int = Field(default=4, ge=1)
 
 
 class UIConfig(BaseModel):
@@ -38,6 +96,7 @@ class Config(BaseModel):
     search: SearchConfig = Field(default_factory=SearchConfig)
     storage: StorageConfig = Field(default_factory=StorageConfig)
     output: OutputConfig = Field(default_factory=OutputConfig)
+    batch: BatchConfig = Field(default_factory=BatchConfig)
     ui: UIConfig = Field(default_factory=UIConfig)
     
     @validator("search")
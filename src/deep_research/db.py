@@ -0,0 +1,269 @@
+"""Управление соединениями SQLite.
+
+Один `Engine` на файл БД в процессе: WAL-журнал, настроенные pragma,
+читающие соединения (по одному на поток, закрываются при завершении
+потока) и единственный фоновый писатель. Все записи идут через очередь
+писателя и группируются в общие транзакции, поэтому параллельные сессии
+не блокируют друг друга, а читатели никогда не ждут писателя.
+"""
+
+import atexit
+import hashlib
+import queue
+import sqlite3
+import threading
+import weakref
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+WriteFn = Callable[[sqlite3.Connection], Any]
+
+# Pragma для всех соединений: WAL допускает читателей параллельно с писателем
+PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",  # 16 МБ
+    "PRAGMA mmap_size=268435456",  # 256 МБ
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Сколько заданий писатель объединяет в одну транзакцию
+MAX_BATCH = 256
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class _Reader:
+    """Соединение потока в thread-local.
+
+    Когда поток завершается, его thread-local очищается, объект
+    собирается и соединение закрывается: короткоживущие потоки пулов
+    не копят открытые соединения, mmap и дескрипторы.
+    """
+
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+class Engine:
+    """Соединения и фоновый писатель для одного файла БД."""
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._writer_conn = _connect(self.db_path)
+        self._writer_conn.execute("PRAGMA journal_mode=WAL")
+
+        self._local = threading.local()
+        # Открытые соединения читателей: id -> соединение
+        self._readers: Dict[int, sqlite3.Connection] = {}
+        self._readers_lock = threading.Lock()
+
+        self._schemas: Set[str] = set()
+        self._schemas_lock = threading.Lock()
+
+        # Вызываются в `close`, пока писатель еще принимает записи
+        self._close_hooks: List[Callable[[], None]] = []
+        self._close_lock = threading.Lock()
+
+        self._queue: "queue.Queue[Optional[Tuple[WriteFn, Future, bool]]]" = queue.Queue()
+        self._closed = False
+        self._writer = threading.Thread(
+            target=self._run_writer, name=f"sqlite-writer:{self.db_path.name}", daemon=True
+        )
+        self._writer.start()
+
+    # --- чтение ---
+
+    def reader(self) -> sqlite3.Connection:
+        """Читающее соединение текущего потока."""
+        reader = getattr(self._local, "reader", None)
+        if reader is None:
+            if self._closed:
+                raise RuntimeError(f"Storage engine for {self.db_path} is closed")
+            reader = _Reader(_connect(self.db_path))
+            self._local.reader = reader
+            with self._readers_lock:
+                self._readers[id(reader.conn)] = reader.conn
+            weakref.finalize(reader, self._release_reader, reader.conn)
+        return reader.conn
+
+    def _release_reader(self, conn: sqlite3.Connection) -> None:
+        with self._readers_lock:
+            self._readers.pop(id(conn), None)
+        conn.close()
+
+    def open_readers(self) -> int:
+        """Число открытых соединений читателей."""
+        with self._readers_lock:
+            return len(self._readers)
+
+    # --- запись ---
+
+    def submit(self, fn: WriteFn, transactional: bool = True) -> Future:
+        """Ставит запись в очередь писателя, не дожидаясь выполнения.
+
+        После закрытия движка бросает RuntimeError: задание за маркером
+        остановки писатель уже не выполнит.
+        """
+        future: Future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError(f"Storage engine for {self.db_path} is closed")
+            self._queue.put((fn, future, transactional))
+        return future
+
+    def write(self, fn: WriteFn) -> Any:
+        """Выполняет запись и ждет фиксации транзакции."""
+        return self.submit(fn).result()
+
+    def ensure_schema(self, script: str) -> None:
+        """Применяет DDL-скрипт один раз за время жизни процесса."""
+        digest = hashlib.sha1(script.encode("utf-8")).hexdigest()
+        self.run_once(digest, lambda conn: conn.executescript(script))
+
+    def run_once(self, key: str, fn: WriteFn) -> None:
+        """Выполняет `fn` вне транзакции писателем, один раз на ключ."""
+        with self._schemas_lock:
+            if key in self._schemas:
+                return
+            self.submit(fn, transactional=False).result()
+            self._schemas.add(key)
+
+    def _run_writer(self) -> None:
+        conn = self._writer_conn
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            stop = False
+            while len(batch) < MAX_BATCH:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+
+            self._execute_batch(conn, batch)
+            if stop:
+                break
+
+    def _execute_batch(self, conn: sqlite3.Connection, batch: list) -> None:
+        """Выполняет пачку заданий в одной транзакции (group commit)."""
+        pending: List[Tuple[WriteFn, Future, bool]] = []
+
+        for fn, future, transactional in batch:
+            if transactional:
+                pending.append((fn, future, transactional))
+                continue
+            # DDL и прочее вне транзакции выполняем сразу, сохранив порядок
+            self._execute_transaction(conn, pending)
+            pending = []
+            try:
+                future.set_result(fn(conn))
+            except BaseException as e:
+                future.set_exception(e)
+
+        self._execute_transaction(conn, pending)
+
+    @staticmethod
+    def _execute_transaction(conn: sqlite3.Connection, jobs: list) -> None:
+        if not jobs:
+            return
+        results: List[Tuple[Future, Any, Optional[BaseException]]] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, future, _ in jobs:
+                # Ошибка одного задания откатывает только его
+                conn.execute("SAVEPOINT job")
+                try:
+                    result = fn(conn)
+                except BaseException as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    results.append((future, None, e))
+                else:
+                    conn.execute("RELEASE job")
+                    results.append((future, result, None))
+            conn.execute("COMMIT")
+        except BaseException as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, future, _ in jobs:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    # --- завершение ---
+
+    def on_close(self, hook: Callable[[], None]) -> None:
+        """Регистрирует сброс отложенных записей перед закрытием движка."""
+        with self._close_lock:
+            self._close_hooks.append(hook)
+
+    def close(self) -> None:
+        """Сбрасывает отложенные записи, дожидается очереди и закрывает соединения."""
+        if self._closed:
+            return
+        with self._close_lock:
+            hooks, self._close_hooks = self._close_hooks, []
+        for hook in hooks:
+            hook()
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._writer.join()
+        self._writer_conn.close()
+        with self._readers_lock:
+            readers, self._readers = list(self._readers.values()), {}
+        for conn in readers:
+            conn.close()
+
+
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(db_path: str) -> Engine:
+    """Возвращает общий для процесса движок для файла БД."""
+    key = str(Path(db_path).resolve())
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None or engine._closed:
+            engine = Engine(db_path)
+            _engines[key] = engine
+        return engine
+
+
+def close_engines() -> None:
+    """Закрывает все движки; вызывается при выходе из процесса."""
+    with _engines_lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for engine in engines:
+        engine.close()
+
+
+atexit.register(close_engines)
@@ -0,0 +1,182 @@
+"""Удаление точных и почти-дубликатов среди найденных источников.
+
+Точные дубликаты ищутся по каноническому URL (хэш-индекс), почти-дубликаты
+— по 64-битному SimHash текста. Для SimHash используется разбиение на
+полосы: если расстояние Хэмминга не больше `k`, то по принципу Дирихле
+хотя бы одна из `k + 1` полос совпадает точно, поэтому кандидаты ищутся
+словарем по полосам, а не перебором всех источников.
+"""
+
+import hashlib
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from deep_research.state import Finding, FindingList
+
+SIMHASH_BITS = 64
+
+# Для подписи достаточно начала текста: синдицированные копии совпадают
+# целиком, а стоимость SimHash линейна по длине
+MAX_SIGNATURE_CHARS = 4000
+
+# Параметры URL, не влияющие на содержимое страницы
+TRACKING_PARAMS = {"fbclid", "gclid", "yclid", "mc_cid", "mc_eid", "ref", "ref_src"}
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def canonical_url(url: str) -> str:
+    """Приводит URL к каноническому виду для сравнения."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "http"
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    port = parts.port
+    if port and (scheme, port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{port}"
+
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    # http и https считаем одним адресом
+    return urlunsplit(("", host, path, urlencode(query), ""))
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str, shingle: int = 3) -> Optional[int]:
+    """64-битный SimHash по словесным шинглам текста."""
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return None
+    if len(words) < shingle:
+        tokens = [" ".join(words)]
+    else:
+        tokens = [" ".join(words[i:i + shingle]) for i in range(len(words) - shingle + 1)]
+
+    # Подсчет единиц по каждому биту через срезы строки — без цикла по битам
+    # для каждого шингла
+    bits = "".join(format(_token_hash(token), "064b") for token in tokens)
+    half = len(tokens) / 2
+    value = 0
+    for bit in range(SIMHASH_BITS):
+        if bits[bit::SIMHASH_BITS].count("1") > half:
+            value |= 1 << (SIMHASH_BITS - 1 - bit)
+    return value
+
+
+def _finding_text(finding: Finding) -> str:
+    text = finding.get_raw_content(cache=False) or finding.content
+    return text[:MAX_SIGNATURE_CHARS]
+
+
+def _origin(finding: Finding) -> Dict[str, object]:
+    origin = {"url": finding.url, "source": finding.source, "score": finding.score}
+    if "query" in finding.metadata:
+        origin["query"] = finding.metadata["query"]
+    return origin
+
+
+class DedupIndex:
+    """Индекс источников сессии для поиска дубликатов за O(1)."""
+
+    def __init__(self, similarity: float = 0.95):
+        self.max_distance = max(0, int((1.0 - similarity) * SIMHASH_BITS))
+        bands = self.max_distance + 1
+        width = SIMHASH_BITS // bands
+        self._bands: List[Tuple[int, int]] = [
+            (i * width, width if i < bands - 1 else SIMHASH_BITS - i * width)
+            for i in range(bands)
+        ]
+        self._urls: Dict[str, int] = {}
+        self._band_index: List[Dict[int, List[int]]] = [{} for _ in self._bands]
+        self._hashes: Dict[int, int] = {}
+        self.size = 0
+        # Сравнений SimHash с кандидатами: не растет с числом источников
+        self.comparisons = 0
+
+    def _band_keys(self, value: int) -> List[int]:
+        return [(value >> offset) & ((1 << width) - 1) for offset, width in self._bands]
+
+    def find(self, finding: Finding) -> Tuple[Optional[int], str, Optional[int]]:
+        """Ищет дубликат: (позиция или None, канонический URL, SimHash)."""
+        url = canonical_url(finding.url)
+        if url in self._urls:
+            return self._urls[url], url, None
+
+        value = simhash(_finding_text(finding))
+        if value is not None:
+            seen = set()
+            for band, key in zip(self._band_index, self._band_keys(value)):
+                for position in band.get(key, ()):
+                    if position in seen:
+                        continue
+                    seen.add(position)
+                    self.comparisons += 1
+                    if bin(self._hashes[position] ^ value).count("1") <= self.max_distance:
+                        return position, url, value
+        return None, url, value
+
+    def add(self, position: int, url: str, value: Optional[int]) -> None:
+        """Регистрирует источник на позиции `position`."""
+        self._urls.setdefault(url, position)
+        if value is not None:
+            self._hashes[position] = value
+            for band, key in zip(self._band_index, self._band_keys(value)):
+                band.setdefault(key, []).append(position)
+        self.size += 1
+
+
+def merge_finding(kept: Finding, duplicate: Finding) -> None:
+    """Сливает дубликат в сохраняемый источник.
+
+    Источник сохраняет свой URL и текст, получает лучший из двух score,
+    а все адреса, где встретился материал, попадают в `metadata["origins"]`.
+    """
+    origins = kept.metadata.setdefault("origins", [_origin(kept)])
+    origins.append(_origin(duplicate))
+    kept.score = max(kept.score, duplicate.score)
+
+
+def get_index(findings: FindingList, similarity: float = 0.95) -> DedupIndex:
+    """Индекс, привязанный к списку источников сессии.
+
+    Строится один раз (например, после загрузки сессии из БД) и затем
+    обновляется инкрементально.
+    """
+    index = getattr(findings, "_dedup_index", None)
+    if index is None or index.size != len(findings):
+        index = DedupIndex(similarity)
+        for position, finding in enumerate(findings):
+            _, url, value = index.find(finding)
+            index.add(position, url, value)
+        findings._dedup_index = index
+    return index
+
+
+def add_unique(
+    findings: FindingList, new: List[Finding], similarity: float = 0.95
+) -> List[Finding]:
+    """Добавляет в `findings` только новые источники.
+
+    Дубликаты (в том числе внутри `new`) сливаются с уже имеющимися
+    источниками. Возвращает список действительно добавленных.
+    """
+    index = get_index(findings, similarity)
+    added = []
+    for finding in new:
+        position, url, value = index.find(finding)
+        if position is not None:
+            # Выданный по индексу источник записывается обратно при сохранении
+            merge_finding(findings[position], finding)
+            continue
+        index.add(len(findings), url, value)
+        findings.append(finding)
+        added.append(finding)
+    return added
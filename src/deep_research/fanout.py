@@ -0,0 +1,173 @@
+"""Параллельный опрос нескольких поисковых источников.
+
+`FanOutSearch` отправляет запрос во все включенные источники сразу и
+ждет их не дольше дедлайнов: своего для каждого источника и общего на
+запрос. Что успело прийти к дедлайну, возвращается сразу; опоздавшие
+вызовы дорабатывают в фоне, их результат отбрасывается. Время шага
+ограничено дедлайном, а не самым медленным источником.
+
+Хеджирование: если источник не ответил за `hedge_after` секунд, тот же
+запрос отправляется повторно и берется первый из двух ответов.
+
+У каждого источника свой ограниченный пул потоков: зависшие вызовы
+одного источника не занимают потоки остальных, а повторный запрос не
+отправляется, когда пул источника и так заполнен.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from deep_research import tracing
+from deep_research.search import SearchBackend
+from deep_research.state import Finding
+
+# Потоки пула одного источника по умолчанию: запросы всех шагов плана
+# и сессий, включая опоздавшие вызовы, которые еще дорабатывают в фоне
+POOL_SIZE = 8
+
+MissingCallback = Callable[[str, Dict[str, str]], None]
+
+
+class SearchUnavailable(RuntimeError):
+    """Ни один источник не ответил до дедлайна."""
+
+
+class SourcePool:
+    """Пул потоков одного источника с числом занятых вызовов."""
+
+    def __init__(self, name: str, size: int):
+        self.size = size
+        self.busy = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"fanout-{name}")
+
+    @property
+    def saturated(self) -> bool:
+        """Все потоки заняты: новый вызов встанет в очередь."""
+        with self._lock:
+            return self.busy >= self.size
+
+    def submit(self, fn: Callable, *args) -> Future:
+        with self._lock:
+            self.busy += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _: Future) -> None:
+        with self._lock:
+            self.busy -= 1
+
+
+_pools: Dict[Tuple[str, int], SourcePool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_source_pool(name: str, size: int = POOL_SIZE) -> SourcePool:
+    """Общий для процесса пул источника `name` на `size` потоков."""
+    key = (name, size)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = SourcePool(name, size)
+        return pool
+
+
+class FanOutSearch:
+    """Поиск по нескольким источникам с дедлайнами и частичными результатами.
+
+    Результаты объединяются в порядке `backends`. Источники без ответа
+    (таймаут или ошибка) передаются в `on_missing(query, {name: причина})`;
+    если не ответил ни один, поднимается SearchUnavailable.
+    """
+
+    def __init__(
+        self,
+        backends: Sequence[Tuple[str, SearchBackend]],
+        source_timeout: float = 20.0,
+        deadline: float = 30.0,
+        hedge_after: float = 0.0,
+        source_timeouts: Optional[Dict[str, float]] = None,
+        on_missing: Optional[MissingCallback] = None,
+        pool_size: int = POOL_SIZE,
+    ):
+        self.backends = list(backends)
+        self.pools = {name: get_source_pool(name, pool_size) for name, _ in self.backends}
+        self.source_timeout = source_timeout
+        self.source_timeouts = source_timeouts or {}
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self.on_missing = on_missing
+
+    def search(self, query: str) -> List[Finding]:
+        """Опрашивает все источники и возвращает то, что пришло к дедлайну."""
+        start = time.monotonic()
+        limits = {
+            name: start + min(self.source_timeouts.get(name, self.source_timeout), self.deadline)
+            for name, _ in self.backends
+        }
+        hedge_at = start + self.hedge_after if self.hedge_after > 0 else None
+
+        pools = self.pools
+        call = tracing.bind(lambda backend: backend.search(query))
+        pending: Dict[Future, str] = {
+            pools[name].submit(call, backend): name for name, backend in self.backends
+        }
+        hedged = set()
+        results: Dict[str, List[Finding]] = {}
+        missing: Dict[str, str] = {}
+
+        while pending:
+            now = time.monotonic()
+            for future, name in list(pending.items()):
+                if now >= limits[name]:
+                    del pending[future]
+                    missing[name] = "timeout"
+            if not pending:
+                break
+
+            wake = min(limits[name] for name in pending.values())
+            unhedged = hedge_at is not None and any(n not in hedged for n in pending.values())
+            if unhedged:
+                wake = min(wake, max(hedge_at, now))
+            done, _ = wait(pending, timeout=wake - now, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = pending.pop(future)
+                if name in results:
+                    continue
+                error = future.exception()
+                if error is None:
+                    results[name] = future.result()
+                    missing.pop(name, None)
+                    # Второй (хеджированный) вызов больше не нужен
+                    for other in [f for f, n in pending.items() if n == name]:
+                        other.cancel()
+                        del pending[other]
+                elif not isinstance(error, Exception):
+                    raise error  # KeyboardInterrupt и т.п. не глотаем
+                elif name not in pending.values():
+                    missing[name] = str(error) or type(error).__name__
+
+            if unhedged and time.monotonic() >= hedge_at:
+                for name, backend in self.backends:
+                    if name not in hedged and name in pending.values():
+                        hedged.add(name)
+                        # В заполненном пуле повтор ждал бы в очереди и
+                        # только добавил бы нагрузку на источник
+                        if not pools[name].saturated:
+                            pending[pools[name].submit(call, backend)] = name
+
+        if not results:
+            raise SearchUnavailable(
+                "; ".join(f"{name}: {reason}" for name, reason in missing.items())
+            )
+        if missing and self.on_missing is not None:
+            self.on_missing(query, missing)
+
+        findings: List[Finding] = []
+        for name, _ in self.backends:
+            findings.extend(results.get(name, ()))
+        return findings
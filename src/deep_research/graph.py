@@ -3,11 +3,13 @@
 from typing import Literal
 
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 
 from deep_research.state import ResearchState
 from deep_research.config import Config
 from deep_research.nodes import plan_node, search_node, analyze_node, report_node
+from deep_research.checkpoint import SqliteCheckpointer
+from deep_research.storage import ResearchStorage
+from deep_research import tracing
 
 
 def should_continue(state: ResearchState) -> Literal["search", "report"]:
@@ -19,18 +21,30 @@ def should_continue(state: ResearchState) -> Literal["search", "report"]:
     return "search"
 
 
+def traced(name: str, node, config: Config):
+    """Оборачивает ноду трассировкой; метрики сразу пишутся в строку сессии."""
+    storage = ResearchStorage(config.storage.db_path)
+
+    def run(state: ResearchState) -> ResearchState:
+        with tracing.node_span(name, state):
+            result = node(state, config)
+        storage.save_metrics(state)
+        return result
+
+    return run
+
+
 def create_research_graph(config: Config):
     """Создает и возвращает скомпилированный граф."""
     
     # Создаем граф
     workflow = StateGraph(ResearchState)
     
-    # Добавляем ноды
-    # Используем lambda для передачи config в ноды
-    workflow.add_node("plan", lambda state: plan_node(state, config))
-    workflow.add_node("search", lambda state: search_node(state, config))
-    workflow.add_node("analyze", lambda state: analyze_node(state, config))
-    workflow.add_node("report", lambda state: report_node(state, config))
+    # Добавляем ноды: config передается через обертку с трассировкой
+    workflow.add_node("plan", traced("plan", plan_node, config))
+    workflow.add_node("search", traced("search", search_node, config))
+    workflow.add_node("analyze", traced("analyze", analyze_node, config))
+    workflow.add_node("report", traced("report", report_node, config))
     
     # Добавляем edges
     workflow.set_entry_point("plan")
@@ -49,8 +63,8 @@ def create_research_graph(config: Config):
     
     workflow.add_edge("report", END)
     
-    # Компилируем с памятью (для MVP используем in-memory, позже SQLite)
-    memory = MemorySaver()
-    app = workflow.compile(checkpointer=memory)
+    # Чекпоинты в той же SQLite БД: сессию можно продолжить после сбоя
+    checkpointer = SqliteCheckpointer(config.storage.db_path)
+    app = workflow.compile(checkpointer=checkpointer)
     
     return app
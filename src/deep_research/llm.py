@@ -0,0 +1,391 @@
+"""LLM клиент: провайдеры, кэш ответов, пакетные запросы и учет токенов.
+
+`LLMClient` — единая точка вызова LLM из нод графа:
+
+- ответы кэшируются в SQLite по хэшу (провайдер, модель, параметры,
+  system, prompt), повторный запрос не идет к API и не тратит токены;
+- `complete_many` отправляет независимые промпты одним пакетом
+  (промахи кэша — одним вызовом провайдера с ограничением параллелизма);
+- `stream` отдает текст по мере генерации;
+- токены запроса и ответа берутся из usage провайдера и через
+  `tracing.add(tokens=...)` попадают в `ResearchState.total_tokens`.
+
+Провайдеры регистрируются в реестре по имени `llm.provider`. OpenAI,
+Anthropic и локальные OpenAI-совместимые серверы работают через чат-модели
+LangChain (импортируются при первом вызове). Провайдер `fake` —
+детерминированный и офлайн, для тестов и бенчмарков.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Protocol, Sequence, Tuple
+
+from deep_research import tracing
+from deep_research.config import Config, LLMConfig
+from deep_research.db import get_engine
+
+
+class Completion(NamedTuple):
+    """Ответ (или кусок потока) модели с числом токенов."""
+
+    text: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+# (system, prompt)
+Request = Tuple[str, str]
+
+
+class LLMProvider(Protocol):
+    """Интерфейс провайдера LLM."""
+
+    name: str
+    model: str
+
+    def generate(self, requests: Sequence[Request], max_concurrency: int) -> List[Completion]:
+        """Ответы на независимые запросы в том же порядке."""
+        ...
+
+    def stream(self, system: str, prompt: str) -> Iterator[Completion]:
+        """Куски ответа; usage приходит в одном из кусков (обычно последнем)."""
+        ...
+
+
+class LLMNotConfigured(RuntimeError):
+    """Провайдер LLM не настроен (нет ключа API или адреса сервера)."""
+
+
+# --- кэш ответов ---
+
+
+class LLMCache:
+    """Кэш ответов LLM в SQLite с LRU-вытеснением.
+
+    Хранится в той же БД, что и сессии, и переживает перезапуск процесса.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            prompt_tokens INTEGER NOT NULL,
+            completion_tokens INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed
+            ON llm_cache(accessed_at);
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 5000):
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+        self.engine = get_engine(db_path)
+        self.engine.ensure_schema(self.SCHEMA)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Completion]:
+        """Закэшированные ответы для ключей, которые есть в кэше."""
+        if not keys:
+            return {}
+        rows = self.engine.reader().execute(
+            f"""SELECT key, response, prompt_tokens, completion_tokens FROM llm_cache
+                WHERE key IN ({",".join("?" * len(keys))})""",
+            list(keys),
+        ).fetchall()
+        found = {row[0]: Completion(*row[1:]) for row in rows}
+        if found:
+            # Время доступа для LRU обновляем без ожидания записи
+            params = [(time.time(), key) for key in found]
+            self.engine.submit(lambda conn: conn.executemany(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", params
+            ))
+        return found
+
+    def put_many(self, items: Dict[str, Completion]) -> None:
+        """Сохраняет ответы и вытесняет самые старые записи."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, c.text, c.prompt_tokens, c.completion_tokens, now, now)
+                for key, c in items.items()]
+        max_entries = self.max_entries
+
+        def write(conn):
+            conn.executemany("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)", rows)
+            conn.execute(
+                """DELETE FROM llm_cache WHERE key IN (
+                       SELECT key FROM llm_cache
+                       ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                   )""",
+                (max_entries,)
+            )
+
+        self.engine.write(write)
+
+
+# --- клиент ---
+
+
+class LLMClient:
+    """Вызовы LLM с кэшем, пакетами и учетом токенов."""
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        cache: Optional[LLMCache] = None,
+        max_concurrency: int = 4,
+        params: Optional[dict] = None,
+    ):
+        self.provider = provider
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        # Параметры генерации, влияющие на ответ (входят в ключ кэша)
+        self.params = params or {}
+
+    def _key(self, system: str, prompt: str) -> str:
+        raw = json.dumps([self.provider.name, self.provider.model, self.params, system, prompt],
+                         ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def complete(self, prompt: str, system: str = "") -> str:
+        """Ответ на один промпт."""
+        return self.complete_many([prompt], system)[0]
+
+    def complete_many(self, prompts: Sequence[str], system: str = "") -> List[str]:
+        """Ответы на независимые промпты в том же порядке.
+
+        Одинаковые промпты и ответы из кэша к провайдеру не отправляются,
+        остальные уходят одним пакетом.
+        """
+        keys = [self._key(system, prompt) for prompt in prompts]
+        unique = dict(zip(keys, prompts))
+        with tracing.span("llm", self.provider.name) as span:
+            results = self.cache.get_many(list(unique)) if self.cache is not None else {}
+            missing = [key for key in unique if key not in results]
+            if missing:
+                completions = self.provider.generate(
+                    [(system, unique[key]) for key in missing], self.max_concurrency
+                )
+                fresh = dict(zip(missing, completions))
+                if self.cache is not None:
+                    self.cache.put_many(fresh)
+                results.update(fresh)
+                span.add(tokens=sum(c.prompt_tokens + c.completion_tokens
+                                    for c in completions))
+            span.add(cache_hits=len(unique) - len(missing), cache_misses=len(missing))
+        return [results[key].text for key in keys]
+
+    def stream(self, prompt: str, system: str = "") -> Iterator[str]:
+        """Текст ответа по мере генерации; ответ из кэша отдается целиком."""
+        key = self._key(system, prompt)
+        cached = self.cache.get_many([key]).get(key) if self.cache is not None else None
+        if cached is not None:
+            with tracing.span("llm", self.provider.name) as span:
+                span.add(cache_hits=1)
+            yield cached.text
+            return
+
+        parts: List[str] = []
+        prompt_tokens = completion_tokens = 0
+        start = time.perf_counter()
+        for chunk in self.provider.stream(system, prompt):
+            prompt_tokens += chunk.prompt_tokens
+            completion_tokens += chunk.completion_tokens
+            if chunk.text:
+                parts.append(chunk.text)
+                yield chunk.text
+        # Span открывается после потока: между кусками управление у вызывающего
+        with tracing.span("llm", self.provider.name, stream_seconds=time.perf_counter() - start) \
+                as span:
+            span.add(tokens=prompt_tokens + completion_tokens, cache_misses=1)
+        if self.cache is not None:
+            self.cache.put_many({key: Completion("".join(parts), prompt_tokens, completion_tokens)})
+
+
+# --- провайдеры ---
+
+
+class ChatModelProvider:
+    """Провайдер поверх чат-модели LangChain (`batch`, `stream`, usage_metadata)."""
+
+    def __init__(self, name: str, model: str, chat):
+        self.name = name
+        self.model = model
+        self.chat = chat
+
+    @staticmethod
+    def _messages(system: str, prompt: str) -> list:
+        return ([("system", system)] if system else []) + [("human", prompt)]
+
+    @staticmethod
+    def _completion(message) -> Completion:
+        usage = getattr(message, "usage_metadata", None) or {}
+        content = message.content
+        if not isinstance(content, str):
+            # Ответ из блоков (Anthropic): берем текстовые
+            content = "".join(
+                block.get("text", "") if isinstance(block, dict) else str(block)
+                for block in content
+            )
+        return Completion(content, usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+
+    def generate(self, requests: Sequence[Request], max_concurrency: int) -> List[Completion]:
+        messages = [self._messages(system, prompt) for system, prompt in requests]
+        outputs = self.chat.batch(messages, config={"max_concurrency": max_concurrency})
+        return [self._completion(output) for output in outputs]
+
+    def stream(self, system: str, prompt: str) -> Iterator[Completion]:
+        for chunk in self.chat.stream(self._messages(system, prompt)):
+            yield self._completion(chunk)
+
+
+def _openai(config: LLMConfig) -> LLMProvider:
+    if not config.api_key:
+        raise LLMNotConfigured("OpenAI API key not configured (llm.api_key)")
+    from langchain_openai import ChatOpenAI
+
+    chat = ChatOpenAI(
+        model=config.model, api_key=config.api_key, base_url=config.base_url or None,
+        temperature=config.temperature, max_tokens=config.max_tokens, stream_usage=True,
+    )
+    return ChatModelProvider("openai", config.model, chat)
+
+
+def _local(config: LLMConfig) -> LLMProvider:
+    """OpenAI-совместимый локальный сервер (llama.cpp, vLLM, Ollama)."""
+    if not config.base_url:
+        raise LLMNotConfigured("Local LLM server not configured (llm.base_url)")
+    from langchain_openai import ChatOpenAI
+
+    chat = ChatOpenAI(
+        model=config.model, api_key=config.api_key or "local", base_url=config.base_url,
+        temperature=config.temperature, max_tokens=config.max_tokens, stream_usage=True,
+    )
+    return ChatModelProvider("local", config.model, chat)
+
+
+def _anthropic(config: LLMConfig) -> LLMProvider:
+    if not config.api_key:
+        raise LLMNotConfigured("Anthropic API key not configured (llm.api_key)")
+    try:
+        from langchain_anthropic import ChatAnthropic
+    except ImportError as e:
+        raise LLMNotConfigured("Provider 'anthropic' requires langchain-anthropic") from e
+
+    chat = ChatAnthropic(
+        model=config.model, api_key=config.api_key,
+        temperature=config.temperature, max_tokens=config.max_tokens,
+    )
+    return ChatModelProvider("anthropic", config.model, chat)
+
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def count_tokens(text: str) -> int:
+    """Токены fake-провайдера: слова и знаки препинания."""
+    return len(_TOKEN_RE.findall(text))
+
+
+def _fake_reply(system: str, prompt: str) -> str:
+    """Первые слова каждой строки последнего абзаца промпта."""
+    paragraphs = [p for p in prompt.strip().split("\n\n") if p.strip()]
+    lines = paragraphs[-1].splitlines() if paragraphs else []
+    return "\n".join(" ".join(line.split()[:24]) for line in lines if line.strip())
+
+
+class FakeLLM:
+    """Детерминированный офлайн провайдер.
+
+    Ответ строит `reply(system, prompt)`, токены считает `count_tokens`.
+    Запросы копятся в `calls` (по одному списку на вызов `generate`).
+    """
+
+    name = "fake"
+
+    def __init__(self, model: str = "fake", reply: Optional[Callable[[str, str], str]] = None,
+                 latency: float = 0.0):
+        self.model = model
+        self.reply = reply or _fake_reply
+        self.latency = latency
+        self.calls: List[List[Request]] = []
+        self._lock = threading.Lock()
+
+    def _complete(self, system: str, prompt: str) -> Completion:
+        text = self.reply(system, prompt)
+        return Completion(text, count_tokens(system) + count_tokens(prompt), count_tokens(text))
+
+    def generate(self, requests: Sequence[Request], max_concurrency: int) -> List[Completion]:
+        with self._lock:
+            self.calls.append(list(requests))
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._complete(system, prompt) for system, prompt in requests]
+
+    def stream(self, system: str, prompt: str) -> Iterator[Completion]:
+        with self._lock:
+            self.calls.append([(system, prompt)])
+        completion = self._complete(system, prompt)
+        words = re.split(r"(?<=\s)", completion.text)
+        for word in words[:-1]:
+            yield Completion(word)
+        yield Completion(words[-1], completion.prompt_tokens, completion.completion_tokens)
+
+
+ProviderFactory = Callable[[LLMConfig], LLMProvider]
+
+_providers: Dict[str, ProviderFactory] = {
+    "openai": _openai,
+    "anthropic": _anthropic,
+    "local": _local,
+    "fake": lambda config: FakeLLM(config.model),
+}
+
+
+def register_provider(name: str, factory: ProviderFactory) -> None:
+    """Регистрирует провайдера, выбираемого через `llm.provider`."""
+    _providers[name] = factory
+
+
+def get_provider(config: LLMConfig) -> LLMProvider:
+    """Провайдер по имени из реестра."""
+    factory = _providers.get(config.provider)
+    if factory is None:
+        raise ValueError(
+            f"Unknown LLM provider: {config.provider!r}. Available: {', '.join(sorted(_providers))}"
+        )
+    return factory(config)
+
+
+_clients: Dict[Tuple, LLMClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_llm_client(config: Config) -> Optional[LLMClient]:
+    """Общий для процесса клиент LLM или None, если провайдер не настроен.
+
+    Без LLM ноды работают по шаблонам, как раньше.
+    """
+    llm = config.llm
+    key = (llm.model_dump_json(), str(Path(config.storage.db_path).resolve()))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None or (client.cache is not None and client.cache.engine._closed):
+            try:
+                provider = get_provider(llm)
+            except LLMNotConfigured:
+                return None
+            cache = LLMCache(config.storage.db_path, llm.cache_max_entries) \
+                if llm.cache_enabled else None
+            client = LLMClient(
+                provider, cache, llm.max_concurrency,
+                params={"temperature": llm.temperature, "max_tokens": llm.max_tokens},
+            )
+            _clients[key] = client
+        return client
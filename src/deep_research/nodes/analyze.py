@@ -6,6 +6,7 @@ from rich.console import Console
 
 from deep_research.state import ResearchState
 from deep_research.config import Config
+from deep_research.storage import ResearchStorage
 
 console = Console()
 
@@ -49,4 +50,7 @@ def analyze_node(state: ResearchState, config: Config) -> ResearchState:
             state.status = "ready_for_report"
     
     state.updated_at = datetime.now()
+
+    # Промежуточное сохранение: пишутся только новые источники
+    ResearchStorage(config.storage.db_path).save_session(state)
     return state
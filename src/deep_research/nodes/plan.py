@@ -1,22 +1,52 @@
 """Нода планирования исследования."""
 
+import re
 import uuid
 from datetime import datetime
+from typing import List, Optional
 
 from rich.console import Console
 from rich.panel import Panel
 
 from deep_research.state import ResearchState
 from deep_research.config import Config
+from deep_research.llm import LLMClient, get_llm_client
 
 console = Console()
 
+PLAN_SYSTEM = (
+    "You plan web research. Reply with 3 to 5 search queries, one per line, "
+    "without explanations."
+)
+
+_NUMBERING = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+
+def default_plan(query: str) -> List[str]:
+    """План из 3 шагов по шаблону."""
+    return [
+        f"Обзор: основные концепции и определения по теме '{query}'",
+        f"Анализ: сравнение подходов и методологий",
+        f"Практика: реализации, код, кейсы использования"
+    ]
+
+
+def llm_plan(client: LLMClient, query: str) -> Optional[List[str]]:
+    """План от LLM: поисковые запросы по строкам ответа.
+
+    None, если в ответе меньше двух шагов.
+    """
+    reply = client.complete(f"Research topic:\n\n{query}", system=PLAN_SYSTEM)
+    steps = [_NUMBERING.sub("", line).strip() for line in reply.splitlines()]
+    steps = [step for step in steps if step][:5]
+    return steps if len(steps) >= 2 else None
+
 
 def plan_node(state: ResearchState, config: Config) -> ResearchState:
     """Генерирует план исследования.
     
-    Для MVP — простой план из 3 шагов.
-    В будущем здесь будет LLM для генерации интеллектуального плана.
+    С настроенным LLM шаги — поисковые запросы от модели, иначе (или при
+    непригодном ответе) — простой план из 3 шагов по шаблону.
     """
     # Если уже есть план — пропускаем
     if state.plan:
@@ -26,12 +56,15 @@ def plan_node(state: ResearchState, config: Config) -> ResearchState:
     if not state.session_id:
         state.session_id = str(uuid.uuid4())[:8]
     
-    # Простой план по умолчанию
-    state.plan = [
-        f"Обзор: основные концепции и определения по теме '{state.query}'",
-        f"Анализ: сравнение подходов и методологий",
-        f"Практика: реализации, код, кейсы использования"
-    ]
+    plan = None
+    try:
+        client = get_llm_client(config)
+        if client is not None:
+            plan = llm_plan(client, state.query)
+    except Exception as e:
+        # Ошибка провайдера (сеть, ключ, лимиты) не должна прерывать сессию
+        console.print(f"[yellow]LLM недоступен, план по шаблону: {e}[/]")
+    state.plan = plan or default_plan(state.query)
     
     # Показываем план пользователю
     console.print()
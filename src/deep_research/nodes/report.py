@@ -1,22 +1,122 @@
-"""Нода генерации отчета."""
+"""Нода генерации отчета.
+
+Отчет пишется в файлы потоково: Markdown по секциям, JSON — по одному
+источнику, поэтому пиковая память не растет с общим объемом источников.
+С `ReportCache` токены, фрагменты JSON и секции Markdown уже встречавшихся
+источников берутся из кэша, и повторная генерация обрабатывает только
+новые источники.
+
+С настроенным LLM в отчет добавляются выжимки источников (одним пакетом
+запросов) и обзор, который выводится в консоль по мере генерации.
+"""
 
 import json
 from datetime import datetime
 from pathlib import Path
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from rich.console import Console
 from rich.markdown import Markdown
 
-from deep_research.state import ResearchState
+from deep_research.state import Finding, ResearchState
 from deep_research.config import Config
 from deep_research.storage import ResearchStorage
+from deep_research.rerank import rank_score, top_findings
+from deep_research.report_cache import ReportCache, get_report_cache
+from deep_research.passages import PassageIndex, get_passage_index, select_excerpt
+from deep_research.llm import LLMClient, get_llm_client
 
 console = Console()
 
+# Сколько символов контента источника попадает в отчет, если цитата
+# из полного текста не выбрана
+EXCERPT_CHARS = 500
 
-def generate_markdown_report(state: ResearchState) -> str:
-    """Генерирует Markdown отчет."""
-    report = f"""# Research Report: {state.query}
+# Сколько символов контента источника уходит в промпт выжимки
+SUMMARY_INPUT_CHARS = 2000
+
+SUMMARY_SYSTEM = "Summarize the source in one or two sentences relevant to the research topic."
+OVERVIEW_SYSTEM = "Write a short overview of the research findings for the topic."
+
+
+def summarize_findings(client: LLMClient, state: ResearchState,
+                       top: List[Finding]) -> Dict[str, str]:
+    """Выжимки источников по URL; все промпты уходят одним пакетом."""
+    prompts = [
+        f"Topic: {state.query}\n\n{f.title}\n{f.content[:SUMMARY_INPUT_CHARS]}"
+        for f in top
+    ]
+    replies = client.complete_many(prompts, system=SUMMARY_SYSTEM)
+    return {f.url: reply.strip() for f, reply in zip(top, replies) if reply.strip()}
+
+
+def stream_overview(client: LLMClient, state: ResearchState, top: List[Finding]) -> str:
+    """Обзор исследования; текст выводится в консоль по мере генерации."""
+    prompt = f"Topic: {state.query}\n\n" + "\n".join(f"- {f.title}" for f in top)
+    parts = []
+    console.print("\n[bold]Обзор:[/]")
+    for chunk in client.stream(prompt, system=OVERVIEW_SYSTEM):
+        console.print(chunk, end="", markup=False, highlight=False)
+        parts.append(chunk)
+    console.print()
+    return "".join(parts).strip()
+
+
+def llm_sections(
+    state: ResearchState, config: Config, top: List[Finding]
+) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    """Выжимки источников и обзор от LLM, если он настроен и доступен.
+
+    Ошибка провайдера не мешает записать отчет: недостающие части
+    заменяются шаблонными.
+    """
+    summaries = overview = None
+    if not config.llm.summarize or not top:
+        return summaries, overview
+    try:
+        client = get_llm_client(config)
+        if client is None:
+            return summaries, overview
+        summaries = summarize_findings(client, state, top)
+        overview = stream_overview(client, state, top) or None
+    except Exception as e:
+        missing = "обзора" if summaries else "выжимок и обзора"
+        console.print(f"\n[yellow]LLM недоступен, отчет без {missing}: {e}[/]")
+    return summaries, overview
+
+
+def _excerpt(
+    state: ResearchState, f: Finding, passages: Optional[PassageIndex], count: int
+) -> str:
+    """Цитата источника: лучшие пассажи полного текста или начало сниппета."""
+    if passages is not None and count:
+        excerpt = select_excerpt(passages, f, f"{state.query} {f.metadata.get('query', '')}", count)
+        if excerpt:
+            return excerpt
+    return f.content[:EXCERPT_CHARS] + ("..." if len(f.content) > EXCERPT_CHARS else "")
+
+
+def iter_markdown_report(
+    state: ResearchState,
+    top: List[Finding],
+    passages: Optional[PassageIndex] = None,
+    excerpt_passages: int = 2,
+    summaries: Optional[Dict[str, str]] = None,
+    overview: Optional[str] = None,
+    cache: Optional[ReportCache] = None,
+) -> Iterator[str]:
+    """Секции Markdown отчета по очереди.
+
+    С индексом `passages` цитатой записи служат `excerpt_passages` лучших
+    по запросу и шагу плана пассажей полного текста источника.
+    `summaries` (выжимки по URL) и `overview` добавляются, если заданы.
+    С `cache` (после `select_top` с тем же кэшем) секции источников,
+    у которых не изменились номер, оценка и выжимка, берутся из кэша.
+    """
+    intro = overview or (
+        f"Исследование по теме \"{state.query}\" охватило {len(state.plan)} направления."
+    )
+    yield f"""# Research Report: {state.query}
 
 **Session ID:** {state.session_id}  
 **Generated:** {state.updated_at.strftime("%Y-%m-%d %H:%M")}  
@@ -24,29 +124,38 @@ def generate_markdown_report(state: ResearchState) -> str:
 
 ## Summary
 
-Исследование по теме "{state.query}" охватило {len(state.plan)} направления.
+{intro}
 
 ## Findings
 
 """
-    
-    # Группируем по релевантности
-    sorted_findings = sorted(state.findings, key=lambda x: x.score, reverse=True)
-    
-    for i, f in enumerate(sorted_findings[:15], 1):  # Топ-15
-        report += f"""### {i}. {f.title}
+
+    for i, f in enumerate(top, 1):
+        summary = (summaries or {}).get(f.url)
+        relevance = f"{rank_score(f):.3f}"
+
+        def render() -> str:
+            summary_line = f"- **Summary:** {summary}\n" if summary else ""
+            return f"""### {i}. {f.title}
 
 - **Source:** {f.source}
 - **URL:** {f.url}
-- **Relevance:** {f.score:.3f}
-
-{f.content[:500]}{"..." if len(f.content) > 500 else ""}
+- **Relevance:** {relevance}
+{summary_line}
+{_excerpt(state, f, passages, excerpt_passages)}
 
 ---
 
 """
-    
-    report += f"""## Raw Data
+
+        if cache is None:
+            yield render()
+            continue
+        inputs = (state.query, i, relevance, summary, excerpt_passages,
+                  passages.passage_chars if passages is not None else None)
+        yield cache.section(cache.top_positions[i - 1], inputs, render)
+
+    yield f"""## Raw Data
 
 ```json
 {json.dumps({
@@ -57,49 +166,126 @@ def generate_markdown_report(state: ResearchState) -> str:
 }, indent=2, ensure_ascii=False)}
 ```
 """
-    
-    return report
+
+
+def select_top(
+    state: ResearchState,
+    top_k: int = 15,
+    rerank_weight: float = 0.5,
+    cache: Optional[ReportCache] = None,
+) -> List[Finding]:
+    """Переранжирует источники сессии и выбирает `top_k` лучших.
+
+    С `cache` токенизируются только источники, которых нет в кэше, а если
+    источники не менялись, отбор берется готовым.
+    """
+    if cache is not None:
+        return cache.select(state.findings, state.query, top_k, rerank_weight)
+    return top_findings(state.findings, state.query, top_k, rerank_weight)
+
+
+def generate_markdown_report(
+    state: ResearchState, rerank_weight: float = 0.5, top_k: int = 15
+) -> str:
+    """Генерирует Markdown отчет."""
+    return "".join(iter_markdown_report(state, select_top(state, top_k, rerank_weight)))
+
+
+def _indented_json(value: object, indent: int) -> str:
+    text = json.dumps(value, indent=2, default=str, ensure_ascii=False)
+    return text.replace("\n", "\n" + " " * indent)
+
+
+def _finding_json(finding: Finding) -> str:
+    return _indented_json(finding.model_dump(), 4)
+
+
+def iter_json_report(
+    state: ResearchState, findings: Iterable[Finding], cache: Optional[ReportCache] = None
+) -> Iterator[str]:
+    """JSON состояния по частям; источники сериализуются по одному.
+
+    Результат совпадает с `json.dump(state.model_dump(), indent=2)`.
+    С `cache` (после `select_top` с тем же кэшем) фрагменты источников
+    берутся из кэша, а `findings` должен быть `state.findings`.
+    """
+    data = state.model_dump(exclude={"findings"})
+    fields = list(ResearchState.model_fields)
+    yield "{"
+    for n, name in enumerate(fields):
+        yield ("," if n else "") + f"\n  {json.dumps(name)}: "
+        if name != "findings":
+            yield _indented_json(data[name], 2)
+            continue
+        fragments = (
+            cache.json_fragments(state.findings, _finding_json) if cache is not None
+            else map(_finding_json, findings)
+        )
+        empty = True
+        for fragment in fragments:
+            yield ("[" if empty else ",") + "\n    " + fragment
+            empty = False
+        yield "[]" if empty else "\n  ]"
+    yield "\n}"
+
+
+def write_report(chunks: Iterable[str], out: IO[str]) -> None:
+    """Пишет части отчета в файл по мере генерации."""
+    for chunk in chunks:
+        out.write(chunk)
 
 
 def report_node(state: ResearchState, config: Config) -> ResearchState:
     """Генерирует и сохраняет отчет."""
-    
+
     if state.status == "cancelled":
         return state
-    
+
     console.print("\n[bold green]Генерация отчета...[/]")
-    
-    # Генерируем отчет
-    report_md = generate_markdown_report(state)
-    state.final_report = report_md
-    
+
+    cache = get_report_cache(config.storage.db_path, state.session_id)
+    top = select_top(state, config.output.top_k, config.output.rerank_weight, cache)
+    passages = get_passage_index(state.session_id, config.output.passage_chars)
+    summaries, overview = llm_sections(state, config, top)
+    markdown = iter_markdown_report(state, top, passages, config.output.excerpt_passages,
+                                    summaries, overview, cache)
+
     # Сохраняем в файл
     output_dir = Path(config.output.save_path)
     output_dir.mkdir(parents=True, exist_ok=True)
-    
+
     filename = f"{state.session_id}_{state.query[:30].replace(' ', '_')}"
-    
+
+    # Markdown ограничен top_k источниками — его же сохраняем в state
+    sections = []
     if config.output.format in ("markdown", "both"):
         md_path = output_dir / f"{filename}.md"
         with open(md_path, "w", encoding="utf-8") as f:
-            f.write(report_md)
+            for section in markdown:
+                f.write(section)
+                sections.append(section)
         state.report_path = str(md_path)
         console.print(f"[green]Markdown сохранен:[/] {md_path}")
-    
+    else:
+        sections = list(markdown)
+    state.final_report = "".join(sections)
+
     if config.output.format in ("json", "both"):
         json_path = output_dir / f"{filename}.json"
         with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(state.model_dump(), f, indent=2, default=str, ensure_ascii=False)
+            write_report(iter_json_report(state, state.findings, cache), f)
         console.print(f"[green]JSON сохранен:[/] {json_path}")
-    
+
     # Сохраняем в БД
     storage = ResearchStorage(config.storage.db_path)
+    storage.flush_findings()
+    cache.flush()
     state.status = "completed"
     storage.save_session(state)
-    
+
     # Показываем превью
     console.print("\n[bold]Превью отчета:[/]")
-    console.print(Markdown(report_md[:1500] + "..."))
-    
+    console.print(Markdown(state.final_report[:1500] + "..."))
+
     state.updated_at = datetime.now()
     return state
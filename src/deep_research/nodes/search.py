@@ -1,61 +1,222 @@
 """Нода поиска информации."""
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import List, Optional, Tuple
 
 from rich.console import Console
 from rich.table import Table
 
 from deep_research.state import ResearchState, Finding
 from deep_research.config import Config
-from deep_research.search import TavilySearch
+from deep_research.search import get_backend, get_search_client
+from deep_research.fanout import FanOutSearch
+from deep_research.cache import CachedSearch, get_search_cache
+from deep_research.dedup import add_unique
+from deep_research.blobs import get_blob_store
+from deep_research.passages import get_passage_index, index_findings
+from deep_research.reuse import ReusedStep, ReusingSearch, get_reuse_index
+from deep_research.rerank import rank_score, top_findings
+from deep_research import tracing
 
 console = Console()
 
 
+def _print_findings(findings: List[Finding], query: str, weight: float = 0.5) -> None:
+    """Показывает топ-5 найденных источников после переранжирования."""
+    if findings:
+        table = Table(title=f"Найдено {len(findings)} источников")
+        table.add_column("#", style="cyan", width=3)
+        table.add_column("Источник", style="green")
+        table.add_column("Релевантность", style="yellow")
+
+        for i, f in enumerate(top_findings(findings, query, 5, weight), 1):  # Показываем топ-5
+            table.add_row(
+                str(i),
+                f.title[:50] + "..." if len(f.title) > 50 else f.title,
+                f"{rank_score(f):.2f}"
+            )
+
+        console.print(table)
+    else:
+        console.print("[yellow]Источники не найдены[/]")
+
+
+def _report_missing(query: str, missing: dict) -> None:
+    reasons = ", ".join(f"{name} ({reason[:60]})" for name, reason in missing.items())
+    console.print(f"[yellow]Без ответа для «{query[:40]}»: {reasons}[/]")
+
+
+def make_searcher(config: Config):
+    """Создает поиск по всем источникам `search.sources`.
+
+    Каждый источник при необходимости обернут кэшем, а опрашиваются они
+    параллельно с дедлайнами (см. deep_research.fanout).
+    """
+    cache = None
+    if config.search.cache_enabled:
+        cache = get_search_cache(
+            config.storage.db_path,
+            ttl=config.search.cache_ttl,
+            max_entries=config.search.cache_max_entries,
+        )
+
+    backends = []
+    for name in config.search.sources:
+        backend = (
+            get_search_client(config.search) if name == "tavily"
+            else get_backend(name, config.search)
+        )
+        if cache is not None:
+            backend = CachedSearch(backend, cache, source=name)
+        backends.append((name, backend))
+
+    return FanOutSearch(
+        backends,
+        source_timeout=config.search.source_timeout,
+        source_timeouts=config.search.source_timeouts,
+        deadline=config.search.step_deadline,
+        hedge_after=config.search.hedge_after,
+        on_missing=_report_missing,
+        # Как у HTTP-пула клиента (deep_research.search)
+        pool_size=max(config.search.max_concurrency, config.search.global_concurrency),
+    )
+
+
+def _report_reuse(step: str, steps: List[ReusedStep], count: int, live: bool) -> None:
+    sessions = ", ".join(dict.fromkeys(s.session_id for s in steps))
+    tail = ", дополняем поиском" if live else ""
+    console.print(f"[dim]«{step[:40]}»: {count} источников из сессий {sessions}{tail}[/]")
+
+
+def make_session_searcher(state: ResearchState, config: Config):
+    """Поиск для шагов сессии: с повторным использованием прошлых сессий."""
+    searcher = make_searcher(config)
+    if not config.search.reuse_enabled:
+        return searcher
+    return ReusingSearch(
+        searcher,
+        get_reuse_index(config.storage.db_path),
+        state.session_id,
+        state.query,
+        min_similarity=config.search.reuse_similarity,
+        min_findings=config.search.reuse_min_findings,
+        max_age=config.search.reuse_max_age,
+        on_reuse=_report_reuse,
+    )
+
+
+def search_step(searcher, query: str) -> Tuple[List[Finding], bool]:
+    """Источники шага и был ли живой поиск (шаг мог прийти из прошлых сессий)."""
+    if isinstance(searcher, ReusingSearch):
+        return searcher.search_step(query)
+    return searcher.search(query), True
+
+
+def add_findings(state: ResearchState, config: Config, findings: List[Finding]) -> None:
+    """Добавляет источники в состояние.
+
+    Дубликаты уже найденных источников не добавляются, а сливаются с ними.
+    Полный текст страниц уходит в хранилище блобов, в состоянии остается
+    только ссылка; перед этим он режется на пассажи для цитат отчета.
+    В таблицу findings новые источники пишутся одной пачкой при
+    сохранении сессии (`analyze_node` или чекпоинт).
+    """
+    texts = {id(f): f.metadata["raw_content"] for f in findings
+             if isinstance(f.metadata.get("raw_content"), str)}
+    get_blob_store(config.storage.db_path).offload(findings)
+    if config.search.dedup_enabled:
+        findings = add_unique(state.findings, findings, config.search.dedup_similarity)
+    else:
+        state.findings.extend(findings)
+    if config.output.excerpt_passages:
+        index = get_passage_index(state.session_id, config.output.passage_chars)
+        index_findings(index, findings, texts)
+
+
 def search_node(state: ResearchState, config: Config) -> ResearchState:
     """Выполняет поиск по текущему шагу плана."""
-    
+
     if state.status in ("cancelled", "completed"):
         return state
-    
+
     # Определяем текущий шаг
     if state.current_step >= len(state.plan):
         return state
-    
+
+    # В автоматическом режиме ищем все оставшиеся шаги сразу
+    if not config.ui.interactive and config.search.parallel:
+        return search_all_steps(state, config)
+
     current_query = state.plan[state.current_step]
     console.print(f"\n[bold cyan]Шаг {state.current_step + 1}/{len(state.plan)}:[/] {current_query}")
-    
+
     try:
         # Инициализируем Tavily
-        tavily = TavilySearch(config.search)
-        
+        tavily = make_session_searcher(state, config)
+
         # Выполняем поиск
-        findings = tavily.search(current_query)
-        
-        # Добавляем к общему списку
-        state.findings.extend(findings)
-        state.search_calls += 1
-        
+        findings, live = search_step(tavily, current_query)
+
         # Показываем результаты
-        if findings:
-            table = Table(title=f"Найдено {len(findings)} источников")
-            table.add_column("#", style="cyan", width=3)
-            table.add_column("Источник", style="green")
-            table.add_column("Релевантность", style="yellow")
-            
-            for i, f in enumerate(findings[:5], 1):  # Показываем топ-5
-                table.add_row(
-                    str(i),
-                    f.title[:50] + "..." if len(f.title) > 50 else f.title,
-                    f"{f.score:.2f}"
-                )
-            
-            console.print(table)
-        else:
-            console.print("[yellow]Источники не найдены[/]")
-        
+        _print_findings(findings, state.query, config.output.rerank_weight)
+
+        # Добавляем к общему списку
+        add_findings(state, config, findings)
+        if live:
+            state.search_calls += 1
+
+    except Exception as e:
+        console.print(f"[red]Ошибка поиска: {e}[/]")
+
+    state.updated_at = datetime.now()
+    return state
+
+
+def search_all_steps(state: ResearchState, config: Config) -> ResearchState:
+    """Ищет все оставшиеся шаги плана (и уточнение) одновременно.
+
+    Запросы выполняются в пуле потоков размером не больше
+    `config.search.max_concurrency`. Результаты добавляются в порядке
+    шагов плана, независимо от того, какой запрос завершился первым.
+    """
+    queries = list(state.plan[state.current_step:])
+    if state.user_feedback:
+        queries.append(f"{state.plan[state.current_step]} {state.user_feedback}")
+        state.user_feedback = None
+
+    console.print(f"\n[bold cyan]Параллельный поиск:[/] {len(queries)} запросов")
+
+    try:
+        tavily = make_session_searcher(state, config)
     except Exception as e:
         console.print(f"[red]Ошибка поиска: {e}[/]")
-    
+        state.updated_at = datetime.now()
+        return state
+
+    def run(query: str) -> Optional[Tuple[List[Finding], bool]]:
+        try:
+            return search_step(tavily, query)
+        except Exception as e:
+            console.print(f"[red]Ошибка поиска ({query[:40]}): {e}[/]")
+            return None
+
+    workers = min(config.search.max_concurrency, len(queries))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # map сохраняет порядок запросов — слияние детерминировано
+        results = list(pool.map(tracing.bind(run), queries))
+
+    for query, result in zip(queries, results):
+        if result is None:
+            continue
+        findings, live = result
+        console.print(f"\n[bold cyan]{query}[/]")
+        _print_findings(findings, state.query, config.output.rerank_weight)
+        add_findings(state, config, findings)
+        if live:
+            state.search_calls += 1
+
+    # Все шаги пройдены: analyze_node переведет сессию к отчету
+    state.current_step = len(state.plan) - 1
     state.updated_at = datetime.now()
     return state
@@ -0,0 +1,266 @@
+"""Разбиение полного текста страниц на пассажи и индекс для выбора цитат.
+
+`raw_content` каждого источника режется на пассажи по абзацам (не длиннее
+`passage_chars` символов) и попадает в инвертированный индекс сессии в
+памяти. Для записи отчета выбираются несколько пассажей источника, лучших
+по BM25 относительно запроса и шага плана; сам текст пассажа читается из
+`raw_content` только для выбранных источников.
+
+Индекс хранит только числа: для каждого пассажа — границы в тексте и
+длину в токенах, для каждой пары (терм, пассаж) — частоту. Источники
+индексируются по одному, а постинги копятся в буфере и сбрасываются в
+сегменты, отсортированные по хэшу терма (при избытке сегменты сливаются).
+Выбор пассажей — `searchsorted` по сегментам для термов запроса в
+диапазоне пассажей источника, без перечитывания документов.
+"""
+
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from deep_research.rerank import K1, B, hash_tokens
+from deep_research.state import Finding
+
+# Длина пассажа по умолчанию, символов
+PASSAGE_CHARS = 400
+
+# Постингов в буфере до сброса в сегмент и сегментов до слияния
+SEGMENT_POSTINGS = 1 << 16
+MAX_SEGMENTS = 8
+
+# Сколько сессий держать в памяти процесса
+MAX_SESSIONS = 8
+
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t\r\f\v]*\n")
+
+
+def _paragraphs(text: str) -> Iterator[Tuple[int, int]]:
+    """Границы непустых абзацев без пробелов по краям."""
+    start = 0
+    for match in _PARAGRAPH_BREAK.finditer(text):
+        yield from _trimmed(text, start, match.start())
+        start = match.end()
+    yield from _trimmed(text, start, len(text))
+
+
+def _trimmed(text: str, start: int, end: int) -> Iterator[Tuple[int, int]]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if start < end:
+        yield start, end
+
+
+def _pieces(text: str, start: int, end: int, size: int) -> Iterator[Tuple[int, int]]:
+    """Режет длинный абзац на куски не длиннее `size` по пробелам."""
+    while end - start > size:
+        cut = text.rfind(" ", start + size // 2, start + size)
+        if cut <= start:
+            cut = start + size
+        yield from _trimmed(text, start, cut)
+        start = cut
+    yield from _trimmed(text, start, end)
+
+
+def split_passages(text: str, size: int = PASSAGE_CHARS) -> Iterator[Tuple[int, int]]:
+    """Границы пассажей текста: соседние абзацы склеиваются до `size` символов.
+
+    Генератор: текст не копируется, наружу отдаются только смещения.
+    """
+    start = end = None
+    for para_start, para_end in _paragraphs(text):
+        for piece_start, piece_end in _pieces(text, para_start, para_end, size):
+            if start is None:
+                start, end = piece_start, piece_end
+            elif piece_end - start <= size:
+                end = piece_end
+            else:
+                yield start, end
+                start, end = piece_start, piece_end
+    if start is not None:
+        yield start, end
+
+
+class _Segment:
+    """Постинги, отсортированные по (хэш терма, пассаж)."""
+
+    __slots__ = ("hashes", "passages", "tf")
+
+    def __init__(self, hashes: np.ndarray, passages: np.ndarray, tf: np.ndarray):
+        order = np.lexsort((passages, hashes))
+        self.hashes = hashes[order]
+        self.passages = passages[order]
+        self.tf = tf[order]
+
+
+class PassageIndex:
+    """Инвертированный индекс пассажей источников одной сессии."""
+
+    def __init__(self, passage_chars: int = PASSAGE_CHARS):
+        self.passage_chars = passage_chars
+        # Пассажи: границы в тексте источника и длина в токенах
+        self._start = array("q")
+        self._end = array("q")
+        self._length = array("q")
+        # Ключ источника -> диапазон его пассажей [first, last)
+        self._docs: Dict[str, Tuple[int, int]] = {}
+        self._pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._pending_size = 0
+        self._segments: List[_Segment] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Число пассажей в индексе."""
+        return len(self._start)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._docs
+
+    def add(self, key: str, text: str) -> int:
+        """Индексирует текст источника и возвращает число его пассажей."""
+        spans = list(split_passages(text, self.passage_chars))
+        with self._lock:
+            if key in self._docs:
+                return 0
+            first = len(self._start)
+            self._docs[key] = (first, first + len(spans))
+            if not spans:
+                return 0
+            docs, hashes = hash_tokens([text[s:e].replace("\x00", " ") for s, e in spans])
+            for start, end in spans:
+                self._start.append(start)
+                self._end.append(end)
+            self._length.extend(np.bincount(docs, minlength=len(spans)).tolist())
+            if len(hashes):
+                # Частоты пар (терм, пассаж) внутри источника
+                order = np.lexsort((docs, hashes))
+                docs, hashes = docs[order], hashes[order]
+                new = np.ones(len(hashes), dtype=bool)
+                new[1:] = (hashes[1:] != hashes[:-1]) | (docs[1:] != docs[:-1])
+                starts = np.flatnonzero(new)
+                tf = np.diff(np.append(starts, len(hashes))).astype(np.int32)
+                self._pending.append((hashes[starts], (docs[starts] + first).astype(np.int64), tf))
+                self._pending_size += len(starts)
+                if self._pending_size >= SEGMENT_POSTINGS:
+                    self._seal()
+            return len(spans)
+
+    def _seal(self) -> None:
+        """Сбрасывает буфер в сегмент; сливает сегменты при их избытке."""
+        if self._pending:
+            hashes, passages, tf = (np.concatenate(part) for part in zip(*self._pending))
+            self._segments.append(_Segment(hashes, passages, tf))
+            self._pending = []
+            self._pending_size = 0
+        if len(self._segments) > MAX_SEGMENTS:
+            hashes, passages, tf = (
+                np.concatenate(part) for part in
+                zip(*((s.hashes, s.passages, s.tf) for s in self._segments))
+            )
+            self._segments = [_Segment(hashes, passages, tf)]
+
+    def best_passages(self, key: str, query: str, n: int) -> List[Tuple[int, int]]:
+        """До `n` лучших по BM25 пассажей источника в порядке следования в тексте.
+
+        Пассажи без общих с запросом термов не возвращаются.
+        """
+        with self._lock:
+            first, last = self._docs.get(key, (0, 0))
+            if first == last or n <= 0:
+                return []
+            self._seal()
+            terms = np.unique(hash_tokens([query])[1])
+            total = len(self._start)
+            lengths = np.frombuffer(self._length, dtype=np.int64)[first:last]
+            avg_len = max(float(np.frombuffer(self._length, dtype=np.int64).mean()), 1.0)
+            norm = K1 * (1 - B + B * lengths / avg_len)
+
+            scores = np.zeros(last - first)
+            for df, hits in self._lookup(terms, first, last):
+                idf = np.log1p((total - df + 0.5) / (df + 0.5))
+                for passages, tf in hits:
+                    local = passages - first
+                    scores[local] += idf * tf * (K1 + 1) / (tf + norm[local])
+
+            best = np.flatnonzero(scores > 0)
+            if len(best) > n:
+                best = best[np.argpartition(-scores[best], n - 1)[:n]]
+            best.sort()
+            return [(self._start[first + i], self._end[first + i]) for i in best.tolist()]
+
+    def _lookup(self, terms: np.ndarray, first: int, last: int):
+        """Для каждого терма: document frequency и постинги в [first, last)."""
+        for term in terms:
+            df = 0
+            hits = []
+            for segment in self._segments:
+                lo = int(np.searchsorted(segment.hashes, term, "left"))
+                hi = int(np.searchsorted(segment.hashes, term, "right"))
+                if lo == hi:
+                    continue
+                df += hi - lo
+                passages = segment.passages[lo:hi]
+                a, b = np.searchsorted(passages, (first, last))
+                if a < b:
+                    hits.append((passages[a:b], segment.tf[lo + a:lo + b]))
+            if hits:
+                yield df, hits
+
+
+def index_findings(index: PassageIndex, findings: List[Finding],
+                   texts: Optional[Dict[int, str]] = None) -> int:
+    """Добавляет в индекс полный текст источников; возвращает число пассажей.
+
+    `texts` — уже известные тексты по `id(finding)`, остальные читаются
+    из хранилища блобов по одному, без кэширования в источнике.
+    """
+    added = 0
+    for finding in findings:
+        if finding.url in index:
+            continue
+        text = (texts or {}).get(id(finding))
+        if text is None:
+            text = finding.get_raw_content(cache=False)
+        added += index.add(finding.url, text or "")
+    return added
+
+
+def select_excerpt(index: PassageIndex, finding: Finding, query: str, n: int) -> Optional[str]:
+    """Цитата для записи отчета: лучшие пассажи источника через " … ".
+
+    None — у источника нет полного текста или совпадений с запросом.
+    """
+    text = None
+    if finding.url not in index:
+        text = finding.get_raw_content(cache=False)
+        index.add(finding.url, text)
+    spans = index.best_passages(finding.url, query, n)
+    if not spans:
+        return None
+    if text is None:
+        text = finding.get_raw_content(cache=False)
+    return " … ".join(" ".join(text[start:end].split()) for start, end in spans)
+
+
+_indexes: "OrderedDict[str, PassageIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_passage_index(session_id: str, passage_chars: int = PASSAGE_CHARS) -> PassageIndex:
+    """Индекс пассажей сессии; в памяти держатся последние MAX_SESSIONS сессий.
+
+    После перезапуска процесса индекс пуст и пополняется при выборе цитат.
+    """
+    with _indexes_lock:
+        index = _indexes.get(session_id)
+        if index is None or index.passage_chars != passage_chars:
+            index = _indexes[session_id] = PassageIndex(passage_chars)
+        _indexes.move_to_end(session_id)
+        while len(_indexes) > MAX_SESSIONS:
+            _indexes.popitem(last=False)
+        return index
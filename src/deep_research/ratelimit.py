@@ -0,0 +1,242 @@
+"""Ограничение нагрузки на поисковые API.
+
+Каждый бэкенд (Tavily и будущие источники) получает общий для процесса
+`RateLimiter`, который объединяет:
+
+- token bucket — не больше `rate_limit` запросов в секунду со всплеском
+  до `rate_burst`;
+- адаптивный лимит одновременных запросов (AIMD): +1 за "окно" успешных
+  ответов, уменьшение вдвое на 429/5xx, но не выше `global_concurrency`;
+- повторы с экспоненциальной задержкой и полным джиттером в пределах
+  общего дедлайна `retry_deadline`;
+- метрики: запросы, повторы, ответы 429/5xx и время ожидания лимитов.
+"""
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from deep_research.config import SearchConfig
+
+T = TypeVar("T")
+
+# Во сколько раз уменьшается лимит одновременных запросов при перегрузке
+DECREASE_FACTOR = 0.5
+
+
+class RetryableError(Exception):
+    """Временная ошибка бэкенда: запрос можно повторить.
+
+    `retry_after` — подсказка сервера, через сколько секунд повторять.
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class BackendOverloaded(RetryableError):
+    """Бэкенд перегружен (429 или 5xx): кроме повтора снижаем нагрузку."""
+
+
+class TokenBucket:
+    """Token bucket: `rate` токенов в секунду, емкость `burst`.
+
+    Токен резервируется сразу (баланс может уйти в минус), а ждет
+    вызывающий поток вне блокировки, поэтому очередь честная.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Резервирует токен и возвращает, сколько секунд нужно подождать."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """Берет токен, при необходимости ожидая; возвращает время ожидания."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class AdaptiveConcurrency:
+    """Лимит одновременных запросов по схеме AIMD.
+
+    Успешный ответ увеличивает лимит на `1 / limit` (около +1 за окно
+    из `limit` запросов), перегрузка уменьшает его в `DECREASE_FACTOR` раз.
+    Перегрузки запросов, начатых до последнего уменьшения, не учитываются:
+    пачка одновременных 429 — это один сигнал, а не несколько.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self._decreased_at = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[float]:
+        """Занимает слот и возвращает момент начала запроса.
+
+        None — слот не освободился за `timeout` секунд.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.in_flight < int(self.limit), timeout):
+                return None
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, started: float, overloaded: bool = False) -> None:
+        """Освобождает слот и корректирует лимит по исходу запроса."""
+        with self._cond:
+            self.in_flight -= 1
+            if overloaded:
+                if started >= self._decreased_at:
+                    self.limit = max(self.min_limit, self.limit * DECREASE_FACTOR)
+                    self._decreased_at = time.monotonic()
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+class RateLimiter:
+    """Лимиты, повторы и метрики одного бэкенда."""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float = 0.0,
+        burst: int = 1,
+        max_concurrency: int = 8,
+        deadline: float = 30.0,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+    ):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.deadline = deadline
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._metrics = {
+            "requests": 0,       # попытки, дошедшие до бэкенда
+            "retries": 0,
+            "overloaded": 0,     # ответы 429/5xx
+            "failed": 0,         # вызовы, не уложившиеся в дедлайн
+            "throttle_time": 0.0,  # ожидание токенов, слотов и пауз между повторами
+        }
+        self._lock = threading.Lock()
+
+    def _count(self, **deltas: float) -> None:
+        with self._lock:
+            for key, value in deltas.items():
+                self._metrics[key] += value
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Задержка перед повтором: полный джиттер, не меньше `retry_after`."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """Выполняет запрос с учетом лимитов и повторяет временные ошибки.
+
+        Последняя ошибка пробрасывается, если следующий повтор не
+        укладывается в дедлайн.
+        """
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            waited = self.bucket.acquire()
+            slot_wait = time.monotonic()
+            started = self.concurrency.acquire(timeout=max(0.0, deadline - slot_wait))
+            if started is None:
+                self._count(failed=1, throttle_time=waited + time.monotonic() - slot_wait)
+                raise RetryableError(
+                    f"{self.name}: нет свободного слота за {self.deadline:.0f} с"
+                )
+            self._count(requests=1, throttle_time=waited + started - slot_wait)
+
+            overloaded = False
+            try:
+                return fn()
+            except RetryableError as e:
+                overloaded = isinstance(e, BackendOverloaded)
+                if overloaded:
+                    self._count(overloaded=1)
+                delay = self.backoff(attempt, e.retry_after)
+                if time.monotonic() + delay >= deadline:
+                    self._count(failed=1)
+                    raise
+            finally:
+                self.concurrency.release(started, overloaded)
+
+            self._count(retries=1, throttle_time=delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Снимок метрик и текущий адаптивный лимит."""
+        with self._lock:
+            snapshot = dict(self._metrics)
+        snapshot["concurrency_limit"] = int(self.concurrency.limit)
+        return snapshot
+
+
+_limiters: Dict[Tuple, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(backend: str, config: SearchConfig, key: Tuple = ()) -> RateLimiter:
+    """Общий для процесса лимитер бэкенда.
+
+    Все клиенты и сессии с одинаковыми `backend` и `key` (например,
+    API ключом) делят лимиты, поэтому суммарная нагрузка на API
+    не зависит от числа потоков.
+    """
+    registry_key = (backend,) + tuple(key)
+    with _limiters_lock:
+        limiter = _limiters.get(registry_key)
+        if limiter is None:
+            limiter = RateLimiter(
+                backend,
+                rate=config.rate_limit,
+                burst=config.rate_burst,
+                max_concurrency=config.global_concurrency,
+                deadline=config.retry_deadline,
+                base_delay=config.retry_base_delay,
+                max_delay=config.retry_max_delay,
+            )
+            _limiters[registry_key] = limiter
+        return limiter
+
+
+def all_metrics() -> List[Dict[str, Any]]:
+    """Метрики всех лимитеров процесса."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [dict(backend=limiter.name, **limiter.metrics()) for limiter in limiters]
+
+
+def reset_rate_limiters() -> None:
+    """Сбрасывает реестр (лимиты и метрики)."""
+    with _limiters_lock:
+        _limiters.clear()
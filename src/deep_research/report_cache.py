@@ -0,0 +1,378 @@
+"""Кэш отчета для инкрементальной перегенерации.
+
+Строки таблицы `report_cache` привязаны к позиции источника в сессии и
+к его `content_key` (хэш содержимого без rank_score, который считается
+один раз при добавлении источника и хранится в `findings`). В строке
+лежат токены BM25, готовый фрагмент JSON отчета с "дыркой" под
+rank_score и последняя секция Markdown. Строка действительна, пока
+`content_key` на ее позиции не изменился, поэтому проверка кэша — это
+сравнение чисел, без хэширования текста.
+
+В памяти держится только статистика BM25: длины источников в токенах и
+частоты термов запросов сессии, а также последний отбор `top_k`. Когда
+в сессии появляются новые источники, токенизируются и сериализуются
+только они; фрагменты JSON остальных читаются из БД потоком при записи
+отчета. Поэтому `resume` в новом процессе тоже обрабатывает только
+дельту.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from deep_research.db import get_engine
+from deep_research.rerank import (
+    TOKENIZER_VERSION,
+    _hash_chunks,
+    bm25_from_pairs,
+    hash_tokens,
+    rank_text,
+    rerank,
+)
+from deep_research.state import Finding, FindingList, FindingStore
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS report_cache (
+        session_id TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        content_key INTEGER NOT NULL,
+        tokenizer INTEGER NOT NULL,
+        tokens BLOB NOT NULL,
+        json_head TEXT,
+        json_tail TEXT,
+        section_key TEXT,
+        section TEXT,
+        PRIMARY KEY (session_id, position)
+    );
+"""
+
+# Сколько сессий держать в памяти процесса
+MAX_SESSIONS = 8
+
+# Сколько строк кэша читается из БД за раз при пересборке статистики
+READ_CHUNK = 512
+
+# Значение-метка на месте rank_score при сериализации фрагмента
+_RANK_SLOT = "\x00rank_score\x00"
+_RANK_SLOT_JSON = json.dumps(_RANK_SLOT)
+
+
+def _migrate(conn) -> None:
+    """Кэш прежнего формата (по хэшу содержимого, без позиций) пересоздается."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(report_cache)")}
+    if columns and "position" not in columns:
+        conn.execute("DROP TABLE report_cache")
+
+
+def _query_pairs(
+    docs: np.ndarray, hashes: np.ndarray, terms: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Пары (источник, терм, tf) только по термам запросов, по порядку источника и терма."""
+    keep = np.isin(hashes, terms)
+    docs, hashes = docs[keep], hashes[keep]
+    order = np.lexsort((hashes, docs))
+    docs, hashes = docs[order], hashes[order]
+    first = np.ones(len(docs), dtype=bool)
+    first[1:] = (docs[1:] != docs[:-1]) | (hashes[1:] != hashes[:-1])
+    starts = np.flatnonzero(first)
+    tf = np.diff(np.append(starts, len(docs)))
+    return docs[starts], hashes[starts], tf
+
+
+class ReportCache:
+    """Кэш токенов, фрагментов и секций отчета одной сессии."""
+
+    def __init__(self, db_path: str, session_id: str):
+        self.session_id = session_id
+        self.engine = get_engine(db_path)
+        self.engine.run_once("migrate:report-cache-position", _migrate)
+        self.engine.ensure_schema(SCHEMA)
+        # Статистика BM25 по позициям и content_key, по которым она собрана
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._lengths = np.zeros(0, dtype=np.float64)
+        self._terms: Optional[np.ndarray] = None
+        self._pair_doc = np.zeros(0, dtype=np.int64)
+        self._pair_hash = np.zeros(0, dtype=np.uint64)
+        self._pair_tf = np.zeros(0, dtype=np.int64)
+        # Последний отбор: (запрос, k, вес), content_key, оценки, лучшие позиции
+        self._top: Optional[tuple] = None
+        self.top_positions: List[int] = []
+        # Новые строки до `flush`: позиция -> (content_key, ...)
+        self._rows: Dict[int, Tuple[int, bytes]] = {}
+        self._fragments: Dict[int, Tuple[int, str, str]] = {}
+        self._sections: Dict[int, Tuple[int, str, str]] = {}
+        # Сколько источников пришлось токенизировать/сериализовать заново
+        self.tokenized = 0
+        self.rendered = 0
+        self.rendered_sections = 0
+
+    # --- отбор и BM25 ---
+
+    def select(
+        self, findings: FindingList, query: str, k: int, weight: float = 0.5
+    ) -> List[Finding]:
+        """`top_findings` со статистикой из кэша.
+
+        Если источники не менялись с прошлого отбора, оценки и порядок
+        берутся готовыми. Позиции отобранных источников — в `top_positions`.
+        """
+        store = findings.store
+        keys = store.keys
+        params = (query, k, weight)
+        if self._top is not None and self._top[0] == params and np.array_equal(self._top[1], keys):
+            blended, best = self._top[2], self._top[3]
+            findings.mark_rank_changed(store.set_rank_scores(blended))
+        else:
+            blended = rerank(findings, query, weight, self.scorer(findings))
+            best = store.top(k, by="rank_score")
+            self._top = (params, keys, blended, best)
+        self.top_positions = best.tolist()
+        return [store[i] for i in self.top_positions]
+
+    def scorer(self, findings: FindingList) -> Callable[[List[str], np.ndarray], np.ndarray]:
+        """BM25 для `rerank`: токенизируются только источники, которых нет в кэше."""
+        store = findings.store
+        return lambda queries, query_of_text: self._bm25(store, queries, query_of_text)
+
+    def _bm25(self, store: FindingStore, queries: List[str], query_of_text: np.ndarray):
+        terms = np.unique(hash_tokens(queries)[1])
+        keys = store.keys
+        if self._terms is None or not np.array_equal(self._terms, terms):
+            self._rebuild(store, keys, terms)
+        else:
+            self._update(store, keys)
+        pair_term = np.searchsorted(terms, self._pair_hash)
+        return bm25_from_pairs(self._lengths, terms, self._pair_doc, pair_term, self._pair_tf,
+                               queries, query_of_text)
+
+    def _tokenize(self, store: FindingStore, keys: np.ndarray, positions: np.ndarray):
+        """Токены источников на `positions`; они же запоминаются для записи в БД."""
+        docs, hashes = _hash_chunks(
+            rank_text(f.title, f.content) for f in (store[i] for i in positions.tolist())
+        )
+        counts = np.bincount(docs, minlength=len(positions))
+        for position, tokens in zip(positions.tolist(), np.split(hashes, np.cumsum(counts)[:-1])):
+            self._rows[position] = (int(keys[position]), tokens.tobytes())
+        self.tokenized += len(positions)
+        return positions[docs], hashes, counts
+
+    def _rebuild(self, store: FindingStore, keys: np.ndarray, terms: np.ndarray) -> None:
+        """Собирает статистику заново (другие запросы или новый процесс).
+
+        Токены действительных строк читаются из БД частями и сразу
+        сводятся к термам запросов; остальные источники токенизируются.
+        """
+        n = len(keys)
+        lengths = np.zeros(n, dtype=np.float64)
+        found = np.zeros(n, dtype=bool)
+        parts = []
+        cursor = self.engine.reader().execute(
+            """SELECT position, content_key, tokens FROM report_cache
+               WHERE session_id = ? AND tokenizer = ? AND position < ?
+               ORDER BY position""",
+            (self.session_id, TOKENIZER_VERSION, n)
+        )
+        rows = cursor.fetchmany(READ_CHUNK)
+        while rows:
+            positions, arrays = [], []
+            for position, key, tokens in rows:
+                if key == keys[position] and position not in self._rows:
+                    positions.append(position)
+                    arrays.append(np.frombuffer(tokens, dtype=np.uint64))
+            parts.append(self._chunk_pairs(positions, arrays, terms, lengths, found))
+            rows = cursor.fetchmany(READ_CHUNK)
+        # Еще не записанные в БД токены
+        pending = [p for p, (key, _) in self._rows.items() if p < n and key == keys[p]]
+        parts.append(self._chunk_pairs(
+            pending, [np.frombuffer(self._rows[p][1], dtype=np.uint64) for p in pending],
+            terms, lengths, found,
+        ))
+
+        missing = np.flatnonzero(~found)
+        if len(missing):
+            docs, hashes, counts = self._tokenize(store, keys, missing)
+            lengths[missing] = counts
+            parts.append(_query_pairs(docs, hashes, terms))
+
+        pair_doc, pair_hash, pair_tf = (np.concatenate(column) for column in zip(*parts))
+        order = np.lexsort((pair_hash, pair_doc))
+        self._pair_doc, self._pair_hash, self._pair_tf = (
+            pair_doc[order], pair_hash[order], pair_tf[order]
+        )
+        self._keys, self._lengths, self._terms = keys, lengths, terms
+
+    @staticmethod
+    def _chunk_pairs(positions, arrays, terms, lengths, found):
+        positions = np.asarray(positions, dtype=np.int64)
+        counts = np.fromiter((len(a) for a in arrays), dtype=np.int64, count=len(arrays))
+        lengths[positions] = counts
+        found[positions] = True
+        hashes = np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.uint64)
+        return _query_pairs(np.repeat(positions, counts), hashes, terms)
+
+    def _update(self, store: FindingStore, keys: np.ndarray) -> None:
+        """Обновляет статистику только для новых и изменившихся источников."""
+        old, n = len(self._keys), len(keys)
+        common = min(old, n)
+        stale = np.flatnonzero(self._keys[:common] != keys[:common])
+        fresh = np.concatenate((stale, np.arange(old, n, dtype=np.int64)))
+        if len(stale) or n < old:
+            drop = (self._pair_doc >= n) | np.isin(self._pair_doc, stale)
+            self._pair_doc, self._pair_hash, self._pair_tf = (
+                self._pair_doc[~drop], self._pair_hash[~drop], self._pair_tf[~drop]
+            )
+        lengths = np.zeros(n, dtype=np.float64)
+        lengths[:common] = self._lengths[:common]
+        if len(fresh):
+            docs, hashes, counts = self._tokenize(store, keys, fresh)
+            lengths[fresh] = counts
+            doc, term, tf = _query_pairs(docs, hashes, self._terms)
+            self._pair_doc = np.concatenate((self._pair_doc, doc))
+            self._pair_hash = np.concatenate((self._pair_hash, term))
+            self._pair_tf = np.concatenate((self._pair_tf, tf))
+            if len(stale):
+                # Изменились источники в середине: восстанавливаем порядок пар
+                order = np.lexsort((self._pair_hash, self._pair_doc))
+                self._pair_doc, self._pair_hash, self._pair_tf = (
+                    self._pair_doc[order], self._pair_hash[order], self._pair_tf[order]
+                )
+        self._keys, self._lengths = keys, lengths
+
+    # --- фрагменты JSON ---
+
+    def json_fragments(
+        self, findings: FindingList, render: Callable[[Finding], str]
+    ) -> Iterator[str]:
+        """Фрагменты источников для JSON отчета, совпадающие с `render(finding)`.
+
+        Фрагмент рендерится один раз с меткой на месте rank_score, дальше
+        в него подставляется текущая оценка. Готовые фрагменты читаются из
+        БД потоком, по порядку позиций.
+        """
+        store = findings.store
+        keys = store.keys.tolist()
+        ranks = store.rank_scores.tolist()
+        cursor = self.engine.reader().execute(
+            """SELECT position, content_key, json_head, json_tail FROM report_cache
+               WHERE session_id = ? AND json_head IS NOT NULL ORDER BY position""",
+            (self.session_id,)
+        )
+        row = next(cursor, None)
+        for i, (key, rank) in enumerate(zip(keys, ranks)):
+            while row is not None and row[0] < i:
+                row = next(cursor, None)
+            if rank != rank:  # NaN
+                # Без оценки источник в кэше не хранится
+                self.rendered += 1
+                yield render(store[i])
+                continue
+            pending = self._fragments.get(i)
+            if pending is not None and pending[0] == key:
+                head, tail = pending[1], pending[2]
+            elif row is not None and row[0] == i and row[1] == key:
+                head, tail = row[2], row[3]
+                if i in self._rows:
+                    # Строка будет перезаписана с новыми токенами
+                    self._fragments[i] = (key, head, tail)
+            else:
+                finding = store[i]
+                finding.metadata["rank_score"] = _RANK_SLOT
+                head, found, tail = render(finding).partition(_RANK_SLOT_JSON)
+                self.rendered += 1
+                if not found:
+                    yield render(store[i])
+                    continue
+                self._fragments[i] = (key, head, tail)
+            yield head + json.dumps(rank) + tail
+
+    # --- секции Markdown ---
+
+    def section(self, position: int, inputs: tuple, render: Callable[[], str]) -> str:
+        """Секция Markdown источника на позиции из `top_positions`.
+
+        `inputs` — все, от чего кроме самого источника зависит секция
+        (номер, оценка, выжимка, параметры цитаты); при их совпадении
+        секция берется из кэша и `render` не вызывается.
+        """
+        key = int(self._top[1][position])
+        section_key = hashlib.sha1(repr(inputs).encode("utf-8")).hexdigest()
+        cached = self._sections.get(position)
+        if cached is None:
+            cached = self.engine.reader().execute(
+                """SELECT content_key, section_key, section FROM report_cache
+                   WHERE session_id = ? AND position = ?""",
+                (self.session_id, position)
+            ).fetchone()
+        if cached is not None and cached[0] == key and cached[1] == section_key:
+            return cached[2]
+        text = render()
+        self._sections[position] = (key, section_key, text)
+        self.rendered_sections += 1
+        return text
+
+    # --- сохранение ---
+
+    def flush(self) -> None:
+        """Пишет новые строки в БД и удаляет строки позиций за концом сессии.
+
+        Ждет фиксации: следующая генерация читает фрагменты уже из БД.
+        """
+        if self._terms is None and not (self._rows or self._fragments or self._sections):
+            return
+        session_id = self.session_id
+        # До первого отбора число позиций неизвестно — строки не удаляются
+        size = len(self._keys) if self._terms is not None else None
+        rows = [(session_id, position, key, TOKENIZER_VERSION, tokens)
+                for position, (key, tokens) in self._rows.items()]
+        fragments = [(head, tail, session_id, position, key)
+                     for position, (key, head, tail) in self._fragments.items()]
+        sections = [(section_key, text, session_id, position, key)
+                    for position, (key, section_key, text) in self._sections.items()]
+        self._rows, self._fragments, self._sections = {}, {}, {}
+
+        def write(conn):
+            if size is not None:
+                conn.execute(
+                    "DELETE FROM report_cache WHERE session_id = ? AND position >= ?",
+                    (session_id, size),
+                )
+            conn.executemany(
+                """INSERT OR REPLACE INTO report_cache
+                   (session_id, position, content_key, tokenizer, tokens)
+                   VALUES (?, ?, ?, ?, ?)""",
+                rows,
+            )
+            conn.executemany(
+                """UPDATE report_cache SET json_head = ?, json_tail = ?
+                   WHERE session_id = ? AND position = ? AND content_key = ?""",
+                fragments,
+            )
+            conn.executemany(
+                """UPDATE report_cache SET section_key = ?, section = ?
+                   WHERE session_id = ? AND position = ? AND content_key = ?""",
+                sections,
+            )
+
+        self.engine.write(write)
+
+
+_caches: "OrderedDict[tuple, ReportCache]" = OrderedDict()
+_caches_lock = threading.Lock()
+
+
+def get_report_cache(db_path: str, session_id: str) -> ReportCache:
+    """Кэш отчета сессии; в памяти держатся последние MAX_SESSIONS сессий."""
+    key = (str(db_path), session_id)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None or cache.engine._closed:
+            cache = ReportCache(db_path, session_id)
+            _caches[key] = cache
+        _caches.move_to_end(key)
+        while len(_caches) > MAX_SESSIONS:
+            _caches.popitem(last=False)
+        return cache
@@ -0,0 +1,296 @@
+"""Локальное переранжирование источников относительно запроса.
+
+Score от провайдера поиска несравним между шагами плана, поэтому каждый
+источник дополнительно оценивается BM25 относительно исходного запроса и
+своего шага плана. Токенизация, построение разреженной матрицы термов и
+подсчет BM25 выполняются пакетно средствами NumPy, без цикла Python по
+источникам.
+"""
+
+import functools
+import heapq
+import itertools
+import unicodedata
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from deep_research.state import Finding, FindingList
+
+# Параметры BM25
+K1 = 1.2
+B = 0.75
+
+# Полиномиальный хэш токенов по модулю 2**64; длинные токены
+# различаются по первым MAX_TOKEN_BYTES байтам и длине
+_BASE = np.uint64(1099511628211)
+MAX_TOKEN_BYTES = 32
+
+# Меняется вместе с правилами токенизации: сохраненные токены
+# прежней версии (кэш отчета) становятся недействительными
+TOKENIZER_VERSION = 2
+
+# Размер блока токенов при хэшировании и число текстов, токенизируемых
+# за один проход
+HASH_BLOCK_TOKENS = 16384
+TEXT_CHUNK = 512
+
+
+def _is_word_char(char: str) -> bool:
+    """Символ слова: буква, цифра, `_` или комбинируемый знак (как `\\w`)."""
+    return char.isalnum() or char == "_" or unicodedata.category(char)[0] == "M"
+
+
+# Байты ASCII, входящие в слова
+_ASCII_WORD = np.array([_is_word_char(chr(c)) for c in range(0x80)])
+
+
+@functools.lru_cache(maxsize=None)
+def _bmp_table() -> np.ndarray:
+    """Символы BMP, входящие в слова; строится при первом не-ASCII тексте."""
+    return np.array([_is_word_char(chr(c)) for c in range(0x10000)])
+
+
+def _word_bytes(text: str, data: np.ndarray) -> np.ndarray:
+    """Маска байтов UTF-8 `data`, входящих в слова текста `text`.
+
+    Не-ASCII символы классифицируются целиком (по кодовой точке), поэтому
+    неразрывный пробел, кавычки-елочки, тире и многоточие разделяют
+    слова, а не приклеиваются к ним.
+    """
+    if text.isascii():
+        return _ASCII_WORD[data]
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    is_word = _bmp_table()[np.minimum(codes, 0xFFFF)]
+    astral = np.flatnonzero(codes > 0xFFFF)
+    if len(astral):
+        is_word[astral] = [_is_word_char(chr(c)) for c in codes[astral].tolist()]
+    # Маска символа повторяется на все его байты UTF-8
+    widths = 1 + (codes >= 0x80) + (codes >= 0x800) + (codes >= 0x10000)
+    return np.repeat(is_word, widths)
+
+
+_POWERS = np.cumprod(
+    np.concatenate(([1], np.full(MAX_TOKEN_BYTES - 1, _BASE))).astype(np.uint64),
+    dtype=np.uint64,
+)[::-1].copy()
+
+
+def hash_tokens(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Векторная токенизация пачки текстов.
+
+    Возвращает массивы одинаковой длины: номер текста для каждого токена
+    и 64-битный хэш токена.
+    """
+    if not texts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint64)
+
+    # \x00 разделяет тексты и не входит в слова
+    text = "\x00".join(texts).lower()
+    data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+    n = len(data)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint64)
+    is_word = _word_bytes(text, data)
+
+    prev_word = np.concatenate(([False], is_word[:-1]))
+    next_word = np.concatenate((is_word[1:], [False]))
+    starts = np.flatnonzero(is_word & ~prev_word)
+    ends = np.flatnonzero(is_word & ~next_word) + 1
+    docs = np.searchsorted(np.flatnonzero(data == 0), starts)
+
+    # Матрица токен × позиция байта (не больше MAX_TOKEN_BYTES), хэш —
+    # скалярное произведение строки на степени основания по модулю 2**64.
+    # Матрица строится блоками, чтобы память не росла с числом токенов
+    lengths = ends - starts
+    width = int(min(lengths.max(initial=0), MAX_TOKEN_BYTES))
+    offsets = np.arange(width)
+    powers = _POWERS[-width:] if width else _POWERS[:0]
+    padded = np.concatenate((data, np.zeros(width, dtype=np.uint8)))
+    hashes = lengths.astype(np.uint64)
+    for block in range(0, len(starts), HASH_BLOCK_TOKENS):
+        part = slice(block, block + HASH_BLOCK_TOKENS)
+        window = padded[starts[part, None] + offsets].astype(np.uint64)
+        window[offsets >= lengths[part, None]] = 0
+        with np.errstate(over="ignore"):
+            hashes[part] += window @ powers
+
+    return docs.astype(np.int64), hashes
+
+
+def _hash_chunks(texts: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """hash_tokens по частям: промежуточные массивы ограничены размером части."""
+    doc_parts, hash_parts = [], []
+    offset = 0
+    texts = iter(texts)
+    while True:
+        chunk = list(itertools.islice(texts, TEXT_CHUNK))
+        if not chunk:
+            break
+        docs, hashes = hash_tokens(chunk)
+        doc_parts.append(docs + offset)
+        hash_parts.append(hashes)
+        offset += len(chunk)
+    if not doc_parts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint64)
+    return np.concatenate(doc_parts), np.concatenate(hash_parts)
+
+
+def bm25_scores(
+    texts: Iterable[str],
+    queries: Sequence[str],
+    query_of_text: np.ndarray,
+    tokens: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> np.ndarray:
+    """BM25 каждого текста относительно назначенного ему запроса.
+
+    `texts` читается один раз и по частям, поэтому может быть генератором.
+    Готовый результат `hash_tokens` можно передать в `tokens` — тогда
+    тексты не токенизируются и не читаются.
+    """
+    n = len(query_of_text)
+    docs, hashes = tokens if tokens is not None else _hash_chunks(texts)
+    if len(hashes) == 0:
+        return np.zeros(n)
+
+    # Разреженная матрица термов в координатном формате: (doc, term, tf)
+    vocab, term_ids = np.unique(hashes, return_inverse=True)
+    vocab_size = len(vocab)
+    pair_keys, tf = np.unique(docs * vocab_size + term_ids, return_counts=True)
+    pair_doc = pair_keys // vocab_size
+    pair_term = pair_keys % vocab_size
+
+    doc_len = np.bincount(docs, minlength=n).astype(np.float64)
+    return bm25_from_pairs(doc_len, vocab, pair_doc, pair_term, tf, queries, query_of_text)
+
+
+def bm25_from_pairs(
+    doc_len: np.ndarray,
+    vocab: np.ndarray,
+    pair_doc: np.ndarray,
+    pair_term: np.ndarray,
+    tf: np.ndarray,
+    queries: Sequence[str],
+    query_of_text: np.ndarray,
+) -> np.ndarray:
+    """BM25 по готовой статистике текстов.
+
+    `doc_len` — длины всех текстов в токенах, пары (`pair_doc`,
+    `pair_term`, `tf`) отсортированы по тексту и терму, `pair_term` —
+    номера в отсортированном словаре `vocab`. Пары можно ограничить
+    термами запросов: оценки от этого не меняются.
+    """
+    n = len(doc_len)
+    vocab_size = len(vocab)
+    avg_len = max(doc_len.mean(), 1.0)
+    df = np.bincount(pair_term, minlength=vocab_size)
+    idf = np.log1p((n - df + 0.5) / (df + 0.5))
+
+    weights = idf[pair_term] * tf * (K1 + 1) / (
+        tf + K1 * (1 - B + B * doc_len[pair_doc] / avg_len)
+    )
+
+    # Матрица запрос × терм: какие термы словаря есть в каждом запросе
+    q_docs, q_hashes = hash_tokens(queries)
+    q_terms = np.searchsorted(vocab, q_hashes)
+    known = q_terms < vocab_size
+    known[known] = vocab[q_terms[known]] == q_hashes[known]
+    query_terms = np.zeros((len(queries), vocab_size), dtype=bool)
+    query_terms[q_docs[known], q_terms[known]] = True
+
+    matched = query_terms[query_of_text[pair_doc], pair_term]
+    return np.bincount(pair_doc, weights=weights * matched, minlength=n)
+
+
+def rank_text(title: str, content: str) -> str:
+    """Текст источника, по которому считается BM25."""
+    return f"{title} {content}".replace("\x00", " ")
+
+
+def _normalize_by_group(values: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    """Min-max нормализация внутри каждой группы."""
+    low = np.full(n_groups, np.inf)
+    high = np.full(n_groups, -np.inf)
+    np.minimum.at(low, groups, values)
+    np.maximum.at(high, groups, values)
+    span = (high - low)[groups]
+    return np.where(span > 0, (values - low[groups]) / np.where(span > 0, span, 1), 1.0)
+
+
+def rerank(
+    findings: Sequence[Finding],
+    query: str,
+    weight: float = 0.5,
+    scorer: Optional[Callable[[List[str], np.ndarray], np.ndarray]] = None,
+) -> np.ndarray:
+    """Переранжирует источники относительно запроса и их шагов плана.
+
+    Итоговая оценка — смесь нормализованного BM25 (с весом `weight`) и
+    нормализованного score провайдера; нормализация выполняется отдельно
+    для каждого шага плана. Результат сохраняется в
+    `metadata["rank_score"]` и возвращается массивом. `scorer(queries,
+    query_of_text)` заменяет `bm25_scores` (например, `ReportCache.scorer`
+    со статистикой из кэша).
+    """
+    if not findings:
+        return np.zeros(0)
+
+    store = findings.store if isinstance(findings, FindingList) else None
+    if store is not None:
+        # Колоночное хранилище: поля читаются без создания Finding
+        texts = (
+            rank_text(title, content)
+            for title, content in zip(store.texts("title"), store.texts("content"))
+        )
+        step_names, groups = store.step_groups()
+        provider = store.scores
+    else:
+        texts = (rank_text(f.title, f.content) for f in findings)
+        steps = [f.metadata.get("query", "") for f in findings]
+        step_names, groups = np.unique(
+            np.array(steps, dtype=object).astype(str), return_inverse=True
+        )
+        provider = np.fromiter((f.score for f in findings), dtype=np.float64, count=len(findings))
+
+    queries = [f"{query} {step}" for step in step_names]
+    if scorer is not None:
+        relevance = scorer(queries, groups)
+    else:
+        relevance = bm25_scores(texts, queries, groups)
+
+    blended = (
+        weight * _normalize_by_group(relevance, groups, len(step_names))
+        + (1 - weight) * _normalize_by_group(provider, groups, len(step_names))
+    )
+    if store is not None:
+        # В БД перезапишутся только изменившиеся rank_score
+        findings.mark_rank_changed(store.set_rank_scores(blended))
+    else:
+        for finding, value in zip(findings, blended.tolist()):
+            finding.metadata["rank_score"] = value
+    return blended
+
+
+def rank_score(finding: Finding) -> float:
+    """Оценка для сортировки: после переранжирования или от провайдера."""
+    return finding.metadata.get("rank_score", finding.score)
+
+
+def top_findings(
+    findings: Sequence[Finding],
+    query: str,
+    k: int,
+    weight: float = 0.5,
+    scorer: Optional[Callable[[List[str], np.ndarray], np.ndarray]] = None,
+) -> List[Finding]:
+    """Переранжирует источники и возвращает `k` лучших.
+
+    Отбор идет ограниченной кучей размера `k` (для `FindingList` —
+    `argpartition` по колонке rank_score), без сортировки всех источников.
+    """
+    rerank(findings, query, weight, scorer)
+    if isinstance(findings, FindingList):
+        # У колоночного хранилища отбор векторный, без создания всех Finding
+        store = findings.store
+        return [store[i] for i in store.top(k, by="rank_score").tolist()]
+    return heapq.nlargest(k, findings, key=rank_score)
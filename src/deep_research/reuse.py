@@ -0,0 +1,315 @@
+"""Повторное использование источников прошлых сессий.
+
+Перед запросом к поисковым источникам шаг плана сравнивается с шагами
+прошлых сессий. Шаги плана по умолчанию одинаковы для разных тем, поэтому
+похожими должны быть и запрос сессии, и сам шаг. Для обоих хранятся
+MinHash-подписи слов. Кандидаты ищутся через LSH по подписи запроса: она
+режется на полосы, и хэши полос лежат в индексированной таблице SQLite.
+Поэтому индекс переживает перезапуск и не перебирает все сессии. Сходство
+кандидата — меньшая из оценок Жаккара для запроса и для шага.
+
+Источники похожих и достаточно свежих шагов подтягиваются как кандидаты.
+Живой поиск выполняется, только если таких источников меньше
+`reuse_min_findings`.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from deep_research import tracing
+from deep_research.db import get_engine
+from deep_research.rerank import hash_tokens
+from deep_research.state import Finding
+from deep_research.storage import ResearchStorage
+
+# Размер подписи: BANDS полос по ROWS значений. При похожести запросов
+# 0.8 шаг попадает в кандидаты с вероятностью ~0.9998, при 0.3 — ~0.12
+BANDS = 16
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+
+# Сколько похожих шагов прошлых сессий просматривать
+MAX_CANDIDATES = 5
+
+_rng = np.random.default_rng(20240601)
+_MUL = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_ADD = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS reuse_steps (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL,
+        step TEXT NOT NULL,
+        query TEXT NOT NULL,
+        signature BLOB NOT NULL,  -- MinHash запроса, затем шага
+        updated_at REAL NOT NULL,
+        UNIQUE (session_id, step)
+    );
+
+    CREATE TABLE IF NOT EXISTS reuse_bands (
+        key INTEGER NOT NULL,
+        step_id INTEGER NOT NULL
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_reuse_bands ON reuse_bands(key);
+"""
+
+# Шаги сохраненных сессий: шаг источника — колонка findings.step
+# (копия metadata["query"]); `{where}` сужает выборку до части сессий
+BACKFILL_SQL = """
+    SELECT f.session_id, f.step, s.query, CAST(strftime('%s', s.updated_at) AS REAL)
+    FROM findings f JOIN research_sessions s ON s.id = f.session_id
+    WHERE f.step IS NOT NULL{where}
+    GROUP BY f.session_id, f.step
+"""
+
+
+class ReusedStep(NamedTuple):
+    """Похожий шаг прошлой сессии."""
+
+    session_id: str
+    step: str
+    similarity: float
+    updated_at: float
+
+
+def minhash(text: str) -> np.ndarray:
+    """MinHash-подпись множества слов текста."""
+    terms = np.unique(hash_tokens([text.replace("\x00", " ")])[1])
+    if not len(terms):
+        return np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        values = terms[:, None] * _MUL + _ADD
+    return values.min(axis=0)
+
+
+def signature(query: str, step: str) -> np.ndarray:
+    """Подпись шага сессии: MinHash запроса и MinHash шага подряд."""
+    return np.concatenate((minhash(query), minhash(step)))
+
+
+def band_keys(sig: np.ndarray) -> List[int]:
+    """Ключи LSH-полос подписи запроса (знаковые 64-битные для SQLite)."""
+    keys = []
+    for band in range(BANDS):
+        chunk = sig[band * ROWS:(band + 1) * ROWS].tobytes()
+        digest = hashlib.blake2b(bytes([band]) + chunk, digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Оценка сходства Жаккара по двум подписям `minhash`.
+
+    Для подписей `signature` — меньшая из оценок для запроса и для шага.
+    """
+    equal = a == b
+    if len(equal) == NUM_PERM:
+        return float(np.mean(equal))
+    return float(min(np.mean(equal[:NUM_PERM]), np.mean(equal[NUM_PERM:])))
+
+
+class ReuseIndex:
+    """Персистентный индекс шагов прошлых сессий для повторного использования."""
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.engine = get_engine(db_path)
+        # Таблицы сессий нужны для заполнения индекса по старой БД
+        ResearchStorage(db_path)
+        self.engine.ensure_schema(SCHEMA)
+        self.engine.run_once("reuse:backfill", self._backfill)
+
+    @staticmethod
+    def _rows(session_id: str, step: str, query: str, updated_at: float) -> tuple:
+        sig = signature(query, step)
+        return (session_id, step, query, sig.tobytes(), updated_at), band_keys(sig)
+
+    @staticmethod
+    def _insert(conn, row: tuple, keys: List[int]) -> None:
+        existing = conn.execute(
+            "SELECT id FROM reuse_steps WHERE session_id = ? AND step = ?", row[:2]
+        ).fetchone()
+        if existing is not None:
+            # Текст шага тот же — обновляется только свежесть
+            conn.execute("UPDATE reuse_steps SET updated_at = ? WHERE id = ?",
+                         (row[4], existing[0]))
+            return
+        step_id = conn.execute(
+            """INSERT INTO reuse_steps (session_id, step, query, signature, updated_at)
+               VALUES (?, ?, ?, ?, ?)""",
+            row,
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO reuse_bands (key, step_id) VALUES (?, ?)",
+            [(key, step_id) for key in keys],
+        )
+
+    def _backfill(self, conn) -> None:
+        """Заполняет индекс шагами сессий, сохраненных до его появления."""
+        if conn.execute("SELECT 1 FROM reuse_steps LIMIT 1").fetchone():
+            return
+        conn.execute("BEGIN")
+        try:
+            sql = BACKFILL_SQL.format(where="")
+            for session_id, step, query, updated_at in conn.execute(sql).fetchall():
+                row, keys = self._rows(session_id, step, query, updated_at or time.time())
+                self._insert(conn, row, keys)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def index_sessions(self, session_ids: Sequence[str]) -> int:
+        """Переиндексирует шаги сессий, записанных в обход поиска (импорт).
+
+        Прежние записи этих сессий заменяются. Возвращает число шагов.
+        """
+        if not session_ids:
+            return 0
+        marks = ",".join("?" * len(session_ids))
+        found = self.engine.reader().execute(
+            BACKFILL_SQL.format(where=f" AND f.session_id IN ({marks})"), list(session_ids)
+        ).fetchall()
+        # Подписи считаются до записи, чтобы не занимать писателя
+        rows = [self._rows(session_id, step, query, updated_at or time.time())
+                for session_id, step, query, updated_at in found]
+
+        def write(conn):
+            conn.execute(
+                f"""DELETE FROM reuse_bands WHERE step_id IN (
+                        SELECT id FROM reuse_steps WHERE session_id IN ({marks}))""",
+                list(session_ids),
+            )
+            conn.execute(f"DELETE FROM reuse_steps WHERE session_id IN ({marks})",
+                         list(session_ids))
+            for row, keys in rows:
+                self._insert(conn, row, keys)
+
+        self.engine.write(write)
+        return len(rows)
+
+    def record(self, session_id: str, query: str, step: str) -> None:
+        """Запоминает шаг сессии, найденный живым поиском (в фоне)."""
+        row, keys = self._rows(session_id, step, query, time.time())
+        self.engine.submit(lambda conn: self._insert(conn, row, keys))
+
+    def similar(self, query: str, step: str, min_similarity: float,
+                exclude_session: Optional[str] = None) -> List[ReusedStep]:
+        """Похожие шаги прошлых сессий, от самых похожих."""
+        sig = signature(query, step)
+        keys = band_keys(sig)
+        conn = self.engine.reader()
+        rows = conn.execute(
+            f"""SELECT id, session_id, step, signature, updated_at FROM reuse_steps
+                WHERE id IN (SELECT step_id FROM reuse_bands
+                             WHERE key IN ({",".join("?" * len(keys))}))""",
+            keys,
+        ).fetchall()
+        found = []
+        for _, session_id, stored_step, blob, updated_at in rows:
+            if session_id == exclude_session:
+                continue
+            value = similarity(sig, np.frombuffer(blob, dtype=np.uint64))
+            if value >= min_similarity:
+                found.append(ReusedStep(session_id, stored_step, value, updated_at))
+        found.sort(key=lambda s: (-s.similarity, -s.updated_at))
+        return found[:MAX_CANDIDATES]
+
+    def load_findings(self, reused: ReusedStep, step: str) -> List[Finding]:
+        """Источники шага прошлой сессии, переписанные на текущий шаг."""
+        rows = self.engine.reader().execute(
+            """SELECT source, url, title, content, score, metadata FROM findings
+               WHERE session_id = ? AND step = ?
+               ORDER BY position, id""",
+            (reused.session_id, reused.step),
+        ).fetchall()
+        findings = []
+        for source, url, title, content, score, metadata in rows:
+            metadata = json.loads(metadata) if metadata else {}
+            metadata.pop("rank_score", None)
+            metadata["query"] = step
+            metadata["reused_from"] = reused.session_id
+            findings.append(Finding(source=source, url=url, title=title, content=content,
+                                    score=score, metadata=metadata))
+        return findings
+
+
+ReuseCallback = Callable[[str, List[ReusedStep], int, bool], None]
+
+
+class ReusingSearch:
+    """Поиск, который сначала берет источники похожих шагов прошлых сессий.
+
+    Учитываются только шаги, обновленные не раньше чем `max_age` секунд
+    назад (0 — без ограничения). Если их источников не меньше
+    `min_findings`, живой поиск не выполняется. Иначе результаты живого
+    поиска добавляются к подтянутым. `on_reuse(step, шаги, источников,
+    был ли живой поиск)` вызывается, когда что-то подтянуто.
+    """
+
+    def __init__(
+        self,
+        searcher: Any,
+        index: ReuseIndex,
+        session_id: str,
+        query: str,
+        min_similarity: float = 0.8,
+        min_findings: int = 5,
+        max_age: float = 604800,
+        on_reuse: Optional[ReuseCallback] = None,
+    ):
+        self.searcher = searcher
+        self.index = index
+        self.session_id = session_id
+        self.query = query
+        self.min_similarity = min_similarity
+        self.min_findings = min_findings
+        self.max_age = max_age
+        self.on_reuse = on_reuse
+
+    def search(self, step: str) -> List[Finding]:
+        return self.search_step(step)[0]
+
+    def search_step(self, step: str) -> Tuple[List[Finding], bool]:
+        """Источники шага и был ли выполнен живой поиск."""
+        with tracing.span("reuse", "lookup") as span:
+            fresh_after = time.time() - self.max_age if self.max_age > 0 else float("-inf")
+            steps = [
+                s for s in self.index.similar(self.query, step, self.min_similarity,
+                                              exclude_session=self.session_id)
+                if s.updated_at >= fresh_after
+            ]
+            reused: List[Finding] = []
+            for similar in steps:
+                reused.extend(self.index.load_findings(similar, step))
+            span.add(findings=len(reused))
+
+        live = len(reused) < self.min_findings
+        if reused and self.on_reuse is not None:
+            self.on_reuse(step, steps, len(reused), live)
+        if not live:
+            return reused, False
+        findings = self.searcher.search(step)
+        self.index.record(self.session_id, self.query, step)
+        return reused + findings, True
+
+
+_indexes: Dict[str, ReuseIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_reuse_index(db_path: str) -> ReuseIndex:
+    """Возвращает общий для процесса индекс для указанной БД."""
+    key = str(Path(db_path).resolve())
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None or index.engine._closed:
+            index = _indexes[key] = ReuseIndex(db_path)
+        return index
@@ -1,35 +1,97 @@
-"""Интеграция с Tavily для web поиска."""
+"""Поисковые бэкенды: интерфейс, реестр и интеграция с Tavily."""
 
-from typing import List
+import atexit
+import threading
+from typing import Callable, Dict, List, Protocol, Tuple
 
+import requests
+from requests.adapters import HTTPAdapter
 from tavily import TavilyClient
+from tavily.errors import TimeoutError as TavilyTimeout
+from tavily.errors import UsageLimitExceededError
 
+from deep_research import tracing
 from deep_research.state import Finding
 from deep_research.config import SearchConfig
+from deep_research.ratelimit import (
+    BackendOverloaded,
+    RetryableError,
+    get_rate_limiter,
+    reset_rate_limiters,
+)
+
+
+class SearchBackend(Protocol):
+    """Интерфейс поискового бэкенда.
+
+    `max_results` и `search_depth` входят в ключ кэша результатов.
+    """
+
+    max_results: int
+    search_depth: str
+
+    def search(self, query: str) -> List[Finding]:
+        ...
 
 
 class TavilySearch:
     """Поиск через Tavily API."""
-    
+
     def __init__(self, config: SearchConfig):
         if not config.tavily_api_key:
             raise ValueError(
                 "Tavily API key not configured. "
                 "Add it to config/config.toml or set TAVILY_API_KEY env var"
             )
-        self.client = TavilyClient(api_key=config.tavily_api_key)
+        # Своя сессия с пулом keep-alive соединений на все потоки поиска
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=max(config.max_concurrency, config.global_concurrency))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # Размер ответов для трассировки (учитываются и повторы)
+        self.session.hooks["response"].append(
+            lambda response, **kwargs: tracing.add(bytes=len(response.content))
+        )
+        self.client = TavilyClient(
+            api_key=config.tavily_api_key,
+            api_base_url=config.tavily_base_url or None,
+            session=self.session,
+        )
         self.max_results = config.max_results
         self.search_depth = config.search_depth
-    
+        # Общие на процесс лимиты запросов к API (см. deep_research.ratelimit)
+        self.limiter = get_rate_limiter(
+            "tavily", config, (config.tavily_api_key, config.tavily_base_url)
+        )
+
+    def _request(self, query: str) -> dict:
+        """Один запрос к API; временные ошибки переводятся в RetryableError."""
+        try:
+            return self.client.search(
+                query=query,
+                max_results=self.max_results,
+                search_depth=self.search_depth,
+                include_answer=False,  # Нам нужны только источники
+            )
+        except UsageLimitExceededError as e:
+            raise BackendOverloaded(
+                f"Tavily: превышен лимит запросов ({e})",
+                retry_after=getattr(e, "retry_after_seconds", None),
+            ) from e
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else 0
+            if status >= 500:
+                raise BackendOverloaded(f"Tavily: ошибка сервера {status}") from e
+            raise
+        except (requests.ConnectionError, requests.Timeout, TavilyTimeout) as e:
+            raise RetryableError(f"Tavily: {e}") from e
+
     def search(self, query: str) -> List[Finding]:
         """Выполняет поиск и возвращает найденные источники."""
-        response = self.client.search(
-            query=query,
-            max_results=self.max_results,
-            search_depth=self.search_depth,
-            include_answer=False,  # Нам нужны только источники
-        )
-        
+        with tracing.span("backend", "tavily", query=query) as span:
+            response = self.limiter.call(lambda: self._request(query))
+            span.add(findings=len(response.get("results", [])))
+
         findings = []
         for result in response.get("results", []):
             findings.append(Finding(
@@ -39,8 +101,81 @@ class TavilySearch:
                 content=result.get("content", ""),
                 score=result.get("score", 0.0),
                 metadata={
-                    "raw_content": result.get("raw_content", "")
+                    "raw_content": result.get("raw_content", ""),
+                    "query": query,
                 }
             ))
-        
+
         return findings
+
+    def close(self) -> None:
+        """Закрывает HTTP соединения."""
+        self.session.close()
+
+
+_clients: Dict[Tuple, TavilySearch] = {}
+_clients_lock = threading.Lock()
+
+
+def _client_key(config: SearchConfig) -> Tuple:
+    return (
+        config.tavily_api_key,
+        config.tavily_base_url,
+        config.max_results,
+        config.search_depth,
+        config.max_concurrency,
+    )
+
+
+def get_search_client(config: SearchConfig) -> TavilySearch:
+    """Возвращает общий для процесса клиент для данной конфигурации.
+
+    Клиент создается один раз и переиспользует HTTP соединения между
+    шагами, сессиями и потоками.
+    """
+    key = _client_key(config)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = TavilySearch(config)
+            _clients[key] = client
+        return client
+
+
+BackendFactory = Callable[[SearchConfig], SearchBackend]
+
+_backends: Dict[str, BackendFactory] = {}
+
+
+def register_backend(name: str, factory: BackendFactory) -> None:
+    """Регистрирует источник поиска, включаемый через `search.sources`.
+
+    `factory` получает SearchConfig и возвращает объект с интерфейсом
+    SearchBackend; источники findings должны иметь `source=name`.
+    """
+    _backends[name] = factory
+
+
+def get_backend(name: str, config: SearchConfig) -> SearchBackend:
+    """Бэкенд источника по имени из реестра."""
+    factory = _backends.get(name)
+    if factory is None:
+        raise ValueError(
+            f"Unknown search source: {name!r}. Available: {', '.join(sorted(_backends))}"
+        )
+    return factory(config)
+
+
+def close_search_clients() -> None:
+    """Закрывает все клиенты реестра."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    reset_rate_limiters()
+    for client in clients:
+        client.close()
+
+
+register_backend("tavily", get_search_client)
+
+atexit.register(close_search_clients)
@@ -1,13 +1,43 @@
 """Pydantic модели для состояния исследования."""
 
-from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
+import hashlib
+import json
+import uuid
+from array import array
+from collections.abc import MutableSequence
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Dict, Tuple
+from pydantic import BaseModel, Field, GetCoreSchemaHandler, PrivateAttr
+from pydantic_core import core_schema
 from datetime import datetime
 
+import numpy as np
+
+# Ключ metadata со ссылкой на полный текст страницы в хранилище блобов
+RAW_CONTENT_REF = "raw_content_ref"
+
+# Отсутствующий rank_score в колонке FindingStore
+_NO_RANK = float("nan")
+
+
+def _content_key(finding: "Finding", metadata_json: str) -> int:
+    raw = "\x00".join((finding.source, finding.url, finding.title, finding.content,
+                        repr(finding.score), metadata_json))
+    digest = hashlib.blake2b(raw.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def content_key(finding: "Finding") -> int:
+    """64-битный хэш содержимого источника без rank_score.
+
+    Знаковый, чтобы помещаться в INTEGER SQLite: считается один раз при
+    добавлении источника и хранится колонкой в FindingStore и в `findings`.
+    """
+    return _content_key(finding, FindingStore._split(finding)[1])
+
 
 class Finding(BaseModel):
     """Найденный источник информации."""
-    
+
     source: str = Field(..., description="Источник: tavily, github, arxiv")
     url: str
     title: str
@@ -15,34 +45,601 @@ class Finding(BaseModel):
     score: float = Field(default=0.0, description="Релевантность 0-1")
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
+    _blobs: Any = PrivateAttr(default=None)
+    _raw_content: Optional[str] = PrivateAttr(default=None)
+
+    def attach_blobs(self, store: Any) -> None:
+        """Привязывает хранилище, из которого читается raw_content."""
+        self._blobs = store
+
+    def get_raw_content(self, cache: bool = True) -> str:
+        """Полный текст страницы.
+
+        Старые источники хранят его прямо в metadata, новые — ссылкой
+        на хранилище блобов; текст распаковывается при первом обращении
+        и при `cache=True` остается в памяти.
+        """
+        if "raw_content" in self.metadata:
+            return self.metadata["raw_content"] or ""
+        if self._raw_content is not None:
+            return self._raw_content
+        key = self.metadata.get(RAW_CONTENT_REF)
+        if not key:
+            return ""
+        if self._blobs is not None:
+            text = self._blobs.get(key)
+        else:
+            from deep_research.blobs import find_blob
+            text = find_blob(key)
+        if text is None:
+            return ""
+        if cache:
+            self._raw_content = text
+        return text
+
+    @property
+    def raw_content(self) -> str:
+        """Полный текст страницы (распаковывается лениво)."""
+        return self.get_raw_content()
+
+
+class _TextColumn:
+    """Строки одного поля в общем буфере UTF-8.
+
+    Границы строк хранятся в массивах `array`, перезапись строки
+    дописывает новые байты в конец буфера. Когда перезаписанные байты
+    занимают больше половины буфера, он уплотняется.
+    """
+
+    # Буферы меньше этого не уплотняются
+    COMPACT_MIN_BYTES = 1 << 16
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.starts = array("q")
+        self.ends = array("q")
+        self.dead = 0
+
+    def append(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self.starts.append(len(self.buffer))
+        self.buffer += data
+        self.ends.append(len(self.buffer))
+
+    def set(self, index: int, text: str) -> None:
+        data = text.encode("utf-8")
+        start, end = self.starts[index], self.ends[index]
+        if self.buffer[start:end] == data:
+            return
+        self.dead += end - start
+        self.starts[index] = len(self.buffer)
+        self.buffer += data
+        self.ends[index] = len(self.buffer)
+        if self.dead * 2 > len(self.buffer) >= self.COMPACT_MIN_BYTES:
+            self.compact()
+
+    def compact(self) -> None:
+        """Переписывает буфер без байтов перезаписанных строк."""
+        column = self.take(np.arange(len(self.starts)))
+        self.buffer, self.starts, self.ends = column.buffer, column.starts, column.ends
+        self.dead = 0
+
+    def get(self, index: int) -> str:
+        return self.buffer[self.starts[index]:self.ends[index]].decode("utf-8")
+
+    def take(self, indices: np.ndarray) -> "_TextColumn":
+        """Новая колонка из строк `indices` (копирование срезов буфера)."""
+        starts = np.frombuffer(self.starts, dtype=np.int64)[indices]
+        ends = np.frombuffer(self.ends, dtype=np.int64)[indices]
+        lengths = ends - starts
+        new_ends = np.cumsum(lengths)
+
+        column = _TextColumn()
+        view = memoryview(self.buffer)
+        column.buffer = bytearray(b"".join(
+            view[start:end] for start, end in zip(starts.tolist(), ends.tolist())
+        ))
+        view.release()
+        column.starts = array("q", (new_ends - lengths).tobytes())
+        column.ends = array("q", new_ends.tobytes())
+        return column
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.buffer) + 16 * len(self.starts)
+
+
+class FindingStore:
+    """Колоночное хранилище источников.
+
+    Score лежат в массивах чисел, названия источников и шаги плана
+    (`metadata["query"]`) интернированы, а текстовые поля (url, title,
+    content и metadata в JSON) хранятся границами в общих буферах. Рядом
+    лежит хэш содержимого каждого источника (`content_key`), посчитанный
+    при добавлении. `Finding` создается только при обращении
+    к элементу, поэтому изменения полученного объекта нужно записывать
+    обратно через `store[i] = finding`.
+    """
+
+    _TEXT_FIELDS = ("url", "title", "content", "metadata")
+
+    def __init__(self, findings: Iterable[Finding] = ()):
+        self._sources: List[str] = []
+        self._source_ids: Dict[str, int] = {}
+        self._source = array("i")
+        self._steps: List[str] = []
+        self._step_ids: Dict[str, int] = {}
+        self._step = array("i")
+        self._score = array("d")
+        self._rank = array("d")
+        self._key = array("q")
+        self._text = {name: _TextColumn() for name in self._TEXT_FIELDS}
+        self.extend(findings)
+
+    @staticmethod
+    def _intern(value: str, names: List[str], ids: Dict[str, int]) -> int:
+        value_id = ids.get(value)
+        if value_id is None:
+            value_id = len(names)
+            names.append(value)
+            ids[value] = value_id
+        return value_id
+
+    def _intern_step(self, finding: Finding) -> int:
+        return self._intern(str(finding.metadata.get("query", "")), self._steps, self._step_ids)
+
+    @staticmethod
+    def _split(finding: Finding) -> tuple:
+        # rank_score хранится колонкой, чтобы переранжирование писало его пакетно
+        metadata = finding.metadata
+        rank = metadata.get("rank_score", _NO_RANK)
+        if "rank_score" in metadata:
+            metadata = {k: v for k, v in metadata.items() if k != "rank_score"}
+        return rank, json.dumps(metadata, ensure_ascii=False, default=str) if metadata else ""
+
+    def append(self, finding: Finding, key: Optional[int] = None) -> None:
+        """Добавляет источник; `key` — уже известный `content_key` (из БД)."""
+        rank, metadata = self._split(finding)
+        self._source.append(self._intern(finding.source, self._sources, self._source_ids))
+        self._step.append(self._intern_step(finding))
+        self._score.append(finding.score)
+        self._rank.append(rank)
+        self._key.append(_content_key(finding, metadata) if key is None else key)
+        self._text["url"].append(finding.url)
+        self._text["title"].append(finding.title)
+        self._text["content"].append(finding.content)
+        self._text["metadata"].append(metadata)
+
+    def extend(self, findings: Iterable[Finding]) -> None:
+        if isinstance(findings, FindingStore):
+            # Хэши уже посчитаны
+            for finding, key in zip(findings, findings._key):
+                self.append(finding, key)
+            return
+        for finding in findings:
+            self.append(finding)
+
+    def __len__(self) -> int:
+        return len(self._score)
+
+    def _get(self, index: int) -> Finding:
+        metadata_json = self._text["metadata"].get(index)
+        metadata = json.loads(metadata_json) if metadata_json else {}
+        rank = self._rank[index]
+        if rank == rank:  # не NaN
+            metadata["rank_score"] = rank
+        return Finding.model_construct(
+            source=self._sources[self._source[index]],
+            url=self._text["url"].get(index),
+            title=self._text["title"].get(index),
+            content=self._text["content"].get(index),
+            score=self._score[index],
+            metadata=metadata,
+        )
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("FindingStore index out of range")
+        return self._get(index)
+
+    def __setitem__(self, index: int, finding: Finding) -> None:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("FindingStore index out of range")
+        rank, metadata = self._split(finding)
+        self._source[index] = self._intern(finding.source, self._sources, self._source_ids)
+        self._step[index] = self._intern_step(finding)
+        self._score[index] = finding.score
+        self._rank[index] = rank
+        self._key[index] = _content_key(finding, metadata)
+        self._text["url"].set(index, finding.url)
+        self._text["title"].set(index, finding.title)
+        self._text["content"].set(index, finding.content)
+        self._text["metadata"].set(index, metadata)
+
+    def __iter__(self) -> Iterator[Finding]:
+        for i in range(len(self)):
+            yield self._get(i)
+
+    def differs(self, index: int, finding: Finding) -> bool:
+        """Отличается ли `finding` от сохраненного в строке `index`."""
+        rank, metadata = self._split(finding)
+        stored_rank = self._rank[index]
+        return (
+            self._sources[self._source[index]] != finding.source
+            or self._score[index] != finding.score
+            or not (stored_rank == rank or (stored_rank != stored_rank and rank != rank))
+            or any(self._text[name].get(index) != value for name, value in (
+                ("url", finding.url), ("title", finding.title),
+                ("content", finding.content), ("metadata", metadata),
+            ))
+        )
+
+    # --- векторные операции ---
+
+    @property
+    def scores(self) -> np.ndarray:
+        """Score провайдера (копия)."""
+        return np.array(self._score, dtype=np.float64)
+
+    @property
+    def keys(self) -> np.ndarray:
+        """`content_key` источников (копия)."""
+        return np.array(self._key, dtype=np.int64)
+
+    @property
+    def rank_scores(self) -> np.ndarray:
+        """rank_score после переранжирования, NaN если его нет (копия)."""
+        return np.array(self._rank, dtype=np.float64)
+
+    def set_rank_scores(self, values: np.ndarray) -> np.ndarray:
+        """Записывает rank_score всем источникам разом.
+
+        Возвращает индексы источников, у которых rank_score изменился.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) != len(self):
+            raise ValueError("rank scores length does not match the store")
+        old = np.frombuffer(self._rank, dtype=np.float64)
+        same = (old == values) | (np.isnan(old) & np.isnan(values))
+        self._rank = array("d", values.tobytes())
+        return np.flatnonzero(~same)
+
+    def source_mask(self, source: str) -> np.ndarray:
+        """Маска источников с данным `source`."""
+        source_id = self._source_ids.get(source, -1)
+        return np.frombuffer(self._source, dtype=np.int32) == source_id
+
+    def source_names(self) -> List[str]:
+        """Поле `source` всех источников по порядку."""
+        return [self._sources[i] for i in self._source]
+
+    def step_groups(self) -> Tuple[List[str], np.ndarray]:
+        """Шаги плана и номер шага каждого источника (без разбора metadata).
+
+        Источники без `metadata["query"]` относятся к шагу "".
+        """
+        return list(self._steps), np.array(self._step, dtype=np.int64)
+
+    def texts(self, field: str) -> Iterator[str]:
+        """Значения текстового поля по порядку, без создания `Finding`."""
+        column = self._text[field]
+        for i in range(len(self)):
+            yield column.get(i)
+
+    def order(self, by: str = "score", descending: bool = True) -> np.ndarray:
+        """Индексы источников, отсортированные по `score` или `rank_score`.
+
+        Источники без rank_score при сортировке по нему идут по score.
+        """
+        values = self.scores
+        if by == "rank_score":
+            values = np.where(np.isnan(self.rank_scores), values, self.rank_scores)
+        elif by != "score":
+            raise ValueError(f"Unknown sort key: {by}")
+        return np.argsort(-values if descending else values, kind="stable")
+
+    def top(self, k: int, by: str = "score") -> np.ndarray:
+        """Индексы `k` лучших источников по убыванию."""
+        if k >= len(self):
+            return self.order(by)
+        values = self.scores
+        if by == "rank_score":
+            values = np.where(np.isnan(self.rank_scores), values, self.rank_scores)
+        best = np.argpartition(-values, k)[:k]
+        return best[np.argsort(-values[best], kind="stable")]
+
+    def select(self, indices: Iterable[int]) -> "FindingStore":
+        """Новое хранилище из источников с данными индексами."""
+        indices = np.asarray(indices, dtype=np.int64)
+        store = FindingStore()
+        store._sources = list(self._sources)
+        store._source_ids = dict(self._source_ids)
+        store._source = array("i", np.frombuffer(self._source, dtype=np.int32)[indices].tobytes())
+        store._steps = list(self._steps)
+        store._step_ids = dict(self._step_ids)
+        store._step = array("i", np.frombuffer(self._step, dtype=np.int32)[indices].tobytes())
+        store._score = array("d", np.frombuffer(self._score, dtype=np.float64)[indices].tobytes())
+        store._rank = array("d", np.frombuffer(self._rank, dtype=np.float64)[indices].tobytes())
+        store._key = array("q", np.frombuffer(self._key, dtype=np.int64)[indices].tobytes())
+        store._text = {name: column.take(indices) for name, column in self._text.items()}
+        return store
+
+    def filter(self, mask: np.ndarray) -> "FindingStore":
+        """Новое хранилище из источников, отмеченных маской."""
+        return self.select(np.flatnonzero(mask))
+
+    @property
+    def nbytes(self) -> int:
+        """Приблизительный объем данных хранилища в байтах."""
+        numeric = (self._source.itemsize + self._step.itemsize + 24) * len(self._score)
+        return numeric + sum(column.nbytes for column in self._text.values())
+
+
+class FindingList(MutableSequence):
+    """Список источников сессии.
+
+    Ведет себя как обычный `list` (в том числе при (де)сериализации
+    pydantic), но хранит данные в колоночном `FindingStore`, умеет
+    загружать содержимое из БД при первом обращении и помнит, сколько
+    элементов уже сохранено (`persisted`), чтобы хранилище записывало
+    только новые.
+
+    Источники, полученные по индексу, запоминаются и записываются
+    обратно в колонки перед следующим чтением хранилища и перед
+    сохранением, поэтому `findings[i].score = ...` работает как со
+    списком. При итерации
+    изменения элемента записываются, когда цикл переходит к следующему
+    (или при следующем чтении, если цикл прерван), поэтому в памяти
+    одновременно живет только один созданный итерацией `Finding`.
+    Измененные сохраненные источники отмечаются для записи в БД.
+    """
+
+    def __init__(
+        self,
+        items: Iterable[Any] = (),
+        loader: Optional[Callable[[], Iterable[Finding]]] = None,
+        persisted: int = 0,
+    ):
+        self._items = FindingStore(
+            f if isinstance(f, Finding) else Finding.model_validate(f) for f in items
+        )
+        self._loader = loader
+        self.persisted = persisted
+        self._changed: set = set()
+        self._rank_changed: set = set()
+        self._truncated = False
+        self._live: Dict[int, Finding] = {}
+
+    def _load(self) -> FindingStore:
+        if self._loader is not None:
+            loader, self._loader = self._loader, None
+            loaded = loader()
+            store = loaded if isinstance(loaded, FindingStore) else FindingStore(loaded)
+            store.extend(self._items)
+            self._items = store
+        self._flush_live()
+        return self._items
+
+    def _flush_live(self) -> None:
+        if self._live:
+            # Записываем обратно источники, выданные по индексу
+            live, self._live = self._live, {}
+            for index, finding in live.items():
+                self._write_back(index, finding)
+
+    def _write_back(self, index: int, finding: Finding) -> None:
+        if index < len(self._items) and self._items.differs(index, finding):
+            self._items[index] = finding
+            self.mark_changed(index)
+
+    @property
+    def loaded(self) -> bool:
+        """Загружено ли содержимое из БД."""
+        return self._loader is None
+
+    @property
+    def store(self) -> FindingStore:
+        """Колоночное хранилище (с загрузкой из БД) для векторных операций."""
+        return self._load()
+
+    def __len__(self) -> int:
+        if self._loader is not None:
+            return self.persisted + len(self._items)
+        return len(self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._load()[index]
+        if self._loader is not None:
+            self._load()
+        if index < 0:
+            index += len(self._items)
+        finding = self._live.get(index)
+        if finding is None:
+            finding = self._items[index]
+            self._live[index] = finding
+        return finding
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            items = list(self._load())
+            start = min(range(*index.indices(len(items))), default=len(items))
+            items[index] = value
+            self._replace(items, start)
+            return
+        store = self._load()
+        if index < 0:
+            index += len(store)
+        store[index] = value
+        self.mark_changed(index)
+
+    def __delitem__(self, index) -> None:
+        items = list(self._load())
+        if isinstance(index, slice):
+            start = min(range(*index.indices(len(items))), default=len(items))
+        else:
+            start = index + len(items) if index < 0 else index
+        del items[index]
+        self._replace(items, start)
+
+    def _replace(self, items: List[Finding], start: int) -> None:
+        """Заменяет содержимое: позиции с `start` сдвинулись и пишутся заново."""
+        self._items = FindingStore(items)
+        self._changed.update(range(start, min(self.persisted, len(items))))
+        if len(items) < self.persisted:
+            # Лишние строки в конце удаляются при следующем сохранении
+            self.persisted = len(items)
+            self._truncated = True
+
+    def __iter__(self) -> Iterator[Finding]:
+        store = self._load()
+        for index in range(len(store)):
+            finding = self._live.get(index)
+            if finding is not None:
+                # Уже выдан по индексу: запишется вместе с остальными
+                yield finding
+                continue
+            finding = store[index]
+            self._live[index] = finding
+            yield finding
+            if self._live.get(index) is finding and self._items is store:
+                del self._live[index]
+                self._write_back(index, finding)
+
+    def insert(self, index: int, value: Finding) -> None:
+        items = list(self._load())
+        items.insert(index, value)
+        start = min(max(index + len(items) - 1 if index < 0 else index, 0), len(items) - 1)
+        self._replace(items, start)
+
+    def append(self, value: Finding) -> None:
+        # Добавление в конец не требует загрузки из БД
+        self._items.append(value)
+
+    def extend(self, values: Iterable[Finding]) -> None:
+        self._items.extend(values)
+
+    def unsaved(self) -> List[Finding]:
+        """Источники, добавленные после последнего сохранения."""
+        if self._loader is not None:
+            return list(self._items)
+        self._flush_live()
+        return self._items[self.persisted:]
+
+    def mark_changed(self, index: int) -> None:
+        """Отмечает уже сохраненный источник как измененный."""
+        if index < self.persisted:
+            self._changed.add(index)
+
+    def mark_rank_changed(self, indices: Iterable[int]) -> None:
+        """Отмечает сохраненные источники, у которых изменился только rank_score."""
+        persisted = self.persisted
+        self._rank_changed.update(int(i) for i in indices if i < persisted)
+
+    def restore_changed(
+        self, indices: Iterable[int], ranks: Iterable[int] = (), truncated: bool = False
+    ) -> None:
+        """Снова отмечает источники измененными (запись не удалась)."""
+        self._changed.update(indices)
+        self._rank_changed.update(ranks)
+        self._truncated = self._truncated or truncated
+
+    def pop_truncated(self) -> bool:
+        """Нужно ли удалить из БД строки после конца списка (после удаления источников)."""
+        truncated, self._truncated = self._truncated, False
+        return truncated
+
+    def pop_changed(self) -> Dict[int, Finding]:
+        """Возвращает и сбрасывает измененные сохраненные источники."""
+        self._flush_live()
+        changed, self._changed = self._changed, set()
+        if not changed:
+            return {}
+        items = self._load()
+        return {i: items[i] for i in sorted(changed) if i < len(items)}
+
+    def pop_rank_changed(self) -> Dict[int, Optional[float]]:
+        """Возвращает и сбрасывает новые rank_score сохраненных источников.
+
+        Источники, измененные целиком (`pop_changed`), сюда не попадают:
+        их rank_score записывается вместе со строкой.
+        """
+        changed, self._rank_changed = self._rank_changed - self._changed, set()
+        if not changed:
+            return {}
+        ranks = self._load().rank_scores
+        return {
+            i: (None if np.isnan(ranks[i]) else float(ranks[i]))
+            for i in sorted(changed) if i < len(ranks)
+        }
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (FindingList, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"FindingList({list(self)!r})"
+
+    def model_dump(self) -> Dict[str, Any]:
+        """Представление для сериализатора чекпоинтов LangGraph."""
+        return {"items": [f.model_dump() for f in self], "persisted": self.persisted}
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        list_schema = handler.generate_schema(List[Finding])
+        return core_schema.no_info_after_validator_function(
+            cls._validate,
+            core_schema.union_schema([core_schema.is_instance_schema(cls), list_schema]),
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda v: list(v), return_schema=list_schema
+            ),
+        )
+
+    @classmethod
+    def _validate(cls, value: Any) -> "FindingList":
+        return value if isinstance(value, cls) else cls(value)
+
 
 class ResearchState(BaseModel):
     """Состояние сессии исследования."""
-    
+
     # Идентификация
-    session_id: str
+    session_id: str = Field(default_factory=lambda: str(uuid.uuid4())[:8])
     query: str
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
-    
+
     # Планирование
     plan: List[str] = Field(default_factory=list)
     current_step: int = Field(default=0)
-    
+
     # Данные
-    findings: List[Finding] = Field(default_factory=list)
-    
+    findings: FindingList = Field(default_factory=FindingList)
+
     # Контроль
     user_feedback: Optional[str] = None
     status: str = Field(default="active")  # active, paused, completed
-    
+
     # Результат
     final_report: Optional[str] = None
     report_path: Optional[str] = None
-    
+
     # Метрики
     total_tokens: int = Field(default=0)
     search_calls: int = Field(default=0)
-    
+    # Агрегаты трассировки: "node.search" -> {"calls", "seconds", ...}
+    metrics: Dict[str, Dict[str, float]] = Field(default_factory=dict)
+
     class Config:
         arbitrary_types_allowed = True
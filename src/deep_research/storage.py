@@ -1,134 +1,748 @@
 """SQLite persistence для исследований."""
 
+import atexit
 import json
-import sqlite3
+import threading
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
 
-from deep_research.state import ResearchState, Finding
+from deep_research.db import Engine, get_engine
+from deep_research.blobs import get_blob_store
+from deep_research.state import ResearchState, Finding, FindingList, FindingStore, content_key
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS research_sessions (
+        id TEXT PRIMARY KEY,
+        query TEXT NOT NULL,
+        state_json TEXT NOT NULL,
+        status TEXT DEFAULT 'active',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        findings_count INTEGER DEFAULT 0,
+        search_calls INTEGER DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS findings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT,
+        source TEXT,
+        url TEXT,
+        title TEXT,
+        content TEXT,
+        score REAL,
+        metadata TEXT,
+        position INTEGER,
+        FOREIGN KEY (session_id) REFERENCES research_sessions(id)
+    );
+
+    -- Списки сессий идут в порядке (updated_at, id): с фильтром по
+    -- статусу и без него индекс отдает строки уже отсортированными
+    CREATE INDEX IF NOT EXISTS idx_sessions_status_updated
+        ON research_sessions(status, updated_at, id);
+
+    CREATE INDEX IF NOT EXISTS idx_sessions_updated
+        ON research_sessions(updated_at, id);
+"""
+
+# Колонки, добавленные после первой версии схемы
+MIGRATIONS = {
+    "research_sessions": {
+        "findings_count": "INTEGER DEFAULT 0",
+        "search_calls": "INTEGER DEFAULT 0",
+        "final_report": "TEXT",
+        "total_tokens": "INTEGER DEFAULT 0",
+        "metrics": "TEXT",  # JSON агрегатов трассировки
+    },
+    "findings": {
+        "position": "INTEGER",
+        # Отдельно от metadata: переранжирование обновляет только его
+        "rank_score": "REAL",
+        # Копия metadata["query"] под индексом: источники шага без json_extract
+        "step": "TEXT",
+        # content_key источника: кэш отчета сверяет по нему строки без хэширования текста
+        "content_key": "INTEGER",
+    },
+}
+
+# Буфер не перезаписывает строку с той же позицией: ее уже могло
+# записать сохранение сессии, у которого данные свежее
+INSERT_FINDING = """
+    INSERT OR IGNORE INTO findings
+    (session_id, source, url, title, content, score, metadata, position, rank_score, step,
+     content_key)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPSERT_FINDING = """
+    INSERT INTO findings
+    (session_id, source, url, title, content, score, metadata, position, rank_score, step,
+     content_key)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(session_id, position) DO UPDATE SET
+        source = excluded.source,
+        url = excluded.url,
+        title = excluded.title,
+        content = excluded.content,
+        score = excluded.score,
+        metadata = excluded.metadata,
+        rank_score = excluded.rank_score,
+        step = excluded.step,
+        content_key = excluded.content_key
+"""
+
+# Переранжирование меняет только rank_score: строка и FTS-индекс не трогаются
+UPDATE_RANK = "UPDATE findings SET rank_score = ? WHERE session_id = ? AND position = ?"
+
+# После удаления источников строки за концом списка больше не нужны
+TRUNCATE_FINDINGS = "DELETE FROM findings WHERE session_id = ? AND position >= ?"
+
+
+def _migrate(conn) -> None:
+    """Добавляет недостающие колонки в БД, созданные старой схемой."""
+    added = set()
+    for table, columns in MIGRATIONS.items():
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, ddl in columns.items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+                added.add((table, name))
+    if ("findings", "step") in added:
+        conn.execute(
+            """UPDATE findings SET step = json_extract(metadata, '$.query')
+               WHERE json_valid(metadata)"""
+        )
+    conn.execute(
+        """CREATE UNIQUE INDEX IF NOT EXISTS idx_findings_position
+           ON findings(session_id, position)"""
+    )
+    conn.execute(
+        """CREATE INDEX IF NOT EXISTS idx_findings_step
+           ON findings(session_id, step, position)"""
+    )
+    # Покрывающий индекс для `stats`: агрегаты считаются без чтения
+    # строк таблицы с тяжелыми state_json и final_report
+    conn.execute(
+        """CREATE INDEX IF NOT EXISTS idx_sessions_stats
+           ON research_sessions(created_at, status, findings_count, search_calls, total_tokens)"""
+    )
+    # Заменен индексом (status, updated_at, id)
+    conn.execute("DROP INDEX IF EXISTS idx_sessions_status")
+
+
+# Полнотекстовый индекс (FTS5) по источникам и отчетам. Индексы
+# external-content: текст хранится только в основных таблицах, а
+# триггеры обновляют индекс при каждой записи
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS findings_fts USING fts5(
+        title, content,
+        content='findings', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS findings_fts_ai AFTER INSERT ON findings BEGIN
+        INSERT INTO findings_fts(rowid, title, content)
+            VALUES (new.id, new.title, new.content);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS findings_fts_ad AFTER DELETE ON findings BEGIN
+        INSERT INTO findings_fts(findings_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS findings_fts_au AFTER UPDATE OF title, content ON findings BEGIN
+        INSERT INTO findings_fts(findings_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO findings_fts(rowid, title, content)
+            VALUES (new.id, new.title, new.content);
+    END;
+
+    CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+        query, final_report,
+        content='research_sessions', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS reports_fts_ai AFTER INSERT ON research_sessions BEGIN
+        INSERT INTO reports_fts(rowid, query, final_report)
+            VALUES (new.rowid, new.query, new.final_report);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS reports_fts_ad AFTER DELETE ON research_sessions BEGIN
+        INSERT INTO reports_fts(reports_fts, rowid, query, final_report)
+            VALUES ('delete', old.rowid, old.query, old.final_report);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS reports_fts_au
+    AFTER UPDATE OF query, final_report ON research_sessions BEGIN
+        INSERT INTO reports_fts(reports_fts, rowid, query, final_report)
+            VALUES ('delete', old.rowid, old.query, old.final_report);
+        INSERT INTO reports_fts(rowid, query, final_report)
+            VALUES (new.rowid, new.query, new.final_report);
+    END;
+"""
+
+# Маркеры подсветки в сниппетах; CLI заменяет их на разметку rich
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+SEARCH_SQL = """
+    SELECT 'finding', f.session_id, f.title, f.url,
+           snippet(findings_fts, -1, :hl_start, :hl_end, '…', 16),
+           bm25(findings_fts, 5.0, 1.0) AS rank
+    FROM findings_fts JOIN findings f ON f.id = findings_fts.rowid
+    WHERE findings_fts MATCH :query
+    UNION ALL
+    SELECT 'report', s.id, s.query, '',
+           snippet(reports_fts, -1, :hl_start, :hl_end, '…', 16),
+           bm25(reports_fts, 5.0, 1.0) AS rank
+    FROM reports_fts JOIN research_sessions s ON s.rowid = reports_fts.rowid
+    WHERE reports_fts MATCH :query
+    ORDER BY rank
+    LIMIT :limit OFFSET :offset
+"""
+
+
+class SearchHit(NamedTuple):
+    """Результат полнотекстового поиска по прошлым исследованиям."""
+
+    kind: str  # finding или report
+    session_id: str
+    title: str
+    url: str
+    snippet: str
+    rank: float
+
+
+# Форматы strftime для группировки статистики по периодам
+PERIODS = {
+    "day": "%Y-%m-%d",
+    "week": "%Y-W%W",
+    "month": "%Y-%m",
+}
+
+
+class SessionStats(NamedTuple):
+    """Агрегаты сессий за период."""
+
+    period: str
+    sessions: int
+    completed: int
+    findings: int
+    search_calls: int
+    tokens: int
+
+
+class SessionInfo(NamedTuple):
+    """Метаданные сессии без загрузки состояния."""
+
+    id: str
+    query: Optional[str]
+    status: Optional[str]
+    updated_at: Optional[str]
+    checkpointed: bool  # есть чекпоинты графа
+
+
+def fts_query(text: str) -> str:
+    """Превращает пользовательский запрос в запрос FTS5.
+
+    Каждое слово берется в кавычки, чтобы символы вроде `-` в "N-BEATS"
+    не считались операторами.
+    """
+    terms = text.split()
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _init_fts(conn) -> None:
+    """Создает FTS-индексы и заполняет их для уже существующих данных."""
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'findings_fts'"
+    ).fetchone()
+    conn.executescript(FTS_SCHEMA)
+    if not existed:
+        conn.execute("INSERT INTO findings_fts(findings_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO reports_fts(reports_fts) VALUES ('rebuild')")
+
+
+def _finding_row(session_id: str, finding: Finding, position: Optional[int] = None) -> tuple:
+    metadata = finding.metadata
+    rank = metadata.get("rank_score")
+    step = metadata.get("query")
+    if "rank_score" in metadata:
+        metadata = {k: v for k, v in metadata.items() if k != "rank_score"}
+    return (
+        session_id,
+        finding.source,
+        finding.url,
+        finding.title,
+        finding.content,
+        finding.score,
+        json.dumps(metadata),
+        position,
+        rank,
+        None if step is None else str(step),
+        content_key(finding),
+    )
+
+
+def _init_schema(engine: Engine) -> None:
+    engine.ensure_schema(SCHEMA)
+    engine.run_once("migrate:findings-position", _migrate)
+    engine.run_once("fts", _init_fts)
+
+
+class FindingsDelta(NamedTuple):
+    """Строки для UPSERT_FINDING, UPDATE_RANK, TRUNCATE_FINDINGS и состояние списка.
+
+    `commit` вызывается после фиксации транзакции, `rollback` — если
+    запись не удалась: тогда источники остаются несохраненными.
+    """
+
+    rows: List[tuple]
+    ranks: List[tuple]
+    findings: FindingList
+    persisted: int
+    changed: List[int]
+    rank_changed: List[int]
+    truncate: List[tuple]
+
+    def apply(self, conn) -> None:
+        """Записывает дельту в открытой транзакции писателя."""
+        conn.executemany(TRUNCATE_FINDINGS, self.truncate)
+        conn.executemany(UPSERT_FINDING, self.rows)
+        conn.executemany(UPDATE_RANK, self.ranks)
+
+    def commit(self) -> None:
+        self.findings.persisted = self.persisted
+
+    def rollback(self) -> None:
+        self.findings.restore_changed(self.changed, self.rank_changed, bool(self.truncate))
+
+
+def findings_delta(session_id: str, findings: FindingList) -> FindingsDelta:
+    """Измененные и новые с прошлого сохранения источники."""
+    new = findings.unsaved()
+    start = len(findings) - len(new)
+    # До pop_changed: rank_score измененных строк пишется вместе с ними
+    ranks = findings.pop_rank_changed()
+    changed = findings.pop_changed()
+    rows = [_finding_row(session_id, f, i) for i, f in changed.items()]
+    rows.extend(_finding_row(session_id, f, start + i) for i, f in enumerate(new))
+    rank_rows = [(rank, session_id, i) for i, rank in ranks.items()]
+    persisted = start + len(new)
+    truncate = [(session_id, persisted)] if findings.pop_truncated() else []
+    return FindingsDelta(
+        rows, rank_rows, findings, persisted, list(changed), list(ranks), truncate
+    )
 
 
 class ResearchStorage:
-    """Хранилище исследований в SQLite."""
-    
+    """Хранилище исследований в SQLite.
+
+    Соединения и фоновый писатель общие для всех экземпляров с одним
+    путем к БД (см. `deep_research.db`), поэтому создавать хранилище
+    в каждой ноде и команде CLI дешево.
+    """
+
     def __init__(self, db_path: str = "data/research.db"):
         self.db_path = Path(db_path)
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.engine = get_engine(db_path)
         self._init_db()
-    
+
     def _init_db(self) -> None:
-        """Инициализация схемы БД."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.executescript("""
-                CREATE TABLE IF NOT EXISTS research_sessions (
-                    id TEXT PRIMARY KEY,
-                    query TEXT NOT NULL,
-                    state_json TEXT NOT NULL,
-                    status TEXT DEFAULT 'active',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-                
-                CREATE TABLE IF NOT EXISTS findings (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT,
-                    source TEXT,
-                    url TEXT,
-                    title TEXT,
-                    content TEXT,
-                    score REAL,
-                    metadata TEXT,
-                    FOREIGN KEY (session_id) REFERENCES research_sessions(id)
-                );
-                
-                CREATE INDEX IF NOT EXISTS idx_sessions_status 
-                    ON research_sessions(status);
-            """)
-    
+        """Инициализация схемы БД (один раз на процесс)."""
+        _init_schema(self.engine)
+
     def save_session(self, state: ResearchState) -> None:
-        """Сохраняет или обновляет сессию."""
-        with sqlite3.connect(self.db_path) as conn:
+        """Сохраняет или обновляет сессию.
+
+        Скалярные поля пишутся в `research_sessions`, источники — строками
+        в `findings`. Записываются только источники, добавленные после
+        предыдущего сохранения (и измененные с тех пор), поэтому стоимость
+        не растет с размером сессии.
+        """
+        findings = state.findings
+        delta = findings_delta(state.session_id, findings)
+        params = (
+            state.session_id,
+            state.query,
+            state.model_dump_json(exclude={"findings", "final_report"}),
+            state.status,
+            len(findings),
+            state.search_calls,
+            state.final_report,
+            state.total_tokens,
+            json.dumps(state.metrics),
+        )
+
+        def write(conn):
             conn.execute(
                 """
-                INSERT OR REPLACE INTO research_sessions 
-                (id, query, state_json, status, updated_at)
-                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                INSERT INTO research_sessions
+                (id, query, state_json, status, findings_count, search_calls,
+                 final_report, total_tokens, metrics, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(id) DO UPDATE SET
+                    query = excluded.query,
+                    state_json = excluded.state_json,
+                    status = excluded.status,
+                    findings_count = excluded.findings_count,
+                    search_calls = excluded.search_calls,
+                    final_report = excluded.final_report,
+                    total_tokens = excluded.total_tokens,
+                    metrics = excluded.metrics,
+                    updated_at = excluded.updated_at
                 """,
-                (
-                    state.session_id,
-                    state.query,
-                    state.model_dump_json(),
-                    state.status
-                )
+                params
             )
-    
+            delta.apply(conn)
+
+        try:
+            self.engine.write(write)
+        except BaseException:
+            delta.rollback()
+            raise
+        delta.commit()
+
+    def save_metrics(self, state: ResearchState) -> None:
+        """Обновляет метрики строки сессии в фоне, не дожидаясь записи.
+
+        Если строки еще нет, метрики попадут в нее с ближайшим `save_session`.
+        """
+        params = (state.total_tokens, json.dumps(state.metrics), state.session_id)
+        self.engine.submit(lambda conn: conn.execute(
+            "UPDATE research_sessions SET total_tokens = ?, metrics = ? WHERE id = ?", params
+        ))
+
+    def load_metrics(self, session_id: str) -> Optional[Dict[str, Dict[str, float]]]:
+        """Метрики трассировки сессии из ее строки."""
+        row = self.engine.reader().execute(
+            "SELECT metrics FROM research_sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
     def load_session(self, session_id: str) -> Optional[ResearchState]:
-        """Загружает сессию по ID."""
-        with sqlite3.connect(self.db_path) as conn:
-            row = conn.execute(
-                "SELECT state_json FROM research_sessions WHERE id = ?",
-                (session_id,)
+        """Загружает сессию по ID.
+
+        Источники подгружаются из `findings` при первом обращении к ним.
+        """
+        row = self.engine.reader().execute(
+            """SELECT state_json, findings_count, final_report
+               FROM research_sessions WHERE id = ?""",
+            (session_id,)
+        ).fetchone()
+
+        if not row:
+            return None
+
+        state = ResearchState.model_validate_json(row[0])
+        if row[2] is not None:
+            state.final_report = row[2]
+        if state.findings:
+            # Старый формат: источники лежат внутри state_json
+            return state
+
+        count = row[1] or 0
+        state.findings = FindingList(
+            loader=lambda: self.load_finding_store(session_id, limit=count),
+            persisted=count,
+        )
+        return state
+
+    def list_sessions(
+        self,
+        status: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> List[tuple]:
+        """Список сессий, от недавно обновленных к старым.
+
+        Постраничный вывод — по ключу, а не по OFFSET: `after` — ID
+        последней сессии предыдущей страницы, следующая начинается сразу
+        после нее в порядке (updated_at, id). Строки берутся из индекса
+        уже упорядоченными, поэтому страница стоит O(limit) при любом
+        числе сессий. Неизвестный `after` — ValueError.
+        """
+        conn = self.engine.reader()
+        where, params = [], []
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if after is not None:
+            cursor = conn.execute(
+                "SELECT updated_at, id FROM research_sessions WHERE id = ?", (after,)
             ).fetchone()
-            
-            if row:
-                return ResearchState.model_validate_json(row[0])
+            if cursor is None:
+                raise ValueError(f"Unknown session for --after: {after!r}")
+            where.append("(updated_at, id) < (?, ?)")
+            params.extend(cursor)
+        sql = "SELECT id, query, status, created_at, updated_at FROM research_sessions"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY updated_at DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return conn.execute(sql, params).fetchall()
+
+    def session_stats(
+        self, period: str = "day", since: Optional[str] = None, status: Optional[str] = None
+    ) -> List[SessionStats]:
+        """Число сессий, источников, поисковых вызовов и токенов по периодам.
+
+        Считается агрегатами SQL по колонкам `research_sessions` (покрывающий
+        индекс), без загрузки state_json. `since` — нижняя граница
+        created_at ("YYYY-MM-DD").
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: {period!r} (expected one of {', '.join(PERIODS)})")
+        where, params = [], [PERIODS[period]]
+        if since:
+            where.append("created_at >= ?")
+            params.append(since)
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        sql = """SELECT strftime(?, created_at) AS period,
+                        COUNT(*),
+                        COALESCE(SUM(status = 'completed'), 0),
+                        COALESCE(SUM(findings_count), 0),
+                        COALESCE(SUM(search_calls), 0),
+                        COALESCE(SUM(total_tokens), 0)
+                 FROM research_sessions"""
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " GROUP BY period ORDER BY period DESC"
+        return [SessionStats(*row) for row in self.engine.reader().execute(sql, params)]
+
+    def session_info(self, session_id: str) -> Optional[SessionInfo]:
+        """Статус сессии и наличие чекпоинтов одним чтением, без десериализации.
+
+        None — нет ни строки сессии, ни чекпоинтов.
+        """
+        conn = self.engine.reader()
+        row = conn.execute(
+            "SELECT id, query, status, updated_at FROM research_sessions WHERE id = ?",
+            (session_id,)
+        ).fetchone()
+        # Таблицы чекпоинтов создает deep_research.checkpoint при первом запуске графа
+        checkpointed = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'checkpoints'"
+        ).fetchone() is not None and conn.execute(
+            "SELECT 1 FROM checkpoints WHERE thread_id = ? LIMIT 1", (session_id,)
+        ).fetchone() is not None
+        if row is None and not checkpointed:
             return None
-    
-    def list_sessions(self, status: Optional[str] = None) -> List[tuple]:
-        """Список сессий."""
-        with sqlite3.connect(self.db_path) as conn:
-            if status:
-                rows = conn.execute(
-                    """SELECT id, query, status, created_at, updated_at 
-                       FROM research_sessions WHERE status = ?
-                       ORDER BY updated_at DESC""",
-                    (status,)
-                ).fetchall()
-            else:
-                rows = conn.execute(
-                    """SELECT id, query, status, created_at, updated_at 
-                       FROM research_sessions
-                       ORDER BY updated_at DESC"""
-                ).fetchall()
-            return rows
-    
+        return SessionInfo(*(row or (session_id, None, None, None)), checkpointed)
+
+    def search(self, text: str, limit: int = 20, offset: int = 0) -> List[SearchHit]:
+        """Полнотекстовый поиск по источникам и отчетам прошлых сессий.
+
+        Результаты ранжируются по BM25 (совпадение в заголовке весит
+        больше), сниппеты размечены маркерами HIGHLIGHT_START/END.
+        """
+        match = fts_query(text)
+        if not match:
+            return []
+        rows = self.engine.reader().execute(SEARCH_SQL, {
+            "query": match,
+            "hl_start": HIGHLIGHT_START,
+            "hl_end": HIGHLIGHT_END,
+            "limit": limit,
+            "offset": offset,
+        }).fetchall()
+        return [SearchHit(*row) for row in rows]
+
     def save_finding(self, session_id: str, finding: Finding) -> None:
         """Сохраняет найденный источник."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                """
-                INSERT INTO findings 
-                (session_id, source, url, title, content, score, metadata)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    session_id,
-                    finding.source,
-                    finding.url,
-                    finding.title,
-                    finding.content,
-                    finding.score,
-                    json.dumps(finding.metadata)
-                )
-            )
-    
-    def load_findings(self, session_id: str) -> List[Finding]:
-        """Загружает все источники для сессии."""
-        with sqlite3.connect(self.db_path) as conn:
+        self.save_findings(session_id, [finding])
+
+    def save_findings(self, session_id: str, findings: List[Finding]) -> None:
+        """Сохраняет пачку источников одной транзакцией."""
+        rows = [_finding_row(session_id, f) for f in findings]
+        self.engine.write(lambda conn: conn.executemany(INSERT_FINDING, rows))
+
+    def buffer_findings(self, session_id: str, findings: List[Finding], start: int) -> None:
+        """Откладывает запись источников в буфер (write-behind).
+
+        `start` — позиция первого источника в `state.findings`.
+        """
+        get_findings_buffer(str(self.db_path)).add(session_id, findings, start)
+
+    def flush_findings(self) -> int:
+        """Сбрасывает буфер источников в БД."""
+        return get_findings_buffer(str(self.db_path)).flush()
+
+    def load_findings(self, session_id: str, limit: Optional[int] = None) -> List[Finding]:
+        """Загружает источники сессии в порядке добавления.
+
+        `limit` ограничивает выборку первыми сохраненными позициями.
+        """
+        return [finding for finding, _ in self._iter_findings(session_id, limit)]
+
+    def load_finding_store(self, session_id: str, limit: Optional[int] = None) -> FindingStore:
+        """Как `load_findings`, но сразу в колоночное хранилище.
+
+        `content_key` берется из строк, а не считается заново по тексту.
+        """
+        store = FindingStore()
+        for finding, key in self._iter_findings(session_id, limit):
+            store.append(finding, key)
+        return store
+
+    def _iter_findings(
+        self, session_id: str, limit: Optional[int]
+    ) -> Iterator[Tuple[Finding, Optional[int]]]:
+        conn = self.engine.reader()
+        if limit is None:
             rows = conn.execute(
-                """SELECT source, url, title, content, score, metadata 
-                   FROM findings WHERE session_id = ?""",
+                """SELECT source, url, title, content, score, metadata, rank_score, content_key
+                   FROM findings WHERE session_id = ?
+                   ORDER BY position, id""",
                 (session_id,)
             ).fetchall()
-            
-            findings = []
-            for row in rows:
-                findings.append(Finding(
-                    source=row[0],
-                    url=row[1],
-                    title=row[2],
-                    content=row[3],
-                    score=row[4],
-                    metadata=json.loads(row[5]) if row[5] else {}
-                ))
-            return findings
+        else:
+            rows = conn.execute(
+                """SELECT source, url, title, content, score, metadata, rank_score, content_key
+                   FROM findings WHERE session_id = ? AND position < ?
+                   ORDER BY position""",
+                (session_id, limit)
+            ).fetchall()
+
+        blobs = get_blob_store(str(self.db_path))
+        for row in rows:
+            metadata = json.loads(row[5]) if row[5] else {}
+            if row[6] is not None:
+                # В строках старых версий rank_score остался в metadata
+                metadata["rank_score"] = row[6]
+            finding = Finding(
+                source=row[0],
+                url=row[1],
+                title=row[2],
+                content=row[3],
+                score=row[4],
+                metadata=metadata
+            )
+            finding.attach_blobs(blobs)
+            # У строк старых версий content_key нет: его посчитает хранилище
+            yield finding, row[7]
+
+
+class FindingsBuffer:
+    """Буфер отложенной записи источников в таблицу findings.
+
+    Строки копятся в памяти и сбрасываются одним `executemany` в одной
+    транзакции, когда набирается `flush_size` строк или проходит
+    `flush_interval` секунд с первой несброшенной строки. Перед закрытием
+    движка буфер сбрасывается и останавливает таймер.
+    """
+
+    def __init__(self, engine: Engine, flush_size: int = 100, flush_interval: float = 5.0):
+        self.engine = engine
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._rows: List[tuple] = []
+        self._lock = threading.Lock()
+        # Сброс целиком (забрать строки и записать) не пересекается с close
+        self._flush_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._closed = False
+        self.flushed = 0
+        engine.on_close(self.close)
+
+    def add(self, session_id: str, findings: List[Finding], start: int) -> None:
+        """Добавляет источники в буфер; `start` — позиция первого из них."""
+        if not findings:
+            return
+        rows = [_finding_row(session_id, f, start + i) for i, f in enumerate(findings)]
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"Findings buffer for {self.engine.db_path} is closed")
+            self._rows.extend(rows)
+            full = len(self._rows) >= self.flush_size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Записывает накопленные строки и возвращает их число.
+
+        Если запись не удалась, строки возвращаются в буфер.
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+                self._cancel_timer()
+            if not rows:
+                return 0
+            try:
+                self.engine.write(lambda conn: conn.executemany(INSERT_FINDING, rows))
+            except BaseException:
+                with self._lock:
+                    self._rows[:0] = rows
+                raise
+            self.flushed += len(rows)
+            return len(rows)
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _flush_on_timer(self) -> None:
+        """Сброс по таймеру: ошибка не должна уронить фоновый поток.
+
+        Несохраненные строки остаются в буфере до следующего сброса.
+        """
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """Сбрасывает строки и останавливает таймер (вызывается движком)."""
+        with self._flush_lock:
+            with self._lock:
+                self._closed = True
+                self._cancel_timer()
+        self.flush()
+
+
+_buffers: Dict[str, FindingsBuffer] = {}
+_buffers_lock = threading.Lock()
+
+
+def get_findings_buffer(
+    db_path: str,
+    flush_size: Optional[int] = None,
+    flush_interval: Optional[float] = None,
+) -> FindingsBuffer:
+    """Возвращает общий для процесса буфер источников для БД."""
+    key = str(Path(db_path).resolve())
+    with _buffers_lock:
+        buffer = _buffers.get(key)
+        if buffer is None or buffer.engine._closed:
+            # Буфер закрытого движка уже сброшен в `Engine.close`
+            engine = get_engine(db_path)
+            _init_schema(engine)
+            buffer = FindingsBuffer(engine)
+            _buffers[key] = buffer
+        if flush_size is not None:
+            buffer.flush_size = flush_size
+        if flush_interval is not None:
+            buffer.flush_interval = flush_interval
+        return buffer
+
+
+def flush_findings_buffers() -> None:
+    """Сбрасывает все буферы; вызывается при выходе из процесса."""
+    with _buffers_lock:
+        buffers = list(_buffers.values())
+    for buffer in buffers:
+        buffer.flush()
+
+
+# Регистрируется после close_engines, значит выполнится раньше него
+atexit.register(flush_findings_buffers)
@@ -0,0 +1,196 @@
+"""Трассировка нод графа и вызовов бэкендов.
+
+Каждая нода графа выполняется внутри `node_span`, который привязывает
+к контексту `Recorder` сессии; вложенные `span` (поиск, кэш) пишутся
+в тот же `Recorder`. По каждому имени `категория.имя` копятся агрегаты:
+число вызовов, время, байты ответа, число источников, попадания в кэш.
+Они лежат в `ResearchState.metrics` и сохраняются в строку сессии.
+
+Отдельные события (для Chrome trace) собираются только при включенном
+профиле (`start_profile`). Вне ноды `span` возвращает пустой контекст,
+поэтому накладные расходы без записи — одно чтение ContextVar.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Счетчики, которые span может накапливать кроме времени
+COUNTERS = ("bytes", "findings", "cache_hits", "cache_misses", "tokens")
+
+
+class Span:
+    """Открытый интервал трассировки."""
+
+    __slots__ = ("category", "name", "start", "counts", "args")
+
+    def __init__(self, category: str, name: str, args: Dict[str, Any]):
+        self.category = category
+        self.name = name
+        self.start = time.perf_counter()
+        self.counts: Dict[str, float] = {}
+        self.args = args
+
+    def add(self, **counts: float) -> None:
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+
+class Profile:
+    """События трассировки для Chrome trace (chrome://tracing, Perfetto)."""
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, span: Span, end: float) -> None:
+        event = {
+            "name": span.name,
+            "cat": span.category,
+            "ph": "X",
+            "ts": round((span.start - self.origin) * 1e6, 1),
+            "dur": round((end - span.start) * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {**span.args, **span.counts},
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def write(self, path: str) -> Path:
+        """Сохраняет события в формате Trace Event JSON."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            events = list(self.events)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        return path
+
+
+class Recorder:
+    """Агрегирует метрики span'ов одной сессии в словарь `metrics`."""
+
+    def __init__(self, metrics: Dict[str, Dict[str, float]], profile: Optional[Profile] = None):
+        self.metrics = metrics
+        self.profile = profile
+        self.tokens = 0
+        # После выхода из ноды состояние уже передано графу: запоздавшие
+        # span'ы (фоновые вызовы источников) в метрики не пишутся
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def record(self, span: Span, end: float) -> None:
+        key = f"{span.category}.{span.name}"
+        with self._lock:
+            if self.closed:
+                return
+            entry = self.metrics.setdefault(key, {"calls": 0, "seconds": 0.0})
+            entry["calls"] += 1
+            entry["seconds"] += end - span.start
+            for name, value in span.counts.items():
+                entry[name] = entry.get(name, 0) + value
+            self.tokens += span.counts.get("tokens", 0)
+        if self.profile is not None:
+            self.profile.add(span, end)
+
+
+_recorder: ContextVar[Optional[Recorder]] = ContextVar("deep_research_recorder", default=None)
+_current: ContextVar[Optional[Span]] = ContextVar("deep_research_span", default=None)
+_profile: Optional[Profile] = None
+
+
+class _NullSpan:
+    """Span без записи: используется вне нод графа."""
+
+    def add(self, **counts: float) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL = _NullSpan()
+
+
+class _SpanContext:
+    __slots__ = ("recorder", "span", "token")
+
+    def __init__(self, recorder: Recorder, span: Span):
+        self.recorder = recorder
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, *exc) -> None:
+        _current.reset(self.token)
+        self.recorder.record(self.span, time.perf_counter())
+
+
+def span(category: str, name: str, **args: Any):
+    """Контекст интервала `категория.имя`; внутри можно вызывать `add`."""
+    recorder = _recorder.get()
+    if recorder is None:
+        return _NULL
+    return _SpanContext(recorder, Span(category, name, args))
+
+
+def add(**counts: float) -> None:
+    """Добавляет счетчики (bytes, findings, ...) к текущему span."""
+    current = _current.get()
+    if current is not None:
+        current.add(**counts)
+
+
+@contextmanager
+def node_span(name: str, state: Any) -> Iterator[Recorder]:
+    """Трассирует ноду графа: метрики копятся в `state.metrics`.
+
+    Токены, отмеченные span'ами, прибавляются к `state.total_tokens`.
+    """
+    recorder = Recorder(state.metrics, _profile)
+    token = _recorder.set(recorder)
+    try:
+        with span("node", name):
+            yield recorder
+    finally:
+        _recorder.reset(token)
+        with recorder._lock:
+            recorder.closed = True
+        state.total_tokens += recorder.tokens
+
+
+def bind(fn: Callable[..., T]) -> Callable[..., T]:
+    """Переносит трассировку в другой поток (например, в пул поиска).
+
+    Каждый вызов выполняется в своей копии текущего контекста.
+    """
+    context = copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+def start_profile() -> Profile:
+    """Включает сбор событий для Chrome trace во всех последующих нодах."""
+    global _profile
+    _profile = Profile()
+    return _profile
+
+
+def stop_profile() -> Optional[Profile]:
+    """Выключает сбор событий и возвращает собранный профиль."""
+    global _profile
+    profile, _profile = _profile, None
+    return profile
@@ -0,0 +1,91 @@
+"""Общие фикстуры тестов."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class FakeTavilyServer(ThreadingHTTPServer):
+    """Локальный HTTP сервер, имитирующий Tavily /search."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _FakeTavilyHandler)
+        self.connections = 0
+        self.requests = 0
+        self.latency = 0.0
+        self.active = 0
+        self.peak = 0
+        # Инъекция отказов: коды ответов для ближайших запросов и
+        # предел одновременных запросов, сверх которого отвечаем 429
+        self.failures = []
+        self.capacity = None
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _FakeTavilyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        # Обработчик создается один раз на TCP соединение
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        with self.server.lock:
+            self.server.requests += 1
+            status = self.server.failures.pop(0) if self.server.failures else 200
+            capacity = self.server.capacity
+            if status == 200 and capacity is not None and self.server.active >= capacity:
+                status = 429
+            if status != 200:
+                self.server.rejected += 1
+            else:
+                self.server.active += 1
+                self.server.peak = max(self.server.peak, self.server.active)
+        if status != 200:
+            self._reply(status, {"detail": {"error": "injected failure"}})
+            return
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.active -= 1
+
+        self._reply(200, {"results": [{
+            "url": f"https://example.com/{i}",
+            "title": f"{payload.get('query', '')} #{i}",
+            "content": "fake content",
+            "score": 1.0 - i / 10,
+        } for i in range(payload.get("max_results", 3))]})
+
+    def _reply(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fake_tavily():
+    server = FakeTavilyServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
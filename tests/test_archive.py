@@ -0,0 +1,100 @@
+"""Тесты экспорта и импорта сессий."""
+
+import gzip
+import json
+
+import pytest
+
+from deep_research.archive import FORMAT, export_sessions, import_sessions
+from deep_research.blobs import get_blob_store
+from deep_research.checkpoint import FINDINGS_REF, SqliteCheckpointer
+from deep_research.db import close_engines
+from deep_research.report_cache import ReportCache
+from deep_research.reuse import get_reuse_index
+from deep_research.state import Finding, ResearchState
+from deep_research.storage import ResearchStorage
+
+
+def _session(db_path: str, session_id: str, count: int, status: str = "completed") -> ResearchState:
+    state = ResearchState(session_id=session_id, query=f"query {session_id}", plan=["step"],
+                          status=status, final_report=f"report {session_id}", total_tokens=42)
+    findings = [
+        Finding(source="tavily", url=f"https://example.com/{session_id}/{i}", title=f"T{i}",
+                content=f"content {i}", score=i / count,
+                metadata={"query": "step", "raw_content": f"Полный текст {i % 3} " * 50})
+        for i in range(count)
+    ]
+    get_blob_store(db_path).offload(findings)
+    state.findings.extend(findings)
+    ResearchStorage(db_path).save_session(state)
+    return state
+
+
+def test_round_trip_in_batches(tmp_path):
+    source = str(tmp_path / "source.db")
+    _session(source, "a", 25)
+    _session(source, "b", 7, status="active")
+    path = str(tmp_path / "export.ndjson.gz")
+
+    stats = export_sessions(source, path)
+    assert tuple(stats) == (2, 32, 3)
+    with gzip.open(path, "rt", encoding="utf-8") as lines:
+        assert json.loads(next(lines))["format"] == FORMAT
+
+    target = str(tmp_path / "target.db")
+    assert tuple(import_sessions(target, path, batch_rows=4)) == (2, 32, 3)
+    close_engines()
+
+    storage = ResearchStorage(target)
+    for session_id, count in (("a", 25), ("b", 7)):
+        state = storage.load_session(session_id)
+        assert state.final_report == f"report {session_id}"
+        assert state.total_tokens == 42
+        assert [f.url for f in state.findings] == [
+            f"https://example.com/{session_id}/{i}" for i in range(count)
+        ]
+        assert state.findings[4].raw_content == "Полный текст 1 " * 50
+    assert storage.search("report")
+    close_engines()
+
+
+def test_selected_sessions_replace_existing(tmp_path):
+    source = str(tmp_path / "source.db")
+    _session(source, "a", 5)
+    _session(source, "b", 5, status="active")
+    path = str(tmp_path / "export.ndjson.gz")
+    assert export_sessions(source, path, status="completed").sessions == 1
+
+    # В целевой БД сессия "a" длиннее: после импорта остается версия из файла
+    target = str(tmp_path / "target.db")
+    reuse = get_reuse_index(target)  # начальное заполнение индекса уже прошло
+    state = _session(target, "a", 9)
+    # Чекпоинты и кэш отчета прежней версии ссылаются на 9 источников
+    checkpointer = SqliteCheckpointer(target)
+    checkpointer.engine.write(lambda conn: conn.execute(
+        "INSERT INTO checkpoint_blobs VALUES ('a', '', 'findings', '1', ?, '9')", (FINDINGS_REF,)
+    ))
+    cache = ReportCache(target, "a")
+    cache.select(state.findings, state.query, 5)
+    cache.flush()
+
+    import_sessions(target, path)
+    storage = ResearchStorage(target)
+    assert len(storage.load_findings("a")) == 5
+    assert storage.load_session("b") is None
+    conn = storage.engine.reader()
+    for table in ("checkpoint_blobs", "report_cache"):
+        assert conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == 0
+    # Шаги импортированной сессии доступны для повторного использования
+    (reused,) = reuse.similar("query a", "step", 0.8)
+    assert reused.session_id == "a"
+    close_engines()
+
+
+def test_import_rejects_foreign_files(tmp_path):
+    path = tmp_path / "other.gz"
+    with gzip.open(path, "wt") as out:
+        out.write('{"format": "something-else"}\n')
+    with pytest.raises(ValueError):
+        import_sessions(str(tmp_path / "db.sqlite"), str(path))
+    close_engines()
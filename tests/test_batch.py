@@ -0,0 +1,99 @@
+"""Тесты пакетного запуска исследований."""
+
+from deep_research.batch import read_queries, run_batch, set_node_output
+from deep_research.config import Config
+from deep_research.search import close_search_clients
+from deep_research.storage import ResearchStorage
+
+PLAN_STEPS = 3  # шаблонный план без LLM
+
+
+def _config(tmp_path, fake_tavily, global_concurrency: int = 8) -> Config:
+    config = Config()
+    config.search.tavily_api_key = "test"
+    config.search.tavily_base_url = fake_tavily.url
+    config.search.max_results = 3
+    config.search.cache_enabled = False
+    config.search.global_concurrency = global_concurrency
+    config.storage.db_path = str(tmp_path / "research.db")
+    config.output.save_path = str(tmp_path / "out")
+    config.output.format = "markdown"
+    return config
+
+
+def _peak(server, config: Config, queries, workers: int) -> int:
+    """Пик одновременных запросов к серверу за время пакета."""
+    server.peak = 0
+    results = run_batch(config, queries, workers=workers)
+    assert [r.status for r in results] == ["completed"] * len(queries)
+    return server.peak
+
+
+def test_read_queries_skips_blank_lines_and_comments(tmp_path):
+    path = tmp_path / "queries.txt"
+    path.write_text("# ночной прогон\nfirst\n\n  second  \n", encoding="utf-8")
+    assert read_queries(str(path)) == ["first", "second"]
+
+
+def test_batch_scales_with_workers_under_global_cap(tmp_path, fake_tavily):
+    fake_tavily.latency = 0.1
+    set_node_output(False)
+    try:
+        config = _config(tmp_path, fake_tavily, global_concurrency=32)
+        # Одна сессия ищет не больше чем по PLAN_STEPS шагам сразу;
+        # больше одновременных запросов — значит, сессии шли параллельно
+        serial = _peak(fake_tavily, config, [f"serial {i}" for i in range(6)], workers=1)
+        parallel = _peak(fake_tavily, config, [f"parallel {i}" for i in range(6)], workers=6)
+        assert serial <= PLAN_STEPS < parallel
+        close_search_clients()
+
+        capped = _config(tmp_path, fake_tavily, global_concurrency=2)
+        assert _peak(fake_tavily, capped, [f"capped {i}" for i in range(4)], workers=4) <= 2
+    finally:
+        set_node_output(True)
+        close_search_clients()
+
+
+def test_failed_session_does_not_stop_batch(tmp_path, fake_tavily, monkeypatch):
+    from deep_research.nodes import plan as plan_module
+
+    original = plan_module.plan_node
+
+    def flaky_plan(state, config):
+        if state.query == "broken":
+            raise RuntimeError("planner exploded")
+        return original(state, config)
+
+    monkeypatch.setattr("deep_research.graph.plan_node", flaky_plan)
+    set_node_output(False)
+    try:
+        config = _config(tmp_path, fake_tavily)
+        results = run_batch(config, ["ok one", "broken", "ok two"], workers=3)
+    finally:
+        set_node_output(True)
+        close_search_clients()
+
+    assert [r.status for r in results] == ["completed", "failed", "completed"]
+    assert "planner exploded" in results[1].error
+    storage = ResearchStorage(config.storage.db_path)
+    assert storage.load_session(results[1].session_id).status == "failed"
+
+
+def test_failed_status_write_does_not_lose_result(tmp_path, fake_tavily, monkeypatch):
+    def broken_plan(state, config):
+        raise RuntimeError("planner exploded")
+
+    def broken_mark(storage, state):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("deep_research.graph.plan_node", broken_plan)
+    monkeypatch.setattr("deep_research.batch._mark_failed", broken_mark)
+    set_node_output(False)
+    try:
+        (result,) = run_batch(_config(tmp_path, fake_tavily), ["broken"], workers=1)
+    finally:
+        set_node_output(True)
+        close_search_clients()
+
+    assert result.status == "failed"
+    assert "planner exploded" in result.error and "disk full" in result.error
@@ -0,0 +1,56 @@
+"""Тесты хранилища полного текста страниц."""
+
+import random
+
+from deep_research.blobs import get_blob_store
+from deep_research.db import close_engines
+from deep_research.state import RAW_CONTENT_REF, Finding, ResearchState
+from deep_research.storage import ResearchStorage
+
+_rng = random.Random(7)
+PAGE = " ".join(_rng.choice(["model", "series", "data", "trend", "layer", "error"])
+                for _ in range(3000))
+
+
+def _finding(i: int, raw: str) -> Finding:
+    return Finding(source="tavily", url=f"https://example.com/{i}", title=f"T{i}",
+                   content="snippet", metadata={"raw_content": raw})
+
+
+def test_blobs_are_content_addressed_and_compressed(tmp_path):
+    store = get_blob_store(str(tmp_path / "research.db"))
+    first, second = store.put(PAGE), store.put(PAGE)
+
+    assert first == second
+    assert store.get(first) == PAGE
+    store.engine.write(lambda conn: None)
+    stats = store.stats()
+    assert stats["blobs"] == 1
+    assert stats["stored"] * 3 < stats["size"]
+
+
+def test_offloaded_raw_content_loads_lazily_after_reload(tmp_path):
+    db = str(tmp_path / "research.db")
+    findings = [_finding(i, PAGE + str(i)) for i in range(3)]
+    get_blob_store(db).offload(findings)
+    state = ResearchState(session_id="s1", query="q", findings=findings)
+
+    finding = state.findings[0]
+    assert "raw_content" not in finding.metadata
+    assert finding.raw_content == PAGE + "0"
+
+    ResearchStorage(db).save_session(state)
+    close_engines()
+
+    loaded = ResearchStorage(db).load_session("s1")
+    assert RAW_CONTENT_REF in loaded.findings[2].metadata
+    assert loaded.findings[2].raw_content == PAGE + "2"
+
+
+def test_offload_shrinks_serialized_session(tmp_path):
+    findings = [_finding(i, PAGE + str(i)) for i in range(200)]
+    before = len(ResearchState(session_id="s1", query="q", findings=findings).model_dump_json())
+
+    get_blob_store(str(tmp_path / "research.db")).offload(findings)
+    state = ResearchState(session_id="s1", query="q", findings=findings)
+    assert len(state.model_dump_json()) * 10 < before
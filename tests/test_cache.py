@@ -0,0 +1,78 @@
+"""Тесты кэша результатов поиска."""
+
+from deep_research.cache import CachedSearch, SearchCache, get_search_cache
+from deep_research.db import close_engines
+from deep_research.state import Finding
+
+
+class CountingSearch:
+    search_depth = "basic"
+    max_results = 5
+
+    def __init__(self):
+        self.calls = 0
+
+    def search(self, query: str):
+        self.calls += 1
+        return [Finding(source="tavily", url="https://example.com", title=query,
+                        content="text", score=0.7)]
+
+
+def test_cache_hit_survives_new_instance(tmp_path):
+    db = tmp_path / "research.db"
+    backend = CountingSearch()
+    CachedSearch(backend, SearchCache(str(db))).search("Time  Series")
+    close_engines()
+
+    cache = SearchCache(str(db))
+    findings = CachedSearch(backend, cache).search("time series")
+
+    assert backend.calls == 1
+    assert findings[0].title == "Time  Series"
+    assert cache.stats()["hits"] == 1
+
+    # Повторные чтения обслуживает кэш, бэкенд больше не вызывается
+    for _ in range(100):
+        CachedSearch(backend, cache).search("TIME series")
+    assert backend.calls == 1
+    assert cache.stats() == {"hits": 101, "misses": 0, "entries": 1}
+
+
+def test_cache_ttl_and_lru_eviction(tmp_path):
+    cache = SearchCache(str(tmp_path / "research.db"), ttl=3600, max_entries=2)
+    finding = Finding(source="tavily", url="u", title="t", content="c")
+
+    for query in ("a", "b"):
+        cache.put(query, query, [finding])
+    cache.get("a")  # "b" становится самым старым
+    cache.put("c", "c", [finding])
+    # Запись и вытеснение идут в фоне: дожидаемся очереди писателя
+    cache.engine.write(lambda conn: None)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["entries"] == 2
+
+    cache.ttl = 1
+    cache.engine.write(lambda conn: conn.execute(
+        "UPDATE search_cache SET created_at = created_at - 10"
+    ))
+    assert cache.get("a") is None
+
+
+def test_cache_keeps_raw_content_in_blob_store(tmp_path):
+    db = str(tmp_path / "research.db")
+    cache = get_search_cache(db, ttl=3600, max_entries=10)
+    text = "Полный текст страницы " * 100
+    cache.put("k", "q", [Finding(source="tavily", url="u", title="t", content="c",
+                                 metadata={"raw_content": text})])
+    # Запись еще может быть в очереди писателя: результат отдается из памяти
+    assert cache.get("k")[0].raw_content == text
+
+    close_engines()
+    reopened = get_search_cache(db, ttl=3600, max_entries=10)
+    assert reopened is not cache and not reopened.engine._closed
+    stored = reopened.engine.reader().execute("SELECT results FROM search_cache").fetchone()[0]
+    assert "raw_content_ref" in stored and text not in stored
+    assert reopened.get("k")[0].raw_content == text
+    close_engines()
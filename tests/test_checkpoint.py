@@ -0,0 +1,116 @@
+"""Тесты SQLite чекпоинтов и продолжения сессии."""
+
+import pytest
+
+from deep_research.checkpoint import SqliteCheckpointer
+from deep_research.config import Config
+from deep_research.graph import create_research_graph
+from deep_research.nodes import search as search_module
+from deep_research.state import Finding, FindingList, ResearchState
+
+
+class CrashingSearch:
+    """Поиск-заглушка, "падающий" на заданном по счету вызове."""
+
+    calls = []
+    crash_on = None
+
+    def __init__(self, config):
+        self.max_results = config.max_results
+        self.search_depth = config.search_depth
+
+    def search(self, query: str):
+        CrashingSearch.calls.append(query)
+        if len(CrashingSearch.calls) == CrashingSearch.crash_on:
+            raise KeyboardInterrupt
+        return [
+            Finding(source="tavily", url=f"https://example.com/{len(self.calls)}/{i}",
+                    title=query, content=f"text {i}", score=0.5, metadata={"query": query})
+            for i in range(3)
+        ]
+
+
+def _config(tmp_path) -> Config:
+    config = Config()
+    config.ui.interactive = False
+    config.search.parallel = False
+    config.search.cache_enabled = False
+    config.search.dedup_enabled = False
+    config.storage.db_path = str(tmp_path / "research.db")
+    config.output.save_path = str(tmp_path / "out")
+    return config
+
+
+def _run(config: Config, graph_input, session_id: str) -> dict:
+    graph = create_research_graph(config)
+    thread = {"configurable": {"thread_id": session_id}}
+    values = None
+    for values in graph.stream(graph_input, thread, stream_mode="values", durability="sync"):
+        pass
+    return values
+
+
+def test_resume_continues_without_repeating_searches(monkeypatch, tmp_path):
+    monkeypatch.setattr(search_module, "get_search_client", CrashingSearch)
+    CrashingSearch.calls = []
+    CrashingSearch.crash_on = 2
+    config = _config(tmp_path)
+
+    with pytest.raises(KeyboardInterrupt):
+        _run(config, ResearchState(session_id="s1", query="q"), "s1")
+    assert len(CrashingSearch.calls) == 2
+
+    checkpoint = SqliteCheckpointer(config.storage.db_path).get_tuple(
+        {"configurable": {"thread_id": "s1"}}
+    )
+    findings = checkpoint.checkpoint["channel_values"]["findings"]
+    assert isinstance(findings, FindingList) and not findings.loaded
+    assert len(findings) == 3
+
+    values = _run(config, None, "s1")
+    # Первый шаг не повторяется, упавший — повторяется
+    assert CrashingSearch.calls[2] == CrashingSearch.calls[1]
+    assert len(CrashingSearch.calls) == 4
+    assert values["status"] == "completed"
+    assert len(values["findings"]) == 9
+    assert [f.url for f in values["findings"]][:3] == [
+        f"https://example.com/1/{i}" for i in range(3)
+    ]
+
+
+def test_findings_are_not_copied_into_checkpoints(monkeypatch, tmp_path):
+    monkeypatch.setattr(search_module, "get_search_client", CrashingSearch)
+    CrashingSearch.calls = []
+    CrashingSearch.crash_on = None
+    config = _config(tmp_path)
+    _run(config, ResearchState(session_id="s2", query="q"), "s2")
+
+    conn = SqliteCheckpointer(config.storage.db_path).engine.reader()
+    kinds = {row[0] for row in conn.execute(
+        "SELECT type FROM checkpoint_blobs WHERE channel = 'findings'"
+    )}
+    assert kinds <= {"findings-ref", "empty"}
+    count = conn.execute("SELECT COUNT(*) FROM findings WHERE session_id = 's2'").fetchone()[0]
+    assert count == 9
+
+
+def test_failed_checkpoint_write_keeps_findings_unsaved(monkeypatch, tmp_path):
+    checkpointer = SqliteCheckpointer(str(tmp_path / "research.db"))
+    findings = FindingList([
+        Finding(source="tavily", url=f"https://example.com/{i}", title="t", content="c")
+        for i in range(3)
+    ])
+    config = {"configurable": {"thread_id": "s3", "checkpoint_ns": "", "checkpoint_id": "1"}}
+
+    def fail(fn):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(checkpointer.engine, "write", fail)
+    with pytest.raises(OSError):
+        checkpointer.put_writes(config, [("findings", findings)], "task")
+    assert findings.persisted == 0
+    monkeypatch.undo()
+
+    checkpointer.put_writes(config, [("findings", findings)], "task")
+    assert findings.persisted == 3
+    assert len(checkpointer.storage.load_findings("s3")) == 3
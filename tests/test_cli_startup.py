@@ -0,0 +1,71 @@
+"""Регрессионный тест холодного старта CLI.
+
+`list` и проверки `resume` не должны импортировать LangGraph, LangChain
+и Tavily: на них приходится большая часть времени импорта.
+"""
+
+import json
+import subprocess
+import sys
+
+from deep_research.db import close_engines
+from deep_research.state import ResearchState
+from deep_research.storage import ResearchStorage
+
+# Бюджет импорта deep_research.cli по `-X importtime` (с графом было ~1.2 с)
+IMPORT_BUDGET_US = 700_000
+
+HEAVY = ("langgraph", "langchain_core", "langsmith", "tavily")
+
+SCRIPT = f"""
+import json, sys
+from deep_research import cli
+from deep_research.config import Config
+HEAVY = {HEAVY!r}
+
+config = Config()
+config.storage.db_path = sys.argv[1]
+cli.load_config = lambda: config
+try:
+    cli.app(sys.argv[2:])
+except SystemExit:
+    pass
+heavy = sorted({{m.split(".")[0] for m in sys.modules}} & set(HEAVY))
+print(json.dumps(heavy))
+"""
+
+
+def _run(tmp_path, *args) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT,
+         str(tmp_path / "research.db"), *args],
+        capture_output=True, text=True, timeout=60,
+    )
+
+
+def _import_time_us(stderr: str) -> int:
+    for line in stderr.splitlines():
+        if line.rstrip().endswith("| deep_research.cli"):
+            return int(line.split("|")[1])
+    raise AssertionError("deep_research.cli not in importtime output")
+
+
+def test_list_does_not_import_agent_stack(tmp_path):
+    for command in ("list", "stats"):
+        result = _run(tmp_path, command)
+        assert result.returncode == 0, result.stderr[-2000:]
+        assert "Нет сохраненных исследований" in result.stdout
+        assert json.loads(result.stdout.strip().splitlines()[-1]) == []
+        assert _import_time_us(result.stderr) < IMPORT_BUDGET_US
+
+
+def test_resume_metadata_path_does_not_import_agent_stack(tmp_path):
+    storage = ResearchStorage(str(tmp_path / "research.db"))
+    storage.save_session(ResearchState(session_id="done", query="q", status="completed"))
+    close_engines()
+
+    for session_id, message in (("missing", "не найдена"), ("done", "уже завершена")):
+        result = _run(tmp_path, "resume", session_id)
+        assert result.returncode == 0, result.stderr[-2000:]
+        assert message in result.stdout
+        assert json.loads(result.stdout.strip().splitlines()[-1]) == []
@@ -0,0 +1,64 @@
+"""Тесты удаления дубликатов источников."""
+
+import random
+
+from deep_research.dedup import add_unique, canonical_url, get_index
+from deep_research.state import Finding, FindingList
+
+_rng = random.Random(42)
+ARTICLE = " ".join(_rng.choice(["series", "model", "attention", "forecast", "data",
+                                "horizon", "trend", "N-BEATS", "layer", "error"])
+                   + str(_rng.randint(0, 50)) for _ in range(300))
+
+
+def _finding(url: str, content: str, score: float = 0.5) -> Finding:
+    return Finding(source="tavily", url=url, title=url, content=content, score=score,
+                   metadata={"query": "q"})
+
+
+def test_canonical_url():
+    assert canonical_url("https://www.Example.com/a/?utm_source=x&b=2&a=1#frag") == \
+        canonical_url("http://example.com/a?a=1&b=2")
+    assert canonical_url("https://example.com/a") != canonical_url("https://example.com/b")
+
+
+def test_exact_and_near_duplicates_are_merged():
+    findings = FindingList()
+    added = add_unique(findings, [
+        _finding("https://example.com/post", ARTICLE, score=0.4),
+        _finding("https://www.example.com/post/?utm_medium=rss", "other text", score=0.9),
+        _finding("https://mirror.org/copy", ARTICLE + " Reprinted with permission", 0.6),
+        _finding("https://example.com/unrelated", "a completely different article"),
+    ])
+
+    assert len(added) == 2
+    assert len(findings) == 2
+    kept = findings[0]
+    assert kept.score == 0.9
+    assert [o["url"] for o in kept.metadata["origins"]] == [
+        "https://example.com/post",
+        "https://www.example.com/post/?utm_medium=rss",
+        "https://mirror.org/copy",
+    ]
+
+
+def test_dedup_cost_does_not_grow_with_session_size():
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(5000)]
+
+    def text() -> str:
+        return " ".join(rng.choice(words) for _ in range(60))
+
+    findings = FindingList()
+    add_unique(findings, [_finding(f"https://e.com/{i}", text()) for i in range(2000)])
+    assert len(findings) == 2000
+
+    index = get_index(findings)
+    compared = index.comparisons
+    batch = [_finding(f"https://e.com/new/{i}", text()) for i in range(200)]
+    add_unique(findings, batch)
+
+    assert len(findings) == 2200
+    # Индекс обновлен, а не перестроен; кандидаты берутся только из полос
+    assert get_index(findings) is index
+    assert index.comparisons - compared < len(batch)
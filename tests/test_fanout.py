@@ -0,0 +1,137 @@
+"""Тесты параллельного опроса источников с дедлайнами."""
+
+import threading
+import time
+
+import pytest
+
+from deep_research import search as search_registry
+from deep_research.config import Config
+from deep_research.fanout import FanOutSearch, SearchUnavailable
+from deep_research.nodes import search as search_module
+from deep_research.state import Finding, ResearchState
+
+
+class LocalBackend:
+    """Локальный источник с задержкой по номеру вызова и возможной ошибкой.
+
+    `finished` считает завершившиеся вызовы: если поиск вернулся, пока
+    медленный вызов еще идет, шаг не ждал этот источник.
+    """
+
+    max_results = 2
+    search_depth = "basic"
+
+    def __init__(self, name: str, delays=(0.0,), error: Exception = None):
+        self.name = name
+        self.delays = list(delays)
+        self.error = error
+        self.calls = 0
+        self.finished = 0
+        self.lock = threading.Lock()
+
+    def search(self, query: str):
+        with self.lock:
+            delay = self.delays[min(self.calls, len(self.delays) - 1)]
+            self.calls += 1
+        time.sleep(delay)
+        with self.lock:
+            self.finished += 1
+        if self.error is not None:
+            raise self.error
+        return [Finding(source=self.name, url=f"https://{self.name}.example/{query}/{i}",
+                        title=query, content=f"{self.name} {query} {i}", score=0.5)
+                for i in range(self.max_results)]
+
+
+def test_returns_partial_results_at_deadline():
+    missing = {}
+    slow = LocalBackend("slow", delays=[2.0])
+    searcher = FanOutSearch(
+        [("fast", LocalBackend("fast")),
+         ("slow", slow),
+         ("broken", LocalBackend("broken", error=RuntimeError("boom")))],
+        deadline=0.3,
+        on_missing=lambda query, reasons: missing.update(reasons),
+    )
+    findings = searcher.search("q")
+
+    assert slow.finished == 0
+    assert {f.source for f in findings} == {"fast"}
+    assert missing == {"slow": "timeout", "broken": "boom"}
+
+
+def test_per_source_timeout_ends_step_before_overall_deadline():
+    slow = LocalBackend("slow", delays=[2.0])
+    searcher = FanOutSearch(
+        [("fast", LocalBackend("fast", delays=[0.05])), ("slow", slow)],
+        deadline=5.0,
+        source_timeouts={"slow": 0.2},
+    )
+    findings = searcher.search("q")
+    assert slow.finished == 0
+    assert len(findings) == 2
+
+
+def test_results_keep_source_order_when_all_arrive():
+    searcher = FanOutSearch(
+        [("a", LocalBackend("a", delays=[0.1])), ("b", LocalBackend("b"))], deadline=2.0
+    )
+    findings = searcher.search("q")
+    assert [f.source for f in findings] == ["a", "a", "b", "b"]
+
+
+def test_hedged_request_wins_over_stuck_first_call():
+    backend = LocalBackend("tail", delays=[2.0, 0.05])
+    searcher = FanOutSearch([("tail", backend)], deadline=3.0, hedge_after=0.1)
+    findings = searcher.search("q")
+
+    assert len(findings) == 2
+    # Ответил повторный вызов, первый еще не завершился
+    assert (backend.calls, backend.finished) == (2, 1)
+
+
+def test_saturated_source_pool_is_not_hedged():
+    backend = LocalBackend("single", delays=[0.3])
+    searcher = FanOutSearch([("single", backend)], deadline=3.0, hedge_after=0.05, pool_size=1)
+
+    assert len(searcher.search("q")) == 2
+    assert backend.calls == 1
+
+
+def test_no_answers_raise():
+    searcher = FanOutSearch([("slow", LocalBackend("slow", delays=[1.0]))], deadline=0.1)
+    with pytest.raises(SearchUnavailable, match="slow: timeout"):
+        searcher.search("q")
+
+
+def test_search_node_fans_out_to_registered_sources(monkeypatch, tmp_path):
+    monkeypatch.setattr(search_module, "get_search_client",
+                        lambda config: LocalBackend("tavily", delays=[0.05]))
+    arxiv = LocalBackend("arxiv", delays=[2.0])
+    monkeypatch.setitem(search_registry._backends, "arxiv", lambda config: arxiv)
+    monkeypatch.setitem(search_registry._backends, "github",
+                        lambda config: LocalBackend("github"))
+
+    config = Config()
+    config.ui.interactive = False
+    config.search.sources = ["tavily", "arxiv", "github"]
+    config.search.source_timeouts = {"arxiv": 0.3}
+    config.search.cache_enabled = False
+    config.search.dedup_enabled = False
+    config.storage.db_path = str(tmp_path / "research.db")
+
+    state = search_module.search_node(
+        ResearchState(session_id="s1", query="q", plan=["a", "b", "c"]), config
+    )
+
+    assert (arxiv.calls, arxiv.finished) == (3, 0)
+    assert state.search_calls == 3
+    assert {f.source for f in state.findings} == {"tavily", "github"}
+
+
+def test_unknown_source_is_reported(tmp_path):
+    config = Config()
+    config.search.sources = ["nope"]
+    with pytest.raises(ValueError, match="Unknown search source"):
+        search_module.make_searcher(config)
@@ -0,0 +1,120 @@
+"""Тесты клиента LLM: кэш ответов, пакеты, поток и учет токенов."""
+
+from deep_research import tracing
+from deep_research.config import Config
+from deep_research.db import close_engines
+from deep_research.llm import FakeLLM, LLMCache, LLMClient, count_tokens, get_llm_client
+from deep_research.nodes.plan import default_plan, plan_node
+from deep_research.nodes.report import report_node
+from deep_research.state import Finding, ResearchState
+
+
+def _client(tmp_path, provider=None) -> LLMClient:
+    cache = LLMCache(str(tmp_path / "llm.db"))
+    return LLMClient(provider or FakeLLM(), cache)
+
+
+def _config(tmp_path) -> Config:
+    config = Config()
+    config.ui.interactive = False
+    config.llm.provider = "fake"
+    config.storage.db_path = str(tmp_path / "research.db")
+    config.output.save_path = str(tmp_path / "out")
+    config.output.format = "markdown"
+    return config
+
+
+def test_batch_goes_to_provider_once_and_is_cached(tmp_path):
+    provider = FakeLLM()
+    client = _client(tmp_path, provider)
+
+    prompts = ["first source text", "second source text", "first source text"]
+    assert client.complete_many(prompts) == prompts
+    # Повтор внутри пакета отправляется один раз, весь пакет — одним вызовом
+    assert provider.calls == [[("", "first source text"), ("", "second source text")]]
+
+    assert client.complete_many(prompts[:2] + ["third source text"])[2] == "third source text"
+    assert provider.calls[1] == [("", "third source text")]
+
+    # Кэш переживает перезапуск процесса
+    close_engines()
+    restarted = FakeLLM()
+    assert _client(tmp_path, restarted).complete("second source text") == "second source text"
+    assert restarted.calls == []
+    close_engines()
+
+
+def test_stream_matches_complete_and_fills_cache(tmp_path):
+    provider = FakeLLM()
+    client = _client(tmp_path, provider)
+    prompt = "stream this reply word by word"
+
+    chunks = list(client.stream(prompt, system="sys"))
+    assert len(chunks) == 6
+    assert "".join(chunks) == client.complete(prompt, system="sys")
+    assert len(provider.calls) == 1
+    assert list(client.stream(prompt, system="sys")) == [prompt]
+    close_engines()
+
+
+def test_tokens_are_counted_into_state(tmp_path):
+    client = _client(tmp_path)
+    state = ResearchState(query="q")
+
+    with tracing.node_span("report", state):
+        client.complete("count these tokens, please")
+        list(client.stream("and these"))
+    assert state.total_tokens == 2 * count_tokens("count these tokens, please") + 2 * 2
+    assert state.metrics["llm.fake"]["cache_misses"] == 2
+
+    # Ответы из кэша токены не тратят
+    with tracing.node_span("report", state):
+        client.complete("count these tokens, please")
+    assert state.total_tokens == 2 * count_tokens("count these tokens, please") + 2 * 2
+    close_engines()
+
+
+def test_without_api_key_nodes_keep_templates(tmp_path):
+    config = Config()
+    config.storage.db_path = str(tmp_path / "research.db")
+    assert get_llm_client(config) is None
+
+
+def test_plan_and_report_use_llm(monkeypatch, tmp_path):
+    config = _config(tmp_path)
+    client = get_llm_client(config)
+    monkeypatch.setattr(client.provider, "reply", lambda system, prompt: (
+        "1. transformer forecasting benchmarks\n2. transformer forecasting code"
+        if "search queries" in system else "Summary of " + prompt.splitlines()[-1]
+    ))
+
+    state = plan_node(ResearchState(query="transformers"), config)
+    assert state.plan == ["transformer forecasting benchmarks", "transformer forecasting code"]
+
+    state.findings.append(Finding(source="tavily", url="https://example.com/a", title="A",
+                                  content="Transformers beat baselines.", score=0.9))
+    report = report_node(state, config).final_report
+    assert "- **Summary:** Summary of Transformers beat baselines." in report
+    assert "Summary of - A" in report
+    close_engines()
+
+
+def test_provider_errors_fall_back_to_templates(monkeypatch, tmp_path):
+    config = _config(tmp_path)
+    client = get_llm_client(config)
+
+    def fail(system, prompt):
+        raise ConnectionError("provider unavailable")
+
+    monkeypatch.setattr(client.provider, "reply", fail)
+
+    state = plan_node(ResearchState(query="transformers"), config)
+    assert state.plan == default_plan("transformers")
+
+    state.findings.append(Finding(source="tavily", url="https://example.com/a", title="A",
+                                  content="Transformers beat baselines.", score=0.9))
+    state = report_node(state, config)
+    assert state.status == "completed"
+    assert "**Summary:**" not in state.final_report
+    assert "охватило" in state.final_report
+    close_engines()
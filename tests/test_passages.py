@@ -0,0 +1,85 @@
+"""Тесты разбиения на пассажи и выбора цитат для отчета."""
+
+from deep_research import passages as passages_module
+from deep_research.config import Config
+from deep_research.nodes.report import report_node
+from deep_research.passages import PassageIndex, select_excerpt, split_passages
+from deep_research.state import Finding, ResearchState
+
+FILLER = "Cookie banner and navigation menu text without anything useful here."
+
+
+def _page(topic: str, position: int, paragraphs: int = 12) -> str:
+    parts = [f"{FILLER} Section {i}." for i in range(paragraphs)]
+    parts[position] = f"The {topic} approach improves time series forecasting accuracy."
+    return "\n\n".join(parts)
+
+
+def test_split_passages_merges_paragraphs_up_to_size():
+    text = "\n\n".join(["alpha " * 10, "beta " * 10, "gamma " * 100])
+    spans = list(split_passages(text, size=150))
+
+    assert all(end - start <= 150 for start, end in spans)
+    # Первые два абзаца склеены, длинный третий разрезан по пробелам
+    assert text[spans[0][0]:spans[0][1]].split() == ["alpha"] * 10 + ["beta"] * 10
+    pieces = " ".join(text[s:e] for s, e in spans[1:]).split()
+    assert pieces == ["gamma"] * 100
+    assert list(split_passages("  \n\n  ")) == []
+
+
+def test_best_passages_finds_relevant_paragraph():
+    index = PassageIndex(passage_chars=100)
+    page = _page("transformer", 7)
+    index.add("a", page)
+    index.add("b", _page("boosting", 2))
+
+    (start, end), = index.best_passages("a", "transformer forecasting", 1)
+    assert "transformer" in page[start:end]
+    assert index.best_passages("a", "nothing matches", 2) == []
+    assert index.best_passages("missing", "transformer", 2) == []
+
+
+def test_segment_merges_keep_results(monkeypatch):
+    monkeypatch.setattr(passages_module, "SEGMENT_POSTINGS", 8)
+    monkeypatch.setattr(passages_module, "MAX_SEGMENTS", 2)
+    small = PassageIndex(passage_chars=100)
+    big = PassageIndex(passage_chars=100)
+    pages = [_page(f"topic{i} transformer", i % 12) for i in range(30)]
+    for i, page in enumerate(pages):
+        small.add(str(i), page)
+    monkeypatch.setattr(passages_module, "SEGMENT_POSTINGS", 1 << 20)
+    for i, page in enumerate(pages):
+        big.add(str(i), page)
+
+    assert len(small._segments) <= 3
+    for i in range(30):
+        assert (small.best_passages(str(i), "transformer forecasting", 2)
+                == big.best_passages(str(i), "transformer forecasting", 2))
+
+
+def test_report_quotes_relevant_passage_from_raw_content(tmp_path):
+    config = Config()
+    config.output.save_path = str(tmp_path / "out")
+    config.output.format = "markdown"
+    config.output.passage_chars = 120
+    config.storage.db_path = str(tmp_path / "db.sqlite")
+    state = ResearchState(session_id="passages", query="transformer", plan=["forecasting"])
+    state.findings.append(Finding(
+        source="tavily", url="https://example.com/a", title="Page", content="Short snippet",
+        score=0.9, metadata={"query": "forecasting", "raw_content": _page("transformer", 9)},
+    ))
+    state.findings.append(Finding(
+        source="tavily", url="https://example.com/b", title="Other", content="Other snippet",
+        score=0.1, metadata={"query": "forecasting"},
+    ))
+
+    report = report_node(state, config).final_report
+    assert "The transformer approach improves time series forecasting accuracy." in report
+    assert "Short snippet" not in report
+    # Без полного текста остается начало сниппета
+    assert "Other snippet" in report
+
+
+def test_excerpt_is_none_without_raw_content():
+    finding = Finding(source="tavily", url="u", title="t", content="c")
+    assert select_excerpt(PassageIndex(), finding, "query", 2) is None
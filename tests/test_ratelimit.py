@@ -0,0 +1,142 @@
+"""Тесты лимитов, адаптивной параллельности и повторов запросов к API."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from deep_research.config import Config, SearchConfig
+from deep_research.nodes import search as search_module
+from deep_research.ratelimit import (
+    AdaptiveConcurrency,
+    BackendOverloaded,
+    RetryableError,
+    TokenBucket,
+)
+from deep_research.search import close_search_clients, get_search_client
+from deep_research.state import ResearchState
+
+
+def _search_config(fake_tavily, **kwargs) -> SearchConfig:
+    options = dict(tavily_api_key="test", tavily_base_url=fake_tavily.url, max_results=3,
+                   retry_base_delay=0.01, retry_max_delay=0.05)
+    options.update(kwargs)
+    return SearchConfig(**options)
+
+
+class FakeClock:
+    """Часы модуля ratelimit: `sleep` только сдвигает `monotonic`."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr("deep_research.ratelimit.time", clock)
+    return clock
+
+
+def test_token_bucket_limits_rate_after_burst(clock):
+    bucket = TokenBucket(rate=50, burst=2)
+    waits = [bucket.acquire() for _ in range(7)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2:] == pytest.approx([1 / 50] * 5)
+    assert clock.now == pytest.approx(5 / 50)
+
+
+def test_aimd_halves_once_per_burst_of_overloads_and_recovers():
+    limiter = AdaptiveConcurrency(max_limit=8)
+    starts = [limiter.acquire() for _ in range(4)]
+    for started in starts:
+        limiter.release(started, overloaded=True)
+    assert int(limiter.limit) == 4
+
+    for _ in range(40):
+        limiter.release(limiter.acquire())
+    assert int(limiter.limit) == 8
+
+
+def test_injected_429_and_5xx_are_retried(fake_tavily):
+    fake_tavily.failures = [429, 503, 429]
+    try:
+        client = get_search_client(_search_config(fake_tavily))
+        assert len(client.search("q")) == 3
+        metrics = client.limiter.metrics()
+    finally:
+        close_search_clients()
+
+    assert fake_tavily.requests == 4
+    assert metrics["retries"] == 3
+    assert metrics["overloaded"] == 3
+    assert metrics["throttle_time"] > 0
+
+
+def test_retries_stop_at_deadline(fake_tavily, clock):
+    fake_tavily.failures = [429] * 1000
+    try:
+        client = get_search_client(_search_config(fake_tavily, retry_deadline=0.3))
+        with pytest.raises(BackendOverloaded):
+            client.search("q")
+        metrics = client.limiter.metrics()
+    finally:
+        close_search_clients()
+
+    # Паузы между повторами не выходят за дедлайн
+    assert clock.now < 0.3
+    assert metrics["failed"] == 1
+    assert metrics["requests"] > 1
+
+
+def test_client_errors_are_not_retried(fake_tavily):
+    fake_tavily.failures = [401]
+    try:
+        client = get_search_client(_search_config(fake_tavily))
+        with pytest.raises(Exception) as exc_info:
+            client.search("q")
+    finally:
+        close_search_clients()
+
+    assert not isinstance(exc_info.value, RetryableError)
+    assert fake_tavily.requests == 1
+
+
+def test_concurrency_adapts_to_server_capacity(fake_tavily):
+    fake_tavily.latency = 0.05
+    fake_tavily.capacity = 3
+    try:
+        client = get_search_client(_search_config(fake_tavily, global_concurrency=12))
+        with ThreadPoolExecutor(max_workers=12) as pool:
+            results = list(pool.map(client.search, [f"q{i}" for i in range(48)]))
+        metrics = client.limiter.metrics()
+    finally:
+        close_search_clients()
+
+    assert all(len(r) == 3 for r in results)
+    assert metrics["failed"] == 0
+    assert 0 < metrics["overloaded"] < 48
+    assert metrics["concurrency_limit"] < 12
+
+
+def test_search_node_keeps_step_after_rate_limit(fake_tavily, tmp_path):
+    fake_tavily.failures = [429, 429]
+    config = Config()
+    config.ui.interactive = False
+    config.search = _search_config(fake_tavily, cache_enabled=False)
+    config.storage.db_path = str(tmp_path / "research.db")
+    try:
+        state = search_module.search_node(
+            ResearchState(session_id="s1", query="q", plan=["a", "b"]), config
+        )
+    finally:
+        close_search_clients()
+
+    assert state.search_calls == 2
+    assert len(state.findings) > 0
@@ -0,0 +1,44 @@
+"""Тесты потоковой генерации отчета."""
+
+import io
+import json
+
+from deep_research.config import Config
+from deep_research.nodes.report import iter_json_report, report_node, write_report
+from deep_research.state import Finding, ResearchState
+
+
+def _state(n: int) -> ResearchState:
+    state = ResearchState(session_id="s1", query="time series", plan=["models", "data"])
+    state.findings.extend(
+        Finding(source="tavily", url=f"https://example.com/{i}", title=f"Title {i}",
+                content=f"time series note {i}\nline two", score=i / n,
+                metadata={"query": "models", "raw_content": "x" * 10})
+        for i in range(n)
+    )
+    return state
+
+
+def test_streamed_json_matches_model_dump():
+    for n in (0, 3):
+        state = _state(n)
+        out = io.StringIO()
+        write_report(iter_json_report(state, state.findings), out)
+        expected = json.dumps(state.model_dump(), indent=2, default=str, ensure_ascii=False)
+        assert out.getvalue() == expected
+
+
+def test_report_node_writes_top_k(tmp_path):
+    config = Config()
+    config.output.save_path = str(tmp_path / "out")
+    config.output.top_k = 3
+    config.storage.db_path = str(tmp_path / "db.sqlite")
+    state = report_node(_state(50), config)
+
+    assert state.status == "completed"
+    assert state.final_report.count("### ") == 3
+    with open(state.report_path, encoding="utf-8") as f:
+        assert f.read() == state.final_report
+    data = json.loads(next((tmp_path / "out").glob("*.json")).read_text(encoding="utf-8"))
+    assert len(data["findings"]) == 50
+    assert "rank_score" in data["findings"][0]["metadata"]
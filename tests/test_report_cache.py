@@ -0,0 +1,105 @@
+"""Тесты инкрементальной перегенерации отчета."""
+
+import io
+from datetime import datetime
+
+from deep_research.db import close_engines
+from deep_research.nodes.report import (
+    iter_json_report,
+    iter_markdown_report,
+    select_top,
+    write_report,
+)
+from deep_research.report_cache import ReportCache
+from deep_research.state import Finding, ResearchState
+
+
+def _findings(start: int, count: int):
+    words = ["forecast", "series", "anomaly", "trend", "signal", "window", "lag"]
+    return [
+        Finding(source="tavily", url=f"https://example.com/{i}", title=f"Title {i}",
+                content=" ".join(words[(i * k) % len(words)] for k in range(1, 200)),
+                score=(i % 17) / 17,
+                metadata={"query": ["models", "data"][i % 2]})
+        for i in range(start, start + count)
+    ]
+
+
+def _render(state: ResearchState, cache=None) -> tuple:
+    top = select_top(state, 10, 0.5, cache)
+    markdown = "".join(iter_markdown_report(state, top, cache=cache))
+    out = io.StringIO()
+    write_report(iter_json_report(state, state.findings, cache), out)
+    return markdown, out.getvalue()
+
+
+def _state(findings) -> ResearchState:
+    moment = datetime(2024, 1, 1)
+    state = ResearchState(session_id="s1", query="time series forecast", plan=["models", "data"],
+                          created_at=moment, updated_at=moment)
+    state.findings.extend(findings)
+    return state
+
+
+def test_cached_render_matches_full_render(tmp_path):
+    state = _state(_findings(0, 200))
+    cache = ReportCache(str(tmp_path / "db.sqlite"), "s1")
+
+    assert _render(state, cache) == _render(_state(_findings(0, 200)))
+    state.findings.extend(_findings(200, 20))
+    assert _render(state, cache) == _render(_state(_findings(0, 220)))
+    assert cache.tokenized == 220
+    close_engines()
+
+
+def test_only_new_findings_are_processed_after_resume(tmp_path):
+    db_path = str(tmp_path / "db.sqlite")
+    state = _state(_findings(0, 300))
+    cache = ReportCache(db_path, "s1")
+    _render(state, cache)
+    cache.flush()
+    close_engines()
+
+    # Новый процесс: кэш читается из БД
+    state.findings.extend(_findings(300, 5))
+    resumed = ReportCache(db_path, "s1")
+    assert _render(state, resumed) == _render(_state(_findings(0, 305)))
+    assert resumed.tokenized == 5
+    assert resumed.rendered == 5
+    close_engines()
+
+
+def test_delta_render_processes_only_new_findings(tmp_path):
+    state = _state(_findings(0, 3000))
+    cache = ReportCache(str(tmp_path / "db.sqlite"), "s1")
+    _render(state, cache)
+    tokenized, rendered = cache.tokenized, cache.rendered
+    state.findings.extend(_findings(3000, 10))
+
+    _render(state, cache)
+    # Время полной и инкрементальной генерации сравнивает benchmarks/bench_report.py
+    assert cache.tokenized - tokenized == 10
+    assert cache.rendered - rendered == 10
+    close_engines()
+
+
+def test_changed_finding_is_reprocessed_by_position(tmp_path):
+    state = _state(_findings(0, 200))
+    cache = ReportCache(str(tmp_path / "db.sqlite"), "s1")
+    _render(state, cache)
+    cache.flush()
+
+    # Без изменений отбор, фрагменты и секции берутся готовыми
+    counters = cache.tokenized, cache.rendered, cache.rendered_sections
+    assert _render(state, cache) == _render(_state(_findings(0, 200)))
+    assert (cache.tokenized, cache.rendered, cache.rendered_sections) == counters
+
+    changed = _findings(0, 200)
+    changed[50] = _findings(500, 1)[0]
+    state.findings[50] = changed[50]
+    del state.findings[199]
+    del changed[199]
+    assert _render(state, cache) == _render(_state(changed))
+    assert cache.tokenized - counters[0] == 1
+    assert cache.rendered - counters[1] == 1
+    close_engines()
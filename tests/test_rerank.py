@@ -0,0 +1,85 @@
+"""Тесты локального переранжирования источников."""
+
+import math
+import random
+import re
+from collections import Counter
+
+import numpy as np
+
+from deep_research.rerank import K1, B, bm25_scores, hash_tokens, rerank, top_findings
+from deep_research.state import Finding
+
+
+def _finding(title: str, content: str, step: str, score: float = 0.5) -> Finding:
+    return Finding(source="tavily", url=f"https://example.com/{title}", title=title,
+                   content=content, score=score, metadata={"query": step})
+
+
+def test_hash_tokens_is_case_insensitive_and_splits_texts():
+    docs, hashes = hash_tokens(["Hello, world", "привет МИР hello", ""])
+    assert docs.tolist() == [0, 0, 1, 1, 1]
+    assert hashes[0] == hashes[4]
+    assert len(set(hashes.tolist())) == 4
+
+
+def test_unicode_punctuation_separates_words():
+    docs, hashes = hash_tokens(["«Модель»\u00a0— данные…", "модель данные", "naïve café"])
+    assert hashes[docs == 0].tolist() == hashes[docs == 1].tolist()
+    # Буквы с диакритикой (в том числе комбинируемой) остаются внутри слова
+    assert (docs == 2).sum() == 2
+    assert len(hash_tokens(["nai\u0308ve"])[1]) == 1
+
+
+def test_relevant_finding_outranks_higher_provider_score():
+    findings = [
+        _finding("cooking", "recipes for pasta and pizza", "step", score=0.9),
+        _finding("forecasting", "transformer models for time series forecasting", "step",
+                 score=0.8),
+    ]
+    top = top_findings(findings, "time series forecasting", 2, weight=0.8)
+    assert top[0].title == "forecasting"
+    assert 0.0 <= findings[0].metadata["rank_score"] <= 1.0
+
+
+def test_scores_are_normalized_per_plan_step():
+    # Провайдер дает шагам несравнимые шкалы; лучшие в каждом шаге равны
+    findings = [
+        _finding("a", "attention layers", "step one", score=0.9),
+        _finding("b", "attention layers", "step one", score=0.8),
+        _finding("c", "attention layers", "step two", score=0.2),
+        _finding("d", "attention layers", "step two", score=0.1),
+    ]
+    scores = rerank(findings, "attention", weight=0.0)
+    assert scores.tolist() == [1.0, 0.0, 1.0, 0.0]
+
+
+def _reference_bm25(texts, queries, query_of_text):
+    """BM25 по определению, циклами Python."""
+    docs = [re.findall(r"\w+", text.lower()) for text in texts]
+    avg_len = max(sum(map(len, docs)) / len(docs), 1.0)
+    df = Counter(term for doc in docs for term in set(doc))
+    scores = []
+    for doc, q in zip(docs, query_of_text):
+        tf = Counter(doc)
+        score = 0.0
+        for term in set(re.findall(r"\w+", queries[q].lower())):
+            if term in tf:
+                idf = math.log1p((len(docs) - df[term] + 0.5) / (df[term] + 0.5))
+                score += idf * tf[term] * (K1 + 1) / (
+                    tf[term] + K1 * (1 - B + B * len(doc) / avg_len))
+        scores.append(score)
+    return scores
+
+
+def test_vectorized_bm25_matches_reference():
+    rng = random.Random(0)
+    words = [f"term{i}" for i in range(300)]
+    texts = [" ".join(rng.choice(words) for _ in range(rng.randint(0, 40))) for _ in range(1200)]
+    queries = ["term1 term2", "term3 TERM4 term5", "unknown"]
+    query_of_text = np.array([i % 3 for i in range(len(texts))])
+
+    # Части по TEXT_CHUNK склеиваются без сдвига номеров текстов
+    scores = bm25_scores(iter(texts), queries, query_of_text)
+    assert np.allclose(scores, _reference_bm25(texts, queries, query_of_text))
+    assert scores[2::3].tolist() == [0.0] * len(scores[2::3])
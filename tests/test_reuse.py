@@ -0,0 +1,152 @@
+"""Тесты повторного использования источников прошлых сессий."""
+
+from deep_research.config import Config
+from deep_research.db import close_engines
+from deep_research.nodes import search as search_module
+from deep_research.reuse import get_reuse_index, minhash, signature, similarity
+from deep_research.state import Finding, ResearchState
+from deep_research.storage import ResearchStorage
+
+
+class CountingSearch:
+    """Поиск-заглушка, считающая запросы."""
+
+    calls = []
+
+    def __init__(self, config):
+        self.max_results = config.max_results
+        self.search_depth = config.search_depth
+
+    def search(self, query: str):
+        CountingSearch.calls.append(query)
+        return [
+            Finding(source="tavily", url=f"https://example.com/{len(self.calls)}/{i}",
+                    title=f"{query} {i}", content=f"text {i}", score=0.5,
+                    metadata={"query": query})
+            for i in range(3)
+        ]
+
+
+def _config(tmp_path) -> Config:
+    config = Config()
+    config.ui.interactive = False
+    config.storage.db_path = str(tmp_path / "research.db")
+    config.search.cache_enabled = False
+    config.search.dedup_enabled = False
+    config.search.reuse_min_findings = 3
+    return config
+
+
+def _run(config: Config, session_id: str, query: str) -> ResearchState:
+    state = search_module.search_node(
+        ResearchState(session_id=session_id, query=query, plan=["overview", "practice"]), config
+    )
+    storage = ResearchStorage(config.storage.db_path)
+    storage.flush_findings()
+    storage.save_session(state)
+    return state
+
+
+def test_signature_estimates_word_overlap():
+    base = minhash("transformer models for time series forecasting")
+    assert similarity(base, minhash("Transformer models for time-series forecasting")) == 1.0
+    assert similarity(base, minhash("transformer models for time series forecasting tools")) > 0.6
+    assert similarity(base, minhash("gardening tips for tomatoes")) < 0.2
+
+    # Общий шаг плана не делает похожими разные запросы
+    step = "Анализ: сравнение подходов и методологий"
+    assert similarity(signature("benchmark query 1", step),
+                      signature("benchmark query 2", step)) < 0.8
+
+
+def test_similar_session_is_answered_without_live_search(monkeypatch, tmp_path):
+    monkeypatch.setattr(search_module, "get_search_client", CountingSearch)
+    CountingSearch.calls = []
+    config = _config(tmp_path)
+
+    first = _run(config, "first", "transformer models for time series")
+    assert len(CountingSearch.calls) == 2
+    assert first.search_calls == 2
+
+    second = _run(config, "second", "Transformer models for time series")
+    assert len(CountingSearch.calls) == 2
+    assert second.search_calls == 0
+    assert [f.url for f in second.findings] == [f.url for f in first.findings]
+    assert {f.metadata["reused_from"] for f in second.findings} == {"first"}
+    second_queries = [f.metadata["query"] for f in second.findings]
+    assert second_queries == [f.metadata["query"] for f in first.findings]
+
+    # Другая тема ищется живым поиском
+    _run(config, "third", "gardening tips for tomatoes")
+    assert len(CountingSearch.calls) == 4
+
+    # Недостаточное покрытие: подтянутые источники дополняются поиском
+    config.search.reuse_min_findings = 10
+    fourth = _run(config, "fourth", "transformer models for time series")
+    assert len(CountingSearch.calls) == 6
+    assert fourth.search_calls == 2
+    # Сессия "second" сама взяла источники из "first" и в индекс не попала
+    assert len(fourth.findings) == 2 * (3 + 3)
+
+
+def test_stale_sessions_are_not_reused(monkeypatch, tmp_path):
+    monkeypatch.setattr(search_module, "get_search_client", CountingSearch)
+    CountingSearch.calls = []
+    config = _config(tmp_path)
+    _run(config, "old", "transformer models for time series")
+    get_reuse_index(config.storage.db_path).engine.write(
+        lambda conn: conn.execute("UPDATE reuse_steps SET updated_at = 0")
+    )
+
+    state = _run(config, "new", "transformer models for time series")
+    assert len(CountingSearch.calls) == 4
+    assert not any("reused_from" in f.metadata for f in state.findings)
+
+
+def test_index_is_backfilled_from_existing_sessions(tmp_path):
+    db_path = str(tmp_path / "research.db")
+    storage = ResearchStorage(db_path)
+    state = ResearchState(session_id="saved", query="graph neural networks", plan=["overview"])
+    state.findings.extend(
+        Finding(source="tavily", url=f"https://example.com/{i}", title="t", content="c",
+                metadata={"query": "overview"})
+        for i in range(4)
+    )
+    storage.save_session(state)
+    close_engines()
+
+    index = get_reuse_index(db_path)
+    (step,) = index.similar("graph neural networks", "overview", 0.8)
+    assert (step.session_id, step.step) == ("saved", "overview")
+    assert len(index.load_findings(step, "overview")) == 4
+    assert index.similar("graph neural networks", "overview", 0.8, exclude_session="saved") == []
+    close_engines()
+
+
+def test_sessions_written_after_backfill_are_indexed_on_request(tmp_path):
+    db_path = str(tmp_path / "research.db")
+    index = get_reuse_index(db_path)
+    index.record("live", "unrelated query", "overview")
+
+    # Сессия пишется в обход поиска (как при импорте): backfill уже прошел
+    state = ResearchState(session_id="imported", query="graph neural networks")
+    state.findings.extend(
+        Finding(source="tavily", url=f"https://example.com/{i}", title="t", content="c",
+                metadata={"query": "overview" if i % 2 else "practice"})
+        for i in range(4)
+    )
+    ResearchStorage(db_path).save_session(state)
+    assert index.similar("graph neural networks", "overview", 0.8) == []
+
+    assert index.index_sessions(["imported"]) == 2
+    (step,) = index.similar("graph neural networks", "overview", 0.8)
+    assert [f.url for f in index.load_findings(step, "overview")] == [
+        "https://example.com/1", "https://example.com/3"
+    ]
+    # Источники шага выбираются по индексу, без разбора metadata
+    plan = " ".join(row[3] for row in index.engine.reader().execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM findings WHERE session_id = ? AND step = ?",
+        ("imported", "overview"),
+    ))
+    assert "idx_findings_step" in plan
+    close_engines()
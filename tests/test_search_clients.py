@@ -0,0 +1,29 @@
+"""Тесты реестра поисковых клиентов."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from deep_research.config import SearchConfig
+from deep_research.search import close_search_clients, get_search_client
+
+
+def test_client_reuses_keepalive_connections(fake_tavily):
+    config = SearchConfig(tavily_api_key="test", tavily_base_url=fake_tavily.url,
+                          max_results=3, max_concurrency=2)
+    try:
+        client = get_search_client(config)
+        assert get_search_client(config.model_copy()) is client
+
+        for i in range(5):
+            assert len(client.search(f"query {i}")) == 3
+        assert fake_tavily.requests == 5
+        assert fake_tavily.connections == 1
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            list(pool.map(get_search_client(config).search, [f"q{i}" for i in range(10)]))
+        assert fake_tavily.requests == 15
+        assert fake_tavily.connections <= 2
+    finally:
+        close_search_clients()
+
+    assert get_search_client(config) is not client
+    close_search_clients()
@@ -0,0 +1,79 @@
+"""Тесты параллельного поиска в search_node."""
+
+import threading
+import time
+
+from deep_research.config import Config
+from deep_research.nodes import search as search_module
+from deep_research.state import Finding, ResearchState
+
+
+class FakeSearch:
+    """Поиск-заглушка с фиксированной задержкой."""
+
+    latency = 0.2
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+    # Если задан, каждый поиск ждет остальных: без параллелизма — таймаут
+    barrier = None
+
+    def __init__(self, config):
+        self.max_results = config.max_results
+        self.search_depth = config.search_depth
+
+    def search(self, query: str):
+        with FakeSearch.lock:
+            FakeSearch.active += 1
+            FakeSearch.peak = max(FakeSearch.peak, FakeSearch.active)
+        if FakeSearch.barrier is not None:
+            FakeSearch.barrier.wait()
+        else:
+            time.sleep(self.latency)
+        with FakeSearch.lock:
+            FakeSearch.active -= 1
+        return [
+            Finding(source="tavily", url=f"https://example.com/{query}/{i}",
+                    title=query, content="text", score=0.5)
+            for i in range(2)
+        ]
+
+
+def _auto_config(tmp_path, max_concurrency: int = 4) -> Config:
+    config = Config()
+    config.ui.interactive = False
+    config.storage.db_path = str(tmp_path / "research.db")
+    config.search.dedup_enabled = False  # у заглушки одинаковый текст
+    config.search.max_concurrency = max_concurrency
+    return config
+
+
+def _state() -> ResearchState:
+    return ResearchState(session_id="test", query="q", plan=["a", "b", "c"])
+
+
+def test_parallel_search_is_concurrent_and_ordered(monkeypatch, tmp_path):
+    monkeypatch.setattr(search_module, "get_search_client", FakeSearch)
+    monkeypatch.setattr(FakeSearch, "barrier", threading.Barrier(3, timeout=5))
+    FakeSearch.peak = 0
+
+    state = search_module.search_node(_state(), _auto_config(tmp_path))
+
+    assert FakeSearch.peak == 3
+    assert [f.title for f in state.findings] == ["a", "a", "b", "b", "c", "c"]
+    assert state.search_calls == 3
+    assert state.current_step == len(state.plan) - 1
+
+
+def test_parallel_search_respects_concurrency_limit(monkeypatch, tmp_path):
+    monkeypatch.setattr(search_module, "get_search_client", FakeSearch)
+    FakeSearch.peak = 0
+
+    state = _state()
+    state.user_feedback = "refined"
+    state = search_module.search_node(state, _auto_config(tmp_path, max_concurrency=2))
+
+    assert FakeSearch.peak <= 2
+    assert state.search_calls == 4
+    assert state.findings[-1].title == "a refined"
+    assert state.user_feedback is None
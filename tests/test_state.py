@@ -0,0 +1,86 @@
+"""Тесты колоночного хранилища источников."""
+
+import numpy as np
+
+from deep_research.state import Finding, FindingList, FindingStore, ResearchState
+
+
+def _findings(n: int):
+    return [
+        Finding(source="tavily" if i % 2 else "arxiv", url=f"https://example.com/{i}",
+                title=f"Заголовок {i}", content=f"content {i}", score=i / n,
+                metadata={"query": "step", "n": i})
+        for i in range(n)
+    ]
+
+
+def test_store_roundtrips_findings():
+    findings = _findings(5)
+    store = FindingStore(findings)
+
+    assert len(store) == 5
+    assert list(store) == findings
+    assert store[-1] == findings[4]
+    assert store[1:3] == findings[1:3]
+
+    store[2] = findings[0]
+    assert store[2] == findings[0]
+
+
+def test_vectorized_order_filter_and_rank_column():
+    store = FindingStore(_findings(10))
+
+    assert store.order().tolist() == list(range(9, -1, -1))
+    assert store.top(3).tolist() == [9, 8, 7]
+
+    arxiv = store.filter(store.source_mask("arxiv"))
+    assert [f.url for f in arxiv] == [f"https://example.com/{i}" for i in range(0, 10, 2)]
+    assert arxiv.select([4, 0])[0].title == "Заголовок 8"
+
+    steps, groups = store.select([1, 0]).step_groups()
+    assert [steps[g] for g in groups] == ["step", "step"]
+
+    store.set_rank_scores(np.linspace(1, 0, 10))
+    assert store.top(2, by="rank_score").tolist() == [0, 1]
+    assert store[3].metadata["rank_score"] == store.rank_scores[3]
+
+
+def test_finding_list_keeps_list_semantics():
+    state = ResearchState(session_id="s1", query="q", findings=_findings(3))
+    assert isinstance(state.findings, FindingList)
+
+    state.findings[1].score = 0.99
+    state.findings.extend(_findings(2))
+    assert len(state.findings) == 5
+    assert state.findings.store.scores[1] == 0.99
+
+    restored = ResearchState.model_validate(state.model_dump())
+    assert restored.findings == state.findings
+    assert ResearchState.model_validate_json(state.model_dump_json()).findings == state.findings
+
+
+def test_mutations_while_iterating_are_kept():
+    findings = FindingList(_findings(4), persisted=4)
+    for finding in findings:
+        finding.metadata["seen"] = True
+    assert all(f.metadata["seen"] for f in findings.store)
+    assert set(findings.pop_changed()) == {0, 1, 2, 3}
+
+    # Прерванный цикл: последний элемент записывается при следующем чтении
+    for finding in findings:
+        finding.title = "changed"
+        break
+    assert findings.store[0].title == "changed"
+    assert findings.store[1].title == "Заголовок 1"
+
+
+def test_rewritten_text_is_compacted():
+    store = FindingStore(_findings(3))
+    column = store._text["content"]
+    for i in range(2000):
+        updated = store[1]
+        updated.content = f"{i} " + "x" * 500
+        store[1] = updated
+
+    assert len(column.buffer) < 4 * column.COMPACT_MIN_BYTES
+    assert store[1].content.endswith("x" * 500) and store[2].content == "content 2"
@@ -0,0 +1,303 @@
+"""Тесты SQLite хранилища."""
+
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from deep_research.db import close_engines, get_engine
+from deep_research.state import Finding, ResearchState
+from deep_research.storage import SEARCH_SQL, ResearchStorage, findings_delta, get_findings_buffer
+
+
+def test_storage_shares_engine_and_uses_wal(tmp_path):
+    db = str(tmp_path / "research.db")
+    first, second = ResearchStorage(db), ResearchStorage(db)
+
+    assert first.engine is second.engine
+    mode = first.engine.reader().execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+
+def test_concurrent_writers_and_readers(tmp_path):
+    storage = ResearchStorage(str(tmp_path / "research.db"))
+
+    def save(i: int) -> None:
+        storage.save_session(ResearchState(session_id=f"s{i}", query=f"query {i}"))
+        assert storage.load_session(f"s{i}").query == f"query {i}"
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(save, range(200)))
+
+    assert len(storage.list_sessions()) == 200
+    assert len(storage.list_sessions("active")) == 200
+
+
+def test_failed_write_does_not_abort_batch(tmp_path):
+    engine = get_engine(str(tmp_path / "research.db"))
+    engine.ensure_schema("CREATE TABLE IF NOT EXISTS t (x INTEGER PRIMARY KEY);")
+
+    ok = engine.submit(lambda conn: conn.execute("INSERT INTO t VALUES (1)"))
+    bad = engine.submit(lambda conn: conn.execute("INSERT INTO t VALUES (1)"))
+    also_ok = engine.submit(lambda conn: conn.execute("INSERT INTO t VALUES (2)"))
+
+    ok.result()
+    also_ok.result()
+    with pytest.raises(sqlite3.IntegrityError):
+        bad.result()
+    assert engine.reader().execute("SELECT COUNT(*) FROM t").fetchone()[0] == 2
+
+
+def test_reader_connections_close_with_their_threads(tmp_path):
+    engine = get_engine(str(tmp_path / "research.db"))
+    engine.reader()
+
+    for _ in range(5):
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda _: engine.reader().execute("SELECT 1").fetchone(), range(16)))
+    assert engine.open_readers() == 1
+
+    close_engines()
+    assert engine.open_readers() == 0
+    with pytest.raises(RuntimeError):
+        engine.submit(lambda conn: None)
+
+
+def _findings(n: int):
+    return [Finding(source="tavily", url=f"https://example.com/{i}", title=f"t{i}",
+                    content="c", score=0.1) for i in range(n)]
+
+
+def test_findings_buffer_flushes_on_size_and_explicitly(tmp_path):
+    db = str(tmp_path / "research.db")
+    storage = ResearchStorage(db)
+    buffer = get_findings_buffer(db, flush_size=5, flush_interval=60)
+
+    buffer.add("s1", _findings(3), 0)
+    assert storage.load_findings("s1") == []
+
+    buffer.add("s1", _findings(3), 3)
+    assert len(storage.load_findings("s1")) == 6
+
+    storage.buffer_findings("s1", _findings(2), 6)
+    assert storage.flush_findings() == 2
+    assert len(storage.load_findings("s1")) == 8
+
+
+def test_findings_buffer_flushes_on_timer(tmp_path):
+    db = str(tmp_path / "research.db")
+    buffer = get_findings_buffer(db, flush_size=100, flush_interval=0.05)
+    buffer.add("s1", _findings(2), 0)
+
+    time.sleep(0.3)
+    assert len(ResearchStorage(db).load_findings("s1")) == 2
+
+
+def test_engine_close_flushes_buffer_and_stops_timer(tmp_path):
+    db = str(tmp_path / "research.db")
+    buffer = get_findings_buffer(db, flush_size=100, flush_interval=60)
+    buffer.add("s1", _findings(2), 0)
+    timer = buffer._timer
+
+    close_engines()
+    assert timer.finished.is_set()
+    with pytest.raises(RuntimeError):
+        buffer.add("s1", _findings(1), 2)
+
+    # Новый буфер для новой жизни движка; строки старого уже записаны
+    assert get_findings_buffer(db) is not buffer
+    assert len(ResearchStorage(db).load_findings("s1")) == 2
+    close_engines()
+
+
+def test_session_roundtrip_with_lazy_findings(tmp_path):
+    storage = ResearchStorage(str(tmp_path / "research.db"))
+    state = ResearchState(session_id="s1", query="q", plan=["a"], findings=_findings(5))
+    storage.save_session(state)
+
+    state.findings.extend(_findings(3))
+    state.search_calls = 2
+    assert len(state.findings.unsaved()) == 3
+    storage.save_session(state)
+    assert state.findings.unsaved() == []
+
+    loaded = storage.load_session("s1")
+    assert not loaded.findings.loaded
+    assert len(loaded.findings) == 8
+    assert loaded.model_dump() == state.model_dump()
+    assert loaded.findings.loaded
+
+    loaded.findings.append(_findings(1)[0])
+    storage.save_session(loaded)
+    assert len(storage.load_findings("s1")) == 9
+    assert len(storage.load_session("s1").findings) == 9
+
+
+def test_changed_findings_are_rewritten(tmp_path):
+    storage = ResearchStorage(str(tmp_path / "research.db"))
+    state = ResearchState(session_id="s1", query="q", findings=_findings(3))
+    storage.save_session(state)
+
+    state.findings[1].score = 0.9
+    state.findings.mark_changed(1)
+    storage.save_session(state)
+
+    assert [f.score for f in storage.load_findings("s1")] == [0.1, 0.9, 0.1]
+
+    # Изменение выданного по индексу источника сохраняется без mark_changed
+    finding = state.findings[0]
+    finding.title = "renamed"
+    storage.save_session(state)
+    assert [f.title for f in storage.load_session("s1").findings] == ["renamed", "t1", "t2"]
+
+
+def test_set_delete_and_insert_on_loaded_session(tmp_path):
+    storage = ResearchStorage(str(tmp_path / "research.db"))
+    storage.save_session(ResearchState(session_id="s1", query="q", findings=_findings(4)))
+
+    def titles():
+        return [f.title for f in storage.load_session("s1").findings]
+
+    state = storage.load_session("s1")
+    state.findings[1] = Finding(source="tavily", url="https://example.com/x", title="x",
+                                content="c", score=0.1)
+    storage.save_session(state)
+    assert titles() == ["t0", "x", "t2", "t3"]
+
+    state = storage.load_session("s1")
+    del state.findings[0]
+    storage.save_session(state)
+    assert titles() == ["x", "t2", "t3"]
+    assert len(storage.load_findings("s1")) == 3
+
+    state = storage.load_session("s1")
+    state.findings.insert(1, _findings(1)[0])
+    storage.save_session(state)
+    assert titles() == ["x", "t0", "t2", "t3"]
+
+
+def test_rerank_updates_only_changed_rank_scores(tmp_path):
+    storage = ResearchStorage(str(tmp_path / "research.db"))
+    state = ResearchState(session_id="s1", query="q", findings=_findings(4))
+    storage.save_session(state)
+
+    findings = state.findings
+    findings.mark_rank_changed(findings.store.set_rank_scores(np.array([0.1, 0.5, 0.1, 0.7])))
+    storage.save_session(state)
+    assert [f.metadata["rank_score"] for f in storage.load_findings("s1")] == [0.1, 0.5, 0.1, 0.7]
+    stored = storage.engine.reader().execute("SELECT metadata FROM findings").fetchall()
+    assert all("rank_score" not in row[0] for row in stored)
+
+    # Строки целиком не переписываются, rank_score — только изменившиеся
+    findings.mark_rank_changed(findings.store.set_rank_scores(np.array([0.1, 0.5, 0.3, 0.7])))
+    delta = findings_delta("s1", findings)
+    assert delta.rows == [] and delta.ranks == [(0.3, "s1", 2)]
+
+
+def test_full_text_search_over_findings_and_reports(tmp_path):
+    storage = ResearchStorage(str(tmp_path / "research.db"))
+    findings = _findings(3000)
+    findings[1234] = Finding(source="tavily", url="https://example.com/nbeats",
+                             title="N-BEATS explained", content="neural basis expansion")
+    state = ResearchState(session_id="s1", query="time series", findings=findings)
+    storage.save_session(state)
+
+    state.final_report = "# Report\n\nN-BEATS outperforms the baselines."
+    storage.save_session(state)
+
+    hits = storage.search("n-beats")
+    assert [(h.kind, h.session_id) for h in hits] == [("finding", "s1"), ("report", "s1")]
+    assert "\x02N-BEATS\x03" in hits[0].snippet
+    assert storage.search("n-beats", limit=1, offset=1)[0].kind == "report"
+
+    # Поиск идет по индексам FTS, таблицы источников и сессий не сканируются
+    plan = [row[3] for row in storage.engine.reader().execute(
+        "EXPLAIN QUERY PLAN " + SEARCH_SQL,
+        {"query": "n-beats", "hl_start": "", "hl_end": "", "limit": 20, "offset": 0},
+    )]
+    scans = [detail for detail in plan if detail.startswith("SCAN")]
+    assert len(scans) == 2 and all("VIRTUAL TABLE" in detail for detail in scans)
+
+    state.findings[1234].title = "Renamed"
+    state.findings[1234].content = "nothing here"
+    state.findings.mark_changed(1234)
+    storage.save_session(state)
+    assert [h.kind for h in storage.search("n-beats")] == ["report"]
+
+
+def _set_times(storage: ResearchStorage, times: dict) -> None:
+    def write(conn):
+        for session_id, (created, updated) in times.items():
+            conn.execute(
+                "UPDATE research_sessions SET created_at = ?, updated_at = ? WHERE id = ?",
+                (created, updated, session_id),
+            )
+    storage.engine.write(write)
+
+
+def test_keyset_pagination_walks_sessions_in_order(tmp_path):
+    storage = ResearchStorage(str(tmp_path / "research.db"))
+    for i in range(25):
+        storage.save_session(ResearchState(session_id=f"s{i:02d}", query=f"query {i}",
+                                           status="completed" if i % 2 else "active"))
+    # Половина сессий с одинаковым updated_at: порядок внутри — по id
+    _set_times(storage, {f"s{i:02d}": ("2024-01-01", f"2024-01-{1 + i // 2:02d} 10:00:00")
+                         for i in range(25)})
+
+    pages, after = [], None
+    while True:
+        page = storage.list_sessions(limit=7, after=after)
+        if not page:
+            break
+        pages.append([row[0] for row in page])
+        after = page[-1][0]
+
+    walked = [session_id for page in pages for session_id in page]
+    assert walked == [row[0] for row in storage.list_sessions()]
+    assert walked == sorted(walked, reverse=True)
+    assert [len(page) for page in pages] == [7, 7, 7, 4]
+
+    completed = storage.list_sessions("completed", limit=5, after="s19")
+    assert [row[0] for row in completed] == ["s17", "s15", "s13", "s11", "s09"]
+
+    with pytest.raises(ValueError, match="missing"):
+        storage.list_sessions(limit=7, after="missing")
+
+
+def test_session_listing_uses_index_without_sort(tmp_path):
+    storage = ResearchStorage(str(tmp_path / "research.db"))
+    conn = storage.engine.reader()
+    for status in (None, "active"):
+        sql = "SELECT id FROM research_sessions {} ORDER BY updated_at DESC, id DESC LIMIT 10"
+        where = "WHERE status = ?" if status else ""
+        plan = " ".join(row[3] for row in conn.execute(
+            "EXPLAIN QUERY PLAN " + sql.format(where), (status,) if status else ()
+        ))
+        assert "USING COVERING INDEX" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+def test_session_stats_by_period(tmp_path):
+    storage = ResearchStorage(str(tmp_path / "research.db"))
+    for i, (status, created) in enumerate([
+        ("completed", "2024-01-05 10:00:00"),
+        ("active", "2024-01-05 12:00:00"),
+        ("completed", "2024-01-20 09:00:00"),
+        ("completed", "2024-02-02 09:00:00"),
+    ]):
+        state = ResearchState(session_id=f"s{i}", query="q", status=status,
+                              findings=_findings(i + 1), search_calls=2, total_tokens=100)
+        storage.save_session(state)
+        _set_times(storage, {f"s{i}": (created, created)})
+
+    by_day = storage.session_stats("day")
+    assert by_day[-1] == ("2024-01-05", 2, 1, 3, 4, 200)
+    by_month = storage.session_stats("month")
+    assert by_month == [("2024-02", 1, 1, 4, 2, 100), ("2024-01", 3, 2, 6, 6, 300)]
+    assert storage.session_stats("month", since="2024-01-10", status="completed") == [
+        ("2024-02", 1, 1, 4, 2, 100), ("2024-01", 1, 1, 3, 2, 100),
+    ]
+    with pytest.raises(ValueError, match="Unknown period"):
+        storage.session_stats("year")
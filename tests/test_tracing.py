@@ -0,0 +1,90 @@
+"""Тесты трассировки нод и вызовов бэкендов."""
+
+import json
+
+from deep_research import tracing
+from deep_research.config import Config
+from deep_research.graph import create_research_graph
+from deep_research.search import close_search_clients
+from deep_research.state import ResearchState
+from deep_research.storage import ResearchStorage
+
+
+def _config(tmp_path, fake_tavily) -> Config:
+    config = Config()
+    config.ui.interactive = False
+    config.search.tavily_api_key = "test"
+    config.search.tavily_base_url = fake_tavily.url
+    config.search.max_results = 3
+    config.storage.db_path = str(tmp_path / "research.db")
+    config.output.save_path = str(tmp_path / "out")
+    config.output.format = "markdown"
+    return config
+
+
+def _run(config: Config, session_id: str) -> dict:
+    graph = create_research_graph(config)
+    values = None
+    for values in graph.stream(ResearchState(session_id=session_id, query="q"),
+                               {"configurable": {"thread_id": session_id}},
+                               stream_mode="values", durability="sync"):
+        pass
+    return values
+
+
+def test_nodes_and_backend_calls_are_traced(tmp_path, fake_tavily):
+    config = _config(tmp_path, fake_tavily)
+    profile = tracing.start_profile()
+    try:
+        values = _run(config, "s1")
+    finally:
+        tracing.stop_profile()
+        close_search_clients()
+
+    metrics = values["metrics"]
+    assert {"node.plan", "node.search", "node.analyze", "node.report"} <= set(metrics)
+    assert metrics["backend.tavily"]["calls"] == 3
+    assert metrics["backend.tavily"]["findings"] == 9
+    assert metrics["backend.tavily"]["bytes"] > 0
+    assert metrics["cache.tavily"]["cache_misses"] == 3
+    assert metrics["node.search"]["seconds"] >= metrics["backend.tavily"]["seconds"] / 3
+
+    # Поиск идет в пуле потоков: события бэкенда приходят из других потоков
+    events = profile.events
+    nodes = [e for e in events if e["cat"] == "node"]
+    backend = [e for e in events if e["cat"] == "backend"]
+    assert [e["name"] for e in nodes][:2] == ["plan", "search"]
+    assert len(backend) == 3 and all(e["args"]["bytes"] > 0 for e in backend)
+
+    path = profile.write(str(tmp_path / "trace.json"))
+    assert len(json.loads(path.read_text())["traceEvents"]) == len(events)
+
+    storage = ResearchStorage(config.storage.db_path)
+    storage.engine.write(lambda conn: None)
+    assert storage.load_metrics("s1")["node.report"]["calls"] == 1
+
+
+def test_cache_hits_are_counted(tmp_path, fake_tavily):
+    config = _config(tmp_path, fake_tavily)
+    try:
+        _run(config, "first")
+        metrics = _run(config, "second")["metrics"]
+    finally:
+        close_search_clients()
+
+    assert metrics["cache.tavily"]["cache_hits"] == 3
+    assert "backend.tavily" not in metrics
+
+
+def test_span_outside_nodes_is_noop_and_cheap():
+    # Вне ноды — один общий пустой span: ни объектов, ни записей в профиль
+    profile = tracing.start_profile()
+    try:
+        first, second = tracing.span("backend", "x"), tracing.span("backend", "y", n=1)
+        assert first is second
+        with first as span:
+            span.add(bytes=1)
+            tracing.add(bytes=1)
+    finally:
+        tracing.stop_profile()
+    assert profile.events == []